@@ -1,4 +1,4 @@
-import asyncio, random, string
+import asyncio, random, string, threading, time
 import nest_asyncio
 
 nest_asyncio.apply()
@@ -12,7 +12,7 @@ import uuid
 import models
 
 from python.helpers import extract_tools, files, errors, history, tokens
-from python.helpers import dirty_json
+from python.helpers import dirty_json, tracing
 from python.helpers.print_style import PrintStyle
 
 from langchain_core.prompts import (
@@ -27,6 +27,8 @@ from typing import Callable
 from python.helpers.localization import Localization
 from python.helpers.extension import call_extensions
 from python.helpers.errors import RepairableException
+from python.helpers.utility_scheduler import UtilityScheduler, UtilityPriority
+from python.helpers.context_window import ContextWindow
 
 
 class AgentContextType(Enum):
@@ -38,6 +40,10 @@ class AgentContextType(Enum):
 class AgentContext:
 
     _contexts: dict[str, "AgentContext"] = {}
+    # saved chats listed from the chat index, loaded by _loader when first accessed
+    _unloaded: dict[str, "UnloadedContext"] = {}
+    _loader: "Callable[[UnloadedContext], AgentContext | None] | None" = None
+    _load_lock = threading.RLock()
     _counter: int = 0
     _notification_manager = None
 
@@ -56,6 +62,10 @@ class AgentContext:
     ):
         # build context
         self.id = id or AgentContext.generate_id()
+        unloaded = AgentContext._unloaded.get(self.id, None)
+        if unloaded is not None and unloaded.broken:
+            # an empty context in its place would be saved over the chat file
+            raise Exception(f"Chat {self.id} could not be loaded, its file is kept unchanged")
         self.name = name
         self.config = config
         self.log = log or Log.Log()
@@ -69,33 +79,87 @@ class AgentContext:
         self.no = AgentContext._counter
         # set to start of unix epoch
         self.last_message = last_message or datetime.now(timezone.utc)
+        self.last_access = time.monotonic()
 
         existing = self._contexts.get(self.id, None)
         if existing:
             AgentContext.remove(self.id)
+        AgentContext._unloaded.pop(self.id, None)
         self._contexts[self.id] = self
 
     @staticmethod
     def get(id: str):
-        return AgentContext._contexts.get(id, None)
+        context = AgentContext._contexts.get(id, None)
+        if context is None and id in AgentContext._unloaded:
+            context = AgentContext._load(id)
+        if context:
+            context.last_access = time.monotonic()
+        return context
 
     @staticmethod
     def first():
-        if not AgentContext._contexts:
-            return None
-        return list(AgentContext._contexts.values())[0]
+        if AgentContext._contexts:
+            return next(iter(AgentContext._contexts.values()))
+        for id in list(AgentContext._unloaded):
+            context = AgentContext.get(id)
+            if context:
+                return context
+        return None
 
     @staticmethod
     def all():
+        """Contexts loaded in memory, saved chats not accessed yet are not included"""
         return list(AgentContext._contexts.values())
 
+    @staticmethod
+    def listed() -> list["AgentContext | UnloadedContext"]:
+        """Loaded contexts and saved chats not loaded yet, for chat lists"""
+        return [*AgentContext._contexts.values(), *AgentContext._unloaded.values()]
+
+    @staticmethod
+    def add_unloaded(entry: "UnloadedContext"):
+        with AgentContext._load_lock:
+            if entry.id not in AgentContext._contexts:
+                AgentContext._unloaded[entry.id] = entry
+
+    @staticmethod
+    def unload(context: "AgentContext", entry: "UnloadedContext", idle_seconds: float = 0) -> bool:
+        """Replace a saved context by its index entry to free memory, unless it is running or was accessed meanwhile"""
+        with AgentContext._load_lock:
+            if AgentContext._contexts.get(context.id) is not context:
+                return False
+            if context.task and context.task.is_alive():
+                return False
+            if time.monotonic() - context.last_access < idle_seconds:
+                return False
+            del AgentContext._contexts[context.id]
+            AgentContext._unloaded[context.id] = entry
+            UtilityScheduler.get_instance().cancel_context(context.id)
+            return True
+
+    @staticmethod
+    def _load(id: str) -> "AgentContext | None":
+        with AgentContext._load_lock:
+            context = AgentContext._contexts.get(id, None)
+            if context:
+                return context  # loaded by another thread meanwhile
+            entry = AgentContext._unloaded.get(id, None)
+            if entry is None or entry.broken or AgentContext._loader is None:
+                return None
+            # the loaded context replaces the entry, a chat that fails to load stays listed
+            # as broken and is not retried on every access
+            context = AgentContext._loader(entry)
+            if context is None:
+                entry.broken = True
+            return context
+
     @staticmethod
     def generate_id():
         def generate_short_id():
             return ''.join(random.choices(string.ascii_letters + string.digits, k=8))
         while True:
             short_id = generate_short_id()
-            if short_id not in AgentContext._contexts:
+            if short_id not in AgentContext._contexts and short_id not in AgentContext._unloaded:
                 return short_id
 
     @classmethod
@@ -107,9 +171,12 @@ class AgentContext:
 
     @staticmethod
     def remove(id: str):
+        AgentContext._unloaded.pop(id, None)
         context = AgentContext._contexts.pop(id, None)
         if context and context.task:
             context.task.kill()
+        if context:
+            UtilityScheduler.get_instance().cancel_context(id)
         return context
 
     def serialize(self):
@@ -160,11 +227,22 @@ class AgentContext:
 
     def reset(self):
         self.kill_process()
+        UtilityScheduler.get_instance().cancel_context(self.id)
         self.log.reset()
         self.agent0 = Agent(0, self.config, self)
         self.streaming_agent = None
         self.paused = False
 
+    def recycle(self):
+        # like reset, but keeps agent0 instance so it does not have to be rebuilt
+        self.kill_process()
+        UtilityScheduler.get_instance().cancel_context(self.id)
+        self.log.reset()
+        self.agent0.reset()
+        self.streaming_agent = None
+        self.paused = False
+        self.name = None
+
     def nudge(self):
         self.kill_process()
         self.paused = False
@@ -223,6 +301,38 @@ class AgentContext:
 
 
 
+@dataclass
+class UnloadedContext:
+    """Saved chat from the chat index, stands in for its AgentContext in chat lists until it is loaded."""
+
+    id: str
+    name: str | None
+    created_at: datetime
+    last_message: datetime
+    type: AgentContextType
+    no: int
+    log_guid: str
+    log_length: int
+    size: int = 0  # size and modification time of the chat file the entry was read from
+    mtime_ns: int = 0
+    paused: bool = False
+    broken: bool = False  # loading failed, the chat file is left as it is
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "created_at": Localization.get().serialize_datetime(self.created_at),
+            "no": self.no,
+            "log_guid": self.log_guid,
+            "log_version": self.log_length,  # a loaded log has one update per item
+            "log_length": self.log_length,
+            "paused": self.paused,
+            "last_message": Localization.get().serialize_datetime(self.last_message),
+            "type": self.type.value,
+        }
+
+
 @dataclass
 class AgentConfig:
     chat_model: models.ModelConfig
@@ -282,7 +392,9 @@ class Agent:
 
     DATA_NAME_SUPERIOR = "_superior"
     DATA_NAME_SUBORDINATE = "_subordinate"
-    DATA_NAME_CTX_WINDOW = "ctx_window"
+    DATA_NAME_PARALLEL = "_parallel"  # parallel subordinate, never the streaming agent
+    DATA_NAME_CTX_WINDOW = "ctx_window"  # {"text", "tokens"} saved with the chat
+    DATA_NAME_CTX_WINDOW_LAZY = "_ctx_window"  # ContextWindow of the last iteration, not saved
 
     def __init__(
         self, number: int, config: AgentConfig, context: AgentContext | None = None
@@ -305,11 +417,20 @@ class Agent:
 
         asyncio.run(self.call_extensions("agent_init"))
 
+    def reset(self):
+        # clear history and data, then run agent_init again as on a fresh agent
+        self.history = history.History(self)  # type: ignore[abstract]
+        self.last_user_message = None
+        self.intervention = None
+        self.data = {}
+        asyncio.run(self.call_extensions("agent_init"))
+
     async def monologue(self):
         while True:
             try:
                 # loop data dictionary to pass to extensions
                 self.loop_data = LoopData(user_message=self.last_user_message)
+                monologue_span = tracing.span("monologue", "agent", agent=self).start()
                 # call monologue_start extensions
                 await self.call_extensions("monologue_start", loop_data=self.loop_data)
 
@@ -318,9 +439,12 @@ class Agent:
                 # let the agent run message loop until he stops it with a response tool
                 while True:
 
-                    self.context.streaming_agent = self  # mark self as current streamer
+                    # parallel subordinates leave the calling agent as the streamer, interventions go to it
+                    if not self.get_data(Agent.DATA_NAME_PARALLEL):
+                        self.context.streaming_agent = self  # mark self as current streamer
                     self.loop_data.iteration += 1
                     self.loop_data.params_temporary = {}  # clear temporary params
+                    iteration_span = tracing.span("iteration", "agent", agent=self).start()
 
                     # call message_loop_start extensions
                     await self.call_extensions(
@@ -329,7 +453,8 @@ class Agent:
 
                     try:
                         # prepare LLM chain (model, system, history)
-                        prompt = await self.prepare_prompt(loop_data=self.loop_data)
+                        with tracing.span("prepare_prompt", "agent"):
+                            prompt = await self.prepare_prompt(loop_data=self.loop_data)
 
                         # call before_main_llm_call extensions
                         await self.call_extensions("before_main_llm_call", loop_data=self.loop_data)
@@ -422,6 +547,7 @@ class Agent:
                         await self.call_extensions(
                             "message_loop_end", loop_data=self.loop_data
                         )
+                        iteration_span.end()
 
             # exceptions outside message loop:
             except InterventionException as e:
@@ -429,9 +555,11 @@ class Agent:
             except Exception as e:
                 self.handle_critical_exception(e)
             finally:
-                self.context.streaming_agent = None  # unset current streamer
+                if not self.get_data(Agent.DATA_NAME_PARALLEL):
+                    self.context.streaming_agent = None  # unset current streamer
                 # call monologue_end extensions
                 await self.call_extensions("monologue_end", loop_data=self.loop_data)  # type: ignore
+                monologue_span.end()  # type: ignore
 
     async def prepare_prompt(self, loop_data: LoopData) -> list[BaseMessage]:
         self.context.log.set_progress("Building prompt")
@@ -450,13 +578,12 @@ class Agent:
         system_text = "\n\n".join(loop_data.system)
 
         # join extras
+        extras_data = {**loop_data.extras_persistent, **loop_data.extras_temporary}
         extras = history.Message(  # type: ignore[abstract]
             False,
             content=self.read_prompt(
                 "agent.context.extras.md",
-                extras=dirty_json.stringify(
-                    {**loop_data.extras_persistent, **loop_data.extras_temporary}
-                ),
+                extras=dirty_json.stringify(extras_data),
             ),
         ).output()
         loop_data.extras_temporary.clear()
@@ -471,15 +598,11 @@ class Agent:
             SystemMessage(content=system_text),
             *history_langchain,
         ]
-        full_text = ChatPromptTemplate.from_messages(full_prompt).format()
 
-        # store as last context window content
+        # store as last context window content, text and tokens are computed when requested
         self.set_data(
-            Agent.DATA_NAME_CTX_WINDOW,
-            {
-                "text": full_text,
-                "tokens": tokens.approximate_tokens(full_text),
-            },
+            Agent.DATA_NAME_CTX_WINDOW_LAZY,
+            ContextWindow(full_prompt, extras_data, self.config.chat_model),
         )
 
         return full_prompt
@@ -650,6 +773,8 @@ class Agent:
         message: str,
         callback: Callable[[str], Awaitable[None]] | None = None,
         background: bool = False,
+        priority: UtilityPriority | None = None,
+        key: str = "",
     ):
         model = self.get_utility_model()
 
@@ -668,14 +793,26 @@ class Agent:
             if call_data["callback"]:
                 await call_data["callback"](chunk)
 
-        response, _reasoning = await call_data["model"].unified_call(
-            system_message=call_data["system"],
-            user_message=call_data["message"],
-            response_callback=stream_callback,
-            rate_limiter_callback=self.rate_limiter_callback if not call_data["background"] else None,
-        )
+        async def call():
+            # runs in the scheduler, attributes are taken from the agent
+            model_name = getattr(call_data["model"], "model_name", "")
+            with tracing.span("utility_model", "llm", agent=self, model=model_name) as span:
+                response, _reasoning = await call_data["model"].unified_call(
+                    system_message=call_data["system"],
+                    user_message=call_data["message"],
+                    response_callback=stream_callback,
+                    tokens_callback=span.on_tokens if span.recording else None,
+                    rate_limiter_callback=self.rate_limiter_callback if not call_data["background"] else None,
+                )
+            return response
 
-        return response
+        # wait for a slot in the utility call queue, calls with the same key are coalesced
+        if priority is None:
+            priority = UtilityPriority.MEMORIZE if background else UtilityPriority.PROMPT
+        with tracing.span("utility_call", "agent", agent=self, priority=priority.name):
+            return await UtilityScheduler.get_instance().run(
+                self.context.id, priority, call, key=key
+            )
 
     async def call_chat_model(
         self,
@@ -689,13 +826,15 @@ class Agent:
         # model class
         model = self.get_chat_model()
 
-        # call model
-        response, reasoning = await model.unified_call(
-            messages=messages,
-            reasoning_callback=reasoning_callback,
-            response_callback=response_callback,
-            rate_limiter_callback=self.rate_limiter_callback if not background else None,
-        )
+        # call model, time to first token and tokens/s are recorded when traced
+        with tracing.span("chat_model", "llm", agent=self, model=model.model_name) as span:
+            response, reasoning = await model.unified_call(
+                messages=messages,
+                reasoning_callback=reasoning_callback,
+                response_callback=response_callback,
+                tokens_callback=span.on_tokens if span.recording else None,
+                rate_limiter_callback=self.rate_limiter_callback if not background else None,
+            )
 
         return response, reasoning
 
@@ -768,22 +907,22 @@ class Agent:
             if tool:
                 await self.handle_intervention()
 
+                with tracing.span(raw_tool_name, "tool"):
+                    # Call tool hooks for compatibility
+                    await tool.before_execution(**tool_args)
+                    await self.handle_intervention()
 
-                # Call tool hooks for compatibility
-                await tool.before_execution(**tool_args)
-                await self.handle_intervention()
+                    # Allow extensions to preprocess tool arguments
+                    await self.call_extensions("tool_execute_before", tool_args=tool_args or {}, tool_name=tool_name)
 
-                # Allow extensions to preprocess tool arguments
-                await self.call_extensions("tool_execute_before", tool_args=tool_args or {}, tool_name=tool_name)
+                    response = await tool.execute(**tool_args)
+                    await self.handle_intervention()
 
-                response = await tool.execute(**tool_args)
-                await self.handle_intervention()
+                    # Allow extensions to postprocess tool response
+                    await self.call_extensions("tool_execute_after", response=response, tool_name=tool_name)
 
-                # Allow extensions to postprocess tool response
-                await self.call_extensions("tool_execute_after", response=response, tool_name=tool_name)
-                
-                await tool.after_execution(response)
-                await self.handle_intervention()
+                    await tool.after_execution(response)
+                    await self.handle_intervention()
 
                 if response.break_loop:
                     return response.message
@@ -1,6 +1,6 @@
 from agent import AgentConfig
 import models
-from python.helpers import runtime, settings, defer
+from python.helpers import runtime, settings, defer, tracing
 from python.helpers.print_style import PrintStyle
 
 
@@ -117,6 +117,17 @@ def initialize_agent():
     # return config object
     return config
 
+def initialize_logging():
+    set = settings.get_settings()
+    PrintStyle.configure_log(
+        stream_html=set["log_html_stream"],
+        max_size_mb=set["log_html_max_size"],
+    )
+    tracing.configure(
+        enabled=set["tracing_enabled"],
+        max_size_mb=set["tracing_max_size"],
+    )
+
 def initialize_chats():
     from python.helpers import persist_chat
     async def initialize_chats_async():
@@ -10,8 +10,10 @@ from typing import (
     Optional,
     Iterator,
     AsyncIterator,
+    Sequence,
     Tuple,
     TypedDict,
+    TYPE_CHECKING,
 )
 
 from litellm import completion, acompletion, embedding
@@ -19,13 +21,12 @@ import litellm
 import openai
 from litellm.types.utils import ModelResponse
 
-from python.helpers import dotenv
+from python.helpers import dotenv, files
 from python.helpers import settings, dirty_json
 from python.helpers.dotenv import load_dotenv
 from python.helpers.providers import get_provider_config
 from python.helpers.rate_limiter import RateLimiter
-from python.helpers.tokens import approximate_tokens
-from python.helpers import dirty_json, browser_use_monkeypatch
+from python.helpers import tokens
 
 from langchain_core.language_models.chat_models import SimpleChatModel
 from langchain_core.outputs.chat_generation import ChatGenerationChunk
@@ -40,7 +41,9 @@ from langchain_core.messages import (
     SystemMessage,
 )
 from langchain.embeddings.base import Embeddings
-from sentence_transformers import SentenceTransformer
+
+if TYPE_CHECKING:
+    from python.helpers.browser_model import BrowserCompatibleChatWrapper
 
 
 # disable extra logging, must be done repeatedly, otherwise browser-use will turn it back on for some reason
@@ -56,7 +59,6 @@ def turn_off_logging():
 # init
 load_dotenv()
 turn_off_logging()
-browser_use_monkeypatch.apply()
 
 litellm.modify_params = True # helps fix anthropic tool calls by browser-use
 
@@ -193,6 +195,8 @@ class ChatGenerationResult:
         return ChatChunk(response_delta=response, reasoning_delta=reasoning)
         
 
+IMAGE_TOKENS_ESTIMATE = 1000  # images are not tokenized for rate limiting
+
 rate_limiters: dict[str, RateLimiter] = {}
 api_keys_round_robin: dict[str, int] = {}
 
@@ -217,7 +221,16 @@ def get_rate_limiter(
     provider: str, name: str, requests: int, input: int, output: int
 ) -> RateLimiter:
     key = f"{provider}\\{name}"
-    rate_limiters[key] = limiter = rate_limiters.get(key, RateLimiter(seconds=60))
+    limiter = rate_limiters.get(key)
+    if not limiter:
+        # A0_RATE_LIMIT_DIR lets several worker processes share the same limits
+        shared_dir = dotenv.get_dotenv_value("A0_RATE_LIMIT_DIR")
+        shared_file = (
+            os.path.join(shared_dir, files.safe_file_name(f"{provider}_{name}") + ".json")
+            if shared_dir
+            else ""
+        )
+        limiter = rate_limiters[key] = RateLimiter(seconds=60, shared_file=shared_file)
     limiter.limits["requests"] = requests or 0
     limiter.limits["input"] = input or 0
     limiter.limits["output"] = output or 0
@@ -249,43 +262,88 @@ def _is_transient_litellm_error(exc: Exception) -> bool:
     return isinstance(exc, transient_types)
 
 
+def _get_limiter(model_config: ModelConfig | None) -> RateLimiter | None:
+    if not model_config or not (
+        model_config.limit_requests
+        or model_config.limit_input
+        or model_config.limit_output
+    ):
+        return None
+    return get_rate_limiter(
+        model_config.provider,
+        model_config.name,
+        model_config.limit_requests,
+        model_config.limit_input,
+        model_config.limit_output,
+    )
+
+
+def estimate_input_tokens(
+    messages: Sequence[Any], model_config: ModelConfig | None = None
+) -> int:
+    """Token estimate of a prompt for rate limiting.
+
+    Text parts are counted with the model's encoding and memoized, images count as a flat
+    estimate instead of encoding their base64 data.
+    """
+    encoding_name = tokens.get_encoding_name(model_config)
+    texts: list[str] = []
+    images = 0
+    for message in messages:
+        content = (
+            message.get("content", "")
+            if isinstance(message, dict)
+            else getattr(message, "content", message)
+        )
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, str):
+                    texts.append(part)
+                elif isinstance(part, dict) and part.get("type") == "text":
+                    texts.append(part.get("text", ""))
+                elif getattr(part, "type", None) == "text":
+                    texts.append(getattr(part, "text", ""))
+                else:
+                    images += 1
+        elif content:
+            texts.append(str(content))
+    counted = sum(tokens.count_tokens_batch(texts, encoding_name))
+    return int(counted * tokens.APPROX_BUFFER) + images * IMAGE_TOKENS_ESTIMATE
+
+
 async def apply_rate_limiter(
     model_config: ModelConfig | None,
-    input_text: str,
+    input_tokens: int | Callable[[], int],
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
 ):
-    if not model_config:
+    limiter = _get_limiter(model_config)
+    if not limiter:
         return
-    limiter = get_rate_limiter(
-        model_config.provider,
-        model_config.name,
-        model_config.limit_requests,
-        model_config.limit_input,
-        model_config.limit_output,
-    )
-    limiter.add(input=approximate_tokens(input_text))
-    limiter.add(requests=1)
-    await limiter.wait(rate_limiter_callback)
+    if callable(input_tokens):
+        input_tokens = input_tokens()
+    await limiter.wait(rate_limiter_callback, input=input_tokens, requests=1)
     return limiter
 
 
 def apply_rate_limiter_sync(
     model_config: ModelConfig | None,
-    input_text: str,
+    input_tokens: int | Callable[[], int],
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
 ):
-    if not model_config:
+    # sleeps on worker threads, on the event loop thread the wait runs nested in the loop
+    limiter = _get_limiter(model_config)
+    if not limiter:
         return
-    import asyncio, nest_asyncio
-
-    nest_asyncio.apply()
-    return asyncio.run(
-        apply_rate_limiter(model_config, input_text, rate_limiter_callback)
-    )
+    if callable(input_tokens):
+        input_tokens = input_tokens()
+    limiter.wait_sync(rate_limiter_callback, input=input_tokens, requests=1)
+    return limiter
 
 
 class LiteLLMChatWrapper(SimpleChatModel):
@@ -374,7 +432,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(self.a0_model_conf, lambda: estimate_input_tokens(msgs, self.a0_model_conf))
 
         # Call the model
         resp = completion(
@@ -398,7 +456,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(self.a0_model_conf, lambda: estimate_input_tokens(msgs, self.a0_model_conf))
 
         result = ChatGenerationResult()
 
@@ -429,7 +487,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        await apply_rate_limiter(self.a0_model_conf, str(msgs))
+        await apply_rate_limiter(self.a0_model_conf, lambda: estimate_input_tokens(msgs, self.a0_model_conf))
 
         result = ChatGenerationResult()
 
@@ -480,7 +538,9 @@ class LiteLLMChatWrapper(SimpleChatModel):
 
         # Apply rate limiting if configured
         limiter = await apply_rate_limiter(
-            self.a0_model_conf, str(msgs_conv), rate_limiter_callback
+            self.a0_model_conf,
+            lambda: estimate_input_tokens(msgs_conv, self.a0_model_conf),
+            rate_limiter_callback,
         )
 
         # Prepare call kwargs and retry config (strip A0-only params before calling LiteLLM)
@@ -514,26 +574,24 @@ class LiteLLMChatWrapper(SimpleChatModel):
                     if output["reasoning_delta"]:
                         if reasoning_callback:
                             await reasoning_callback(output["reasoning_delta"], result.reasoning)
-                        if tokens_callback:
-                            await tokens_callback(
-                                output["reasoning_delta"],
-                                approximate_tokens(output["reasoning_delta"]),
-                            )
-                        # Add output tokens to rate limiter if configured
-                        if limiter:
-                            limiter.add(output=approximate_tokens(output["reasoning_delta"]))
+                        if tokens_callback or limiter:
+                            delta_tokens = tokens.fast_tokens(output["reasoning_delta"])
+                            if tokens_callback:
+                                await tokens_callback(output["reasoning_delta"], delta_tokens)
+                            # Add output tokens to rate limiter if configured
+                            if limiter:
+                                limiter.add(output=delta_tokens)
                     # collect response delta and call callbacks
                     if output["response_delta"]:
                         if response_callback:
                             await response_callback(output["response_delta"], result.response)
-                        if tokens_callback:
-                            await tokens_callback(
-                                output["response_delta"],
-                                approximate_tokens(output["response_delta"]),
-                            )
-                        # Add output tokens to rate limiter if configured
-                        if limiter:
-                            limiter.add(output=approximate_tokens(output["response_delta"]))
+                        if tokens_callback or limiter:
+                            delta_tokens = tokens.fast_tokens(output["response_delta"])
+                            if tokens_callback:
+                                await tokens_callback(output["response_delta"], delta_tokens)
+                            # Add output tokens to rate limiter if configured
+                            if limiter:
+                                limiter.add(output=delta_tokens)
 
                 # Successful completion of stream
                 return result.response, result.reasoning
@@ -548,101 +606,6 @@ class LiteLLMChatWrapper(SimpleChatModel):
                 await asyncio.sleep(retry_delay_s)
 
 
-class AsyncAIChatReplacement:
-    class _Completions:
-        def __init__(self, wrapper):
-            self._wrapper = wrapper
-
-        async def create(self, *args, **kwargs):
-            # call the async _acall method on the wrapper
-            return await self._wrapper._acall(*args, **kwargs)
-
-    class _Chat:
-        def __init__(self, wrapper):
-            self.completions = AsyncAIChatReplacement._Completions(wrapper)
-
-    def __init__(self, wrapper, *args, **kwargs):
-        self._wrapper = wrapper
-        self.chat = AsyncAIChatReplacement._Chat(wrapper)
-
-
-from browser_use.llm import ChatOllama, ChatOpenRouter, ChatGoogle, ChatAnthropic, ChatGroq, ChatOpenAI
-
-class BrowserCompatibleChatWrapper(ChatOpenRouter):
-    """
-    A wrapper for browser agent that can filter/sanitize messages
-    before sending them to the LLM.
-    """
-
-    def __init__(self, *args, **kwargs):
-        turn_off_logging()
-        # Create the underlying LiteLLM wrapper
-        self._wrapper = LiteLLMChatWrapper(*args, **kwargs)
-        # Browser-use may expect a 'model' attribute
-        self.model = self._wrapper.model_name
-        self.kwargs = self._wrapper.kwargs
-
-    @property
-    def model_name(self) -> str:
-        return self._wrapper.model_name
-
-    @property
-    def provider(self) -> str:
-        return self._wrapper.provider
-
-    def get_client(self, *args, **kwargs):  # type: ignore
-        return AsyncAIChatReplacement(self, *args, **kwargs)
-
-    async def _acall(
-        self,
-        messages: List[BaseMessage],
-        stop: Optional[List[str]] = None,
-        run_manager: Optional[CallbackManagerForLLMRun] = None,
-        **kwargs: Any,
-    ):
-        # Apply rate limiting if configured
-        apply_rate_limiter_sync(self._wrapper.a0_model_conf, str(messages))
-
-        # Call the model
-        try:
-            model = kwargs.pop("model", None)
-            kwrgs = {**self._wrapper.kwargs, **kwargs}
-
-            # hack from browser-use to fix json schema for gemini (additionalProperties, $defs, $ref)
-            if "response_format" in kwrgs and "json_schema" in kwrgs["response_format"] and model.startswith("gemini/"):
-                kwrgs["response_format"]["json_schema"] = ChatGoogle("")._fix_gemini_schema(kwrgs["response_format"]["json_schema"])
-
-            resp = await acompletion(
-                model=self._wrapper.model_name,
-                messages=messages,
-                stop=stop,
-                **kwrgs,
-            )
-
-            # Gemini: strip triple backticks and conform schema
-            try:
-                msg = resp.choices[0].message # type: ignore
-                if self.provider == "gemini" and isinstance(getattr(msg, "content", None), str):
-                    cleaned = browser_use_monkeypatch.gemini_clean_and_conform(msg.content) # type: ignore
-                    if cleaned:
-                        msg.content = cleaned
-            except Exception:
-                pass
-
-        except Exception as e:
-            raise e
-
-        # another hack for browser-use post process invalid jsons
-        try:
-            if "response_format" in kwrgs and "json_schema" in kwrgs["response_format"] or "json_object" in kwrgs["response_format"]:
-                if resp.choices[0].message.content is not None and not resp.choices[0].message.content.startswith("{"): # type: ignore
-                    js = dirty_json.parse(resp.choices[0].message.content) # type: ignore
-                    resp.choices[0].message.content = dirty_json.stringify(js) # type: ignore
-        except Exception as e:
-            pass
-
-        return resp
-
 class LiteLLMEmbeddingWrapper(Embeddings):
     model_name: str
     kwargs: dict = {}
@@ -661,7 +624,7 @@ class LiteLLMEmbeddingWrapper(Embeddings):
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
+        apply_rate_limiter_sync(self.a0_model_conf, lambda: estimate_input_tokens(texts, self.a0_model_conf))
 
         resp = embedding(model=self.model_name, input=texts, **self.kwargs)
         return [
@@ -671,7 +634,7 @@ class LiteLLMEmbeddingWrapper(Embeddings):
 
     def embed_query(self, text: str) -> List[float]:
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, text)
+        apply_rate_limiter_sync(self.a0_model_conf, lambda: estimate_input_tokens([text], self.a0_model_conf))
 
         resp = embedding(model=self.model_name, input=[text], **self.kwargs)
         item = resp.data[0]  # type: ignore
@@ -706,20 +669,23 @@ class LocalSentenceTransformerWrapper(Embeddings):
         }
         st_kwargs = {k: v for k, v in (kwargs or {}).items() if k in st_allowed_keys}
 
+        # imports torch, only loaded when a local embedding model is used
+        from sentence_transformers import SentenceTransformer
+
         self.model = SentenceTransformer(model, **st_kwargs)
         self.model_name = model
         self.a0_model_conf = model_config
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, " ".join(texts))
+        apply_rate_limiter_sync(self.a0_model_conf, lambda: estimate_input_tokens(texts, self.a0_model_conf))
 
         embeddings = self.model.encode(texts, convert_to_tensor=False)  # type: ignore
         return embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings  # type: ignore
 
     def embed_query(self, text: str) -> List[float]:
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, text)
+        apply_rate_limiter_sync(self.a0_model_conf, lambda: estimate_input_tokens([text], self.a0_model_conf))
 
         embedding = self.model.encode([text], convert_to_tensor=False)  # type: ignore
         result = (
@@ -885,7 +851,9 @@ def get_chat_model(
 
 def get_browser_model(
     provider: str, name: str, model_config: Optional[ModelConfig] = None, **kwargs: Any
-) -> BrowserCompatibleChatWrapper:
+) -> "BrowserCompatibleChatWrapper":
+    from python.helpers.browser_model import BrowserCompatibleChatWrapper
+
     orig = provider.lower()
     provider_name, kwargs = _merge_provider_defaults("chat", orig, kwargs)
     return _get_litellm_chat(
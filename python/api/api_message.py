@@ -1,12 +1,13 @@
-import base64
+import asyncio
+import json
 import os
 from datetime import datetime, timedelta
 from agent import AgentContext, UserMessage, AgentContextType
 from python.helpers.api import ApiHandler, Request, Response
-from python.helpers import files
+from python.helpers import api_attachments
 from python.helpers.print_style import PrintStyle
-from werkzeug.utils import secure_filename
-from initialize import initialize_agent
+from python.helpers.context_pool import ContextPool
+from werkzeug.exceptions import RequestEntityTooLarge
 import threading
 
 
@@ -28,54 +29,47 @@ class ApiMessage(ApiHandler):
         return True  # Require API key
 
     async def process(self, input: dict, request: Request) -> dict | Response:
+        # Attachments are streamed to a folder of this request, multipart uploads while the
+        # body is received and base64 JSON attachments decoded in chunks, both off the event loop
+        upload = api_attachments.AttachmentUpload()
+        try:
+            try:
+                if request.mimetype == "multipart/form-data":
+                    input = await asyncio.to_thread(upload.receive_multipart, request.environ)
+                elif input.get("attachments"):
+                    for error in await asyncio.to_thread(upload.receive_base64, input["attachments"]):
+                        PrintStyle.error(error)
+            except RequestEntityTooLarge as e:
+                return Response(json.dumps({"error": e.description}), status=413, mimetype="application/json")
+
+            return await self._process(input, upload)
+        finally:
+            upload.discard()
+
+    async def _process(self, input: dict, upload: api_attachments.AttachmentUpload) -> dict | Response:
         # Extract parameters
         context_id = input.get("context_id", "")
         message = input.get("message", "")
-        attachments = input.get("attachments", [])
-        lifetime_hours = input.get("lifetime_hours", 24)  # Default 24 hours
+        try:
+            lifetime_hours = float(input.get("lifetime_hours", 24))  # Default 24 hours
+        except (TypeError, ValueError):
+            return Response('{"error": "lifetime_hours must be a number"}', status=400, mimetype="application/json")
 
         if not message:
             return Response('{"error": "Message is required"}', status=400, mimetype="application/json")
 
-        # Handle attachments (base64 encoded)
-        attachment_paths = []
-        if attachments:
-            upload_folder_int = "/a0/tmp/uploads"
-            upload_folder_ext = files.get_abs_path("tmp/uploads")
-            os.makedirs(upload_folder_ext, exist_ok=True)
-
-            for attachment in attachments:
-                if not isinstance(attachment, dict) or "filename" not in attachment or "base64" not in attachment:
-                    continue
-
-                try:
-                    filename = secure_filename(attachment["filename"])
-                    if not filename:
-                        continue
-
-                    # Decode base64 content
-                    file_content = base64.b64decode(attachment["base64"])
-
-                    # Save to temp file
-                    save_path = os.path.join(upload_folder_ext, filename)
-                    with open(save_path, "wb") as f:
-                        f.write(file_content)
-
-                    attachment_paths.append(os.path.join(upload_folder_int, filename))
-                except Exception as e:
-                    PrintStyle.error(f"Failed to process attachment {attachment.get('filename', 'unknown')}: {e}")
-                    continue
-
         # Get or create context
         if context_id:
             context = AgentContext.get(context_id)
             if not context:
                 return Response('{"error": "Context not found"}', status=404, mimetype="application/json")
         else:
-            config = initialize_agent()
-            context = AgentContext(config=config, type=AgentContextType.USER)
+            context = ContextPool.get_instance().acquire(type=AgentContextType.USER)
             context_id = context.id
 
+        # Attachments are kept with the chat and removed with it
+        attachment_paths = upload.move_to(context_id)
+
         # Update chat lifetime
         with self._cleanup_lock:
             self._chat_lifetimes[context_id] = datetime.now() + timedelta(hours=lifetime_hours)
@@ -132,8 +126,8 @@ class ApiMessage(ApiHandler):
                 try:
                     context = AgentContext.get(context_id)
                     if context:
-                        context.reset()
-                        AgentContext.remove(context_id)
+                        ContextPool.get_instance().release(context, delete_chat=False)
+                    api_attachments.remove_attachments(context_id)
                     del cls._chat_lifetimes[context_id]
                     PrintStyle().print(f"Cleaned up expired chat: {context_id}")
                 except Exception as e:
@@ -19,6 +19,13 @@ class BackupCreate(ApiHandler):
             exclude_patterns = input.get("exclude_patterns", [])
             include_hidden = input.get("include_hidden", False)
             backup_name = input.get("backup_name", "agent-zero-backup")
+            compression_level = input.get("compression_level", 6)
+            # zlib levels, anything else would fail the backup in the worker threads
+            try:
+                compression_level = min(max(int(compression_level), 0), 9)
+            except (TypeError, ValueError):
+                compression_level = 6
+            incremental = input.get("incremental", False)
 
             # Support legacy string patterns format for backward compatibility
             patterns_string = input.get("patterns", "")
@@ -40,7 +47,9 @@ class BackupCreate(ApiHandler):
                 include_patterns=include_patterns,
                 exclude_patterns=exclude_patterns,
                 include_hidden=include_hidden,
-                backup_name=backup_name
+                backup_name=backup_name,
+                compression_level=compression_level,
+                incremental=incremental
             )
 
             # Return file for download
@@ -0,0 +1,12 @@
+from python.helpers.api import ApiHandler, Input, Output, Request, Response
+from python.helpers.context_pool import ContextPool
+
+
+class ContextPoolStats(ApiHandler):
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET", "POST"]
+
+    async def process(self, input: Input, request: Request) -> Output:
+        return ContextPool.get_instance().stats()
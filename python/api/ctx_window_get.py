@@ -1,6 +1,6 @@
 from python.helpers.api import ApiHandler, Input, Output, Request, Response
 
-from python.helpers import tokens
+from python.helpers.context_window import ContextWindow
 
 
 class GetCtxWindow(ApiHandler):
@@ -8,11 +8,16 @@ class GetCtxWindow(ApiHandler):
         ctxid = input.get("context", [])
         context = self.get_context(ctxid)
         agent = context.streaming_agent or context.agent0
-        window = agent.get_data(agent.DATA_NAME_CTX_WINDOW)
-        if not window or not isinstance(window, dict):
-            return {"content": "", "tokens": 0}
+        window = agent.get_data(agent.DATA_NAME_CTX_WINDOW_LAZY)
+        if not window or not isinstance(window, ContextWindow):
+            # loaded chats only have the text and tokens saved with them
+            saved = agent.get_data(agent.DATA_NAME_CTX_WINDOW)
+            if not saved or not isinstance(saved, dict):
+                return {"content": "", "tokens": 0, "breakdown": {}}
+            return {"content": saved.get("text", ""), "tokens": saved.get("tokens", 0), "breakdown": {}}
 
-        text = window["text"]
-        tokens = window["tokens"]
-
-        return {"content": text, "tokens": tokens}
+        return {
+            "content": window.get_text(),
+            "tokens": window.get_tokens(),
+            "breakdown": window.get_breakdown(),
+        }
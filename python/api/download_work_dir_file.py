@@ -1,77 +1,111 @@
-import base64
-from io import BytesIO
 import mimetypes
 import os
 
 from flask import Response
 from python.helpers.api import ApiHandler, Input, Output, Request
-from python.helpers import files, runtime
+from python.helpers import runtime, rfc_files, zip_stream
 from python.api import file_info
 
 
-def stream_file_download(file_source, download_name, chunk_size=8192):
+def stream_rfc_file(file_path, download_name, request=None, ranges=True):
     """
-    Create a streaming response for file downloads that shows progress in browser.
+    Create a streaming response for a file read in chunks over RFC in development or from disk otherwise.
 
     Args:
-        file_source: Either a file path (str) or BytesIO object
+        file_path: Absolute path of the file
         download_name: Name for the downloaded file
-        chunk_size: Size of chunks to stream (default 8192 bytes)
+        request: Request with optional Range and If-Range headers
+        ranges: Whether the client can request byte ranges to resume the download
 
     Returns:
         Flask Response object with streaming content
     """
-    # Calculate file size for Content-Length header
-    if isinstance(file_source, str):
-        # File path - get size from filesystem
-        file_size = os.path.getsize(file_source)
-    elif isinstance(file_source, BytesIO):
-        # BytesIO object - get size from buffer
-        current_pos = file_source.tell()
-        file_source.seek(0, 2)  # Seek to end
-        file_size = file_source.tell()
-        file_source.seek(current_pos)  # Restore original position
-    else:
-        raise ValueError(f"Unsupported file source type: {type(file_source)}")
+    stat = rfc_files.get_file_stat(file_path)
+    file_size = stat["size"]
+    etag = f'"{stat["etag"]}"'
+
+    start, end = 0, file_size
+    byte_range = None
+    if ranges and request is not None:
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == etag:
+            byte_range = _parse_range(request.headers.get("Range", ""), file_size)
+    if byte_range:
+        start, end = byte_range
 
     def generate():
-        if isinstance(file_source, str):
-            # File path - open and stream from disk
-            with open(file_source, 'rb') as f:
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield chunk
-        elif isinstance(file_source, BytesIO):
-            # BytesIO object - stream from memory
-            file_source.seek(0)  # Ensure we're at the beginning
-            while True:
-                chunk = file_source.read(chunk_size)
-                if not chunk:
-                    break
-                yield chunk
-
-    # Detect content type based on file extension
+        yield from rfc_files.read_file_range(file_path, start, end - start, stat)
+
     content_type, _ = mimetypes.guess_type(download_name)
     if not content_type:
         content_type = 'application/octet-stream'
 
-    # Create streaming response with proper headers for immediate streaming
-    response = Response(
+    headers = {
+        'Content-Disposition': f'attachment; filename="{download_name}"',
+        'Content-Length': str(end - start),
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+        'Accept-Ranges': 'bytes' if ranges else 'none',
+    }
+    if ranges:
+        headers['ETag'] = etag
+    if byte_range:
+        headers['Content-Range'] = f'bytes {start}-{end - 1}/{file_size}'
+
+    return Response(
         generate(),
+        status=206 if byte_range else 200,
         content_type=content_type,
-        direct_passthrough=True,  # Prevent Flask from buffering the response
+        direct_passthrough=True,
+        headers=headers,
+    )
+
+
+def stream_zip_download(dir_path, download_name):
+    """
+    Create a streaming response for a directory zipped while it is sent, in development over binary RFC.
+
+    The archive size is not known ahead, the response has no Content-Length and cannot be resumed.
+    When the client disconnects the generator is closed and the zipping stops.
+
+    Args:
+        dir_path: Absolute path of the directory
+        download_name: Name for the downloaded file
+
+    Returns:
+        Flask Response object with streaming content
+    """
+    return Response(
+        runtime.stream_development_function_sync(zip_stream.stream_zip, dir_path),
+        content_type='application/zip',
+        direct_passthrough=True,
         headers={
             'Content-Disposition': f'attachment; filename="{download_name}"',
-            'Content-Length': str(file_size),  # Critical for browser progress bars
             'Cache-Control': 'no-cache',
-            'X-Accel-Buffering': 'no',  # Disable nginx buffering
-            'Accept-Ranges': 'bytes'  # Allow browser to resume downloads
-        }
+            'X-Accel-Buffering': 'no',
+            'Accept-Ranges': 'none',
+        },
     )
 
-    return response
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    # single "bytes=start-end" range, anything else is served whole
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last) + 1, size) if last else size
+        elif last:
+            start, end = max(size - int(last), 0), size
+        else:
+            return None
+    except ValueError:
+        return None
+    if start >= end:
+        return None
+    return start, end
 
 
 class DownloadFile(ApiHandler):
@@ -94,37 +128,16 @@ class DownloadFile(ApiHandler):
         if not file["exists"]:
             raise Exception(f"File {file_path} not found")
 
+        # files are streamed in chunks with range support, in development over binary RFC
         if file["is_dir"]:
-            zip_file = await runtime.call_development_function(files.zip_dir, file["abs_path"])
-            if runtime.is_development():
-                b64 = await runtime.call_development_function(fetch_file, zip_file)
-                file_data = BytesIO(base64.b64decode(b64))
-                return stream_file_download(
-                    file_data,
-                    download_name=os.path.basename(zip_file)
-                )
-            else:
-                return stream_file_download(
-                    zip_file,
-                    download_name=f"{os.path.basename(file_path)}.zip"
-                )
+            return stream_zip_download(
+                file["abs_path"],
+                download_name=f"{os.path.basename(file_path)}.zip",
+            )
         elif file["is_file"]:
-            if runtime.is_development():
-                b64 = await runtime.call_development_function(fetch_file, file["abs_path"])
-                file_data = BytesIO(base64.b64decode(b64))
-                return stream_file_download(
-                    file_data,
-                    download_name=os.path.basename(file_path)
-                )
-            else:
-                return stream_file_download(
-                    file["abs_path"],
-                    download_name=os.path.basename(file["file_name"])
-                )
+            return stream_rfc_file(
+                file["abs_path"],
+                download_name=os.path.basename(file["file_name"]),
+                request=request,
+            )
         raise Exception(f"File {file_path} not found")
-
-
-async def fetch_file(path):
-    with open(path, "rb") as file:
-        file_content = file.read()
-        return base64.b64encode(file_content).decode("utf-8")
@@ -19,11 +19,19 @@ class GetWorkDirFiles(ApiHandler):
 
         # browser = FileBrowser()
         # result = browser.get_files(current_path)
-        result = await runtime.call_development_function(get_files, current_path)
+        result = await runtime.call_development_function(
+            get_files,
+            current_path,
+            cursor=request.args.get("cursor", ""),
+            limit=int(request.args.get("limit", 0) or 0),
+            sort=request.args.get("sort", "name"),
+            direction=request.args.get("direction", "asc"),
+            filter=request.args.get("filter", ""),
+        )
 
         return {"data": result}
 
 
-async def get_files(path):
+async def get_files(path, cursor="", limit=0, sort="name", direction="asc", filter=""):
     browser = FileBrowser()
-    return browser.get_files(path)
+    return browser.get_files(path, cursor, limit, sort, direction, filter)
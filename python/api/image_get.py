@@ -1,8 +1,6 @@
-import base64
 import os
 from python.helpers.api import ApiHandler, Request, Response, send_file
-from python.helpers import files, runtime
-import io
+from python.helpers import files, runtime, rfc_files, thumbnails
 from mimetypes import guess_type
 
 
@@ -45,33 +43,51 @@ class ImageGet(ApiHandler):
         if file_ext in image_extensions:
 
             # in development environment, try to serve the image from local file system if exists, otherwise from docker
-            if runtime.is_development():
-                if files.exists(path):
-                    response = send_file(path)
-                elif await runtime.call_development_function(files.exists, path):
-                    b64_content = await runtime.call_development_function(
-                        files.read_file_base64, path
-                    )
-                    file_content = base64.b64decode(b64_content)
-                    mime_type, _ = guess_type(filename)
-                    if not mime_type:
-                        mime_type = "application/octet-stream"
-                    response = send_file(
-                        io.BytesIO(file_content),
-                        mimetype=mime_type,
-                        as_attachment=False,
-                        download_name=filename,
-                    )
-                else:
-                    response = _send_fallback_icon("image")
+            local = files.exists(path)
+            remote = (
+                not local
+                and runtime.is_development()
+                and await runtime.call_development_function(files.exists, path)
+            )
+            if not local and not remote:
+                response = _send_fallback_icon("image")
+                response.headers["Cache-Control"] = "no-cache"
+                response.headers["X-File-Type"] = "image"
+                response.headers["X-File-Name"] = filename
+                return response
+
+            # thumbnails are created and cached where the image is, in development in docker
+            size = _get_thumbnail_size(input, request)
+            if size:
+                get_info, args = thumbnails.get_thumbnail, (path, size)
             else:
-                if files.exists(path):
-                    response = send_file(path)
-                else:
-                    response = _send_fallback_icon("image")
+                get_info, args = thumbnails.get_image_info, (path,)
+            if remote:
+                info = await runtime.call_development_function(get_info, *args)
+            else:
+                info = get_info(*args)
+
+            etag = info["hash"]
+            mime_type = info.get("mime") or guess_type(filename)[0] or "application/octet-stream"
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            elif remote:
+                # stream the image in binary chunks over RFC
+                response = Response(
+                    rfc_files.read_file_range(info["path"], stat=info),
+                    mimetype=mime_type,
+                    direct_passthrough=True,
+                    headers={"Content-Length": str(info["size"])},
+                )
+            else:
+                response = send_file(info["path"], mimetype=mime_type, conditional=False, etag=False)
 
-            # Add cache headers for better device sync performance
-            response.headers["Cache-Control"] = "public, max-age=3600"
+            response.set_etag(etag)
+            # versioned urls (screenshots with a timestamp) never change, others are revalidated by etag
+            if request.args.get("t") or request.args.get("v"):
+                response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+            else:
+                response.headers["Cache-Control"] = "private, no-cache"
             response.headers["X-File-Type"] = "image"
             response.headers["X-File-Name"] = filename
             return response
@@ -80,6 +96,15 @@ class ImageGet(ApiHandler):
             return _send_file_type_icon(file_ext, filename)
 
 
+def _get_thumbnail_size(input: dict, request: Request) -> int:
+    """Requested thumbnail size, 0 for the full image"""
+    size = input.get("size", request.args.get("size", ""))
+    if size:
+        return max(int(size), 1)
+    thumb = str(input.get("thumb", request.args.get("thumb", "false"))).lower()
+    return thumbnails.DEFAULT_THUMBNAIL_SIZE if thumb == "true" else 0
+
+
 def _send_file_type_icon(file_ext, filename=None):
     """Return appropriate icon for file type"""
 
@@ -1,5 +1,5 @@
 from python.helpers.api import ApiHandler, Request, Response
-from python.helpers import files, memory
+from python.helpers import files
 import os
 from werkzeug.utils import secure_filename
 
@@ -9,6 +9,8 @@ class ImportKnowledge(ApiHandler):
         if "files[]" not in request.files:
             raise Exception("No files part")
 
+        from python.helpers import memory  # imports faiss, loaded on first use
+
         ctxid = request.form.get("ctxid", "")
         if not ctxid:
             raise Exception("No context id provided")
@@ -1,5 +1,4 @@
 from python.helpers.api import ApiHandler, Request, Response
-from python.helpers.memory import Memory
 from python.helpers import files
 from models import ModelConfig, ModelType
 from langchain_core.documents import Document
@@ -42,7 +41,7 @@ class MemoryDashboard(ApiHandler):
             if not memory_id:
                 return {"success": False, "error": "Memory ID is required for deletion"}
 
-            memory = await Memory.get_by_subdir(memory_subdir, preload_knowledge=False)
+            memory = await _get_memory(memory_subdir)
 
             rem = await memory.delete_documents_by_ids([memory_id])
 
@@ -79,7 +78,7 @@ class MemoryDashboard(ApiHandler):
                 }
 
             # delete
-            memory = await Memory.get_by_subdir(memory_subdir, preload_knowledge=False)
+            memory = await _get_memory(memory_subdir)
             rem = await memory.delete_documents_by_ids(memory_ids)
 
             if len(rem) == len(memory_ids):
@@ -161,38 +160,28 @@ class MemoryDashboard(ApiHandler):
             search_query = input.get("search", "")  # Full-text search query
             limit = input.get("limit", 100)  # Number of results to return
             threshold = input.get("threshold", 0.6)  # Similarity threshold
+            mode = input.get("mode", "hybrid")  # vector, lexical or hybrid search
+            cursor = input.get("cursor", "")  # Listing continues after this cursor
 
-            memory = await Memory.get_by_subdir(memory_subdir, preload_knowledge=False)
+            memory = await _get_memory(memory_subdir)
+            filter = f"area == '{area_filter}'" if area_filter else ""
 
             memories = []
+            next_cursor = ""
 
             if search_query:
-                docs = await memory.search_similarity_threshold(
+                memories = await memory.search(
                     query=search_query,
                     limit=limit,
                     threshold=threshold,
-                    filter=f"area == '{area_filter}'" if area_filter else "",
+                    filter=filter,
+                    mode=mode,
                 )
-                memories = docs
             else:
-                # If no search query, get all memories from specified area(s)
-                all_docs = memory.db.get_all_docs()
-                for doc_id, doc in all_docs.items():
-                    # Apply area filter if specified
-                    if area_filter and doc.metadata.get("area", "") != area_filter:
-                        continue
-                    memories.append(doc)
-
-                # sort by timestamp
-                def get_sort_key(m):
-                    timestamp = m.metadata.get("timestamp", "0000-00-00 00:00:00")
-                    return timestamp
-
-                memories.sort(key=get_sort_key, reverse=True)
-
-                # Apply limit AFTER sorting to get the newest entries
-                if limit and len(memories) > limit:
-                    memories = memories[:limit]
+                # If no search query, list newest memories from the timestamp index
+                memories, next_cursor = memory.list_documents(
+                    limit=limit, cursor=cursor, filter=filter
+                )
 
             # Format memories for the dashboard
             formatted_memories = [self._format_memory_for_dashboard(m) for m in memories]
@@ -215,6 +204,8 @@ class MemoryDashboard(ApiHandler):
                 "knowledge_count": knowledge_count,
                 "conversation_count": conversation_count,
                 "search_query": search_query,
+                "search_mode": mode,
+                "next_cursor": next_cursor,
                 "area_filter": area_filter,
                 "memory_subdir": memory_subdir,
             }
@@ -254,7 +245,7 @@ class MemoryDashboard(ApiHandler):
                 metadata=edited["metadata"],
             )
 
-            memory = await Memory.get_by_subdir(memory_subdir, preload_knowledge=False)
+            memory = await _get_memory(memory_subdir)
             id = (await memory.update_documents([doc]))[0]
             doc = memory.get_document_by_id(id)
             formatted_doc = self._format_memory_for_dashboard(doc) if doc else None
@@ -262,3 +253,9 @@ class MemoryDashboard(ApiHandler):
             return {"success": formatted_doc is not None, "memory": formatted_doc}
         except Exception as e:
             return {"success": False, "error": str(e), "memory": None}
+
+
+async def _get_memory(memory_subdir: str):
+    # faiss and the vector store are imported on first use, not at server start
+    from python.helpers.memory import Memory
+    return await Memory.get_by_subdir(memory_subdir, preload_knowledge=False)
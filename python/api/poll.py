@@ -41,7 +41,8 @@ class Poll(ApiHandler):
         tasks = []
         processed_contexts = set()  # Track processed context IDs
 
-        all_ctxs = list(AgentContext._contexts.values())
+        # saved chats not opened since the start are listed from the chat index without loading them
+        all_ctxs = AgentContext.listed()
         # First, identify all tasks
         for ctx in all_ctxs:
             # Skip if already processed
@@ -0,0 +1,31 @@
+from python.helpers.api import ApiHandler, Request, Response
+
+from python.helpers import runtime
+from python.helpers.errors import format_error
+from python.helpers.print_style import PrintStyle
+
+
+class RFCStream(ApiHandler):
+    """Binary streaming variant of /rfc, request and response bodies are HMAC-chained frames."""
+
+    @classmethod
+    def requires_csrf(cls) -> bool:
+        return False
+
+    @classmethod
+    def requires_auth(cls) -> bool:
+        return False
+
+    async def handle_request(self, request: Request) -> Response:
+        try:
+            # body is read frame by frame, never as a whole
+            frames = await runtime.handle_rfc_stream(request.stream)
+            return Response(frames, mimetype="application/octet-stream")
+        except Exception as e:
+            error = format_error(e)
+            PrintStyle.error(f"RFC stream error: {error}")
+            return Response(response=error, status=500, mimetype="text/plain")
+
+    async def process(self, input: dict, request: Request) -> dict | Response:
+        # the body is a frame stream, not parsed input
+        return await self.handle_request(request)
@@ -0,0 +1,12 @@
+from python.helpers.api import ApiHandler, Input, Output, Request, Response
+from python.helpers import searxng
+
+
+class SearchCacheStats(ApiHandler):
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET", "POST"]
+
+    async def process(self, input: Input, request: Request) -> Output:
+        return searxng.get_stats()
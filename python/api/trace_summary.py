@@ -0,0 +1,18 @@
+from python.helpers.api import ApiHandler, Input, Output, Request, Response
+
+from python.helpers import tracing
+
+
+class TraceSummary(ApiHandler):
+    async def process(self, input: Input, request: Request) -> Output:
+        ctxid = input.get("context", "")
+        context = self.get_context(ctxid)
+
+        # full spans of the context for Perfetto or chrome://tracing
+        if input.get("format", "") == "chrome":
+            return tracing.get_chrome_trace(context.id)
+
+        return {
+            "enabled": tracing.is_enabled(),
+            "iterations": tracing.get_summary(context.id, int(input.get("iterations", 5))),
+        }
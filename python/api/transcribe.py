@@ -1,9 +1,11 @@
 from python.helpers.api import ApiHandler, Request, Response
 
-from python.helpers import runtime, settings, whisper
+from python.helpers import runtime, settings
 
 class Transcribe(ApiHandler):
     async def process(self, input: dict, request: Request) -> dict | Response:
+        from python.helpers import whisper  # imports torch, loaded on first use
+
         audio = input.get("audio")
         # ctxid = input.get("ctxid", "")
 
@@ -1,8 +1,9 @@
-import base64
+import asyncio
 from werkzeug.datastructures import FileStorage
 from python.helpers.api import ApiHandler, Request, Response
 from python.helpers.file_browser import FileBrowser
-from python.helpers import files, runtime
+from python.helpers.print_style import PrintStyle
+from python.helpers import files, runtime, rfc_files
 from python.api import get_work_dir_files
 import os
 
@@ -43,13 +44,17 @@ async def upload_files(uploaded_files: list[FileStorage], current_path: str):
         successful = []
         failed = []
         for file in uploaded_files:
-            file_content = file.stream.read()
-            base64_content = base64.b64encode(file_content).decode("utf-8")
-            if await runtime.call_development_function(
-                upload_file, current_path, file.filename, base64_content
-            ):
+            try:
+                # stream the upload in chunks instead of sending it as base64
+                target_file = await runtime.call_development_function(
+                    get_target_file, current_path, file.filename
+                )
+                await asyncio.to_thread(
+                    rfc_files.write_file_resumable, target_file, file.stream
+                )
                 successful.append(file.filename)
-            else:
+            except Exception as e:
+                PrintStyle.error(f"Error saving file {file.filename}: {e}")
                 failed.append(file.filename)
     else:
         browser = FileBrowser()
@@ -58,7 +63,7 @@ async def upload_files(uploaded_files: list[FileStorage], current_path: str):
     return successful, failed
 
 
-async def upload_file(current_path: str, filename: str, base64_content: str):
+async def get_target_file(current_path: str, filename: str):
     browser = FileBrowser()
-    return browser.save_file_b64(current_path, filename, base64_content)
+    return browser.get_target_file(current_path, filename)
 
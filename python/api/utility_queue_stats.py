@@ -0,0 +1,12 @@
+from python.helpers.api import ApiHandler, Input, Output, Request, Response
+from python.helpers.utility_scheduler import UtilityScheduler
+
+
+class UtilityQueueStats(ApiHandler):
+
+    @classmethod
+    def get_methods(cls) -> list[str]:
+        return ["GET", "POST"]
+
+    async def process(self, input: Input, request: Request) -> Output:
+        return UtilityScheduler.get_instance().stats()
@@ -12,7 +12,8 @@ class OrganizeHistory(Extension):
         if task and not task.done():
             return
 
-        # start task
-        task = asyncio.create_task(self.agent.history.compress())
+        # start task, over the soft limit it compresses ahead so the next prompts do not wait
+        history = self.agent.history
+        task = asyncio.create_task(history.compress(history.get_compress_target()))
         # set to agent to be able to wait for it
         self.agent.set_data(DATA_NAME_TASK, task)
@@ -4,6 +4,7 @@ from python.helpers.memory import Memory
 from agent import LoopData
 from python.tools.memory_load import DEFAULT_THRESHOLD as DEFAULT_MEMORY_THRESHOLD
 from python.helpers import dirty_json, errors, settings, log 
+from python.helpers.utility_scheduler import UtilityPriority
 
 
 DATA_NAME_TASK = "_recall_memories_task"
@@ -84,6 +85,7 @@ class RecallMemories(Extension):
                     system=system,
                     message=message,
                     callback=log_callback,
+                    priority=UtilityPriority.RECALL,
                 )
                 query = query.strip()
             except Exception as e:
@@ -151,6 +153,7 @@ class RecallMemories(Extension):
                         history=history,
                         message=user_instruction,
                     ),
+                    priority=UtilityPriority.RECALL,
                 )
                 filter_inds = dirty_json.try_parse(filter)
 
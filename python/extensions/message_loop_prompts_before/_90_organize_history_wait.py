@@ -25,5 +25,6 @@ class OrganizeHistoryWait(Extension):
             else:
                 # no task running, start and wait
                 self.agent.context.log.set_progress("Compressing history...")
-                await self.agent.history.compress()
+                if not await self.agent.history.compress():
+                    break  # nothing left to compress
 
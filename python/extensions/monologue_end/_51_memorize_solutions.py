@@ -5,6 +5,7 @@ from python.helpers.memory import Memory
 from python.helpers.dirty_json import DirtyJson
 from agent import LoopData
 from python.helpers.log import LogItem
+from python.helpers.utility_scheduler import UtilityPriority
 from python.tools.memory_load import DEFAULT_THRESHOLD as DEFAULT_MEMORY_THRESHOLD
 
 
@@ -48,6 +49,7 @@ class MemorizeSolutions(Extension):
             message=msgs_text,
             callback=log_callback,
             background=True,
+            priority=UtilityPriority.MEMORIZE,
         )
 
         # Add validation and error handling for solutions_json
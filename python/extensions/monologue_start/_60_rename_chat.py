@@ -1,8 +1,12 @@
 from python.helpers import persist_chat, tokens
 from python.helpers.extension import Extension
+from python.helpers.utility_scheduler import UtilityPriority
 from agent import LoopData
 import asyncio
 
+RENAME_MIN_CHANGE = 1000  # characters of new history before the chat is renamed again
+DATA_NAME_RENAME_HISTORY = "_rename_history_len"
+
 
 class RenameChat(Extension):
 
@@ -13,10 +17,24 @@ class RenameChat(Extension):
         try:
             # prepare history
             history_text = self.agent.history.output_text()
+            # skip when the conversation has not moved on since the last rename
+            last_len = self.agent.get_data(DATA_NAME_RENAME_HISTORY)
+            if (
+                self.agent.context.name
+                and last_len is not None
+                and abs(len(history_text) - last_len) < RENAME_MIN_CHANGE
+            ):
+                return
+            self.agent.set_data(DATA_NAME_RENAME_HISTORY, len(history_text))
             ctx_length = min(
                 int(self.agent.config.utility_model.ctx_length * 0.7), 5000
             )
-            history_text = tokens.trim_to_tokens(history_text, ctx_length, "start")
+            history_text = tokens.trim_to_tokens(
+                history_text,
+                ctx_length,
+                "start",
+                encoding_name=tokens.get_encoding_name(self.agent.config.utility_model),
+            )
             # prepare system and user prompt
             system = self.agent.read_prompt("fw.rename_chat.sys.md")
             current_name = self.agent.context.name
@@ -25,7 +43,11 @@ class RenameChat(Extension):
             )
             # call utility model
             new_name = await self.agent.call_utility_model(
-                system=system, message=message, background=True
+                system=system,
+                message=message,
+                background=True,
+                priority=UtilityPriority.RENAME,
+                key="rename",
             )
             # update name
             if new_name:
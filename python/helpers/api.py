@@ -56,6 +56,9 @@ class ApiHandler:
                     # Just log the error and continue with empty input
                     PrintStyle().print(f"Error parsing JSON: {str(e)}")
                     input_data = {}
+            elif request.mimetype == "multipart/form-data":
+                # fields and files are parsed by the handler, the body is not read into memory here
+                input_data = {}
             else:
                 input_data = {"data": request.get_data(as_text=True)}
 
@@ -0,0 +1,188 @@
+import base64
+import io
+import os
+import re
+import shutil
+import uuid
+from typing import Any
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser
+from werkzeug.utils import secure_filename
+
+from python.helpers import files
+
+# attachments of external API messages, a folder per chat with a subfolder per request
+UPLOADS_FOLDER = "tmp/uploads/api"
+UPLOADS_FOLDER_INT = "/a0/tmp/uploads/api"
+# requests are received here before their chat is known
+INCOMING_FOLDER = "_incoming"
+MAX_ATTACHMENT_SIZE = 100 * 1024 * 1024
+MAX_REQUEST_SIZE = 250 * 1024 * 1024  # all attachments of one request
+MAX_FORM_MEMORY_SIZE = 10 * 1024 * 1024  # text fields of a multipart request
+MAX_FORM_PARTS = 1000
+# base64 characters decoded at once, a multiple of 4
+BASE64_CHUNK_SIZE = 4 * 1024 * 1024
+
+_WHITESPACE = re.compile(r"\s")
+
+
+class _AttachmentFile(io.FileIO):
+    """File the multipart parser writes an attachment to, counted against the limits."""
+
+    def __init__(self, path: str, upload: "AttachmentUpload"):
+        super().__init__(path, "w+")
+        self.upload = upload
+        self.size = 0
+
+    def write(self, data) -> int:  # type: ignore[override]
+        self.size += len(data)
+        self.upload.size += len(data)
+        self.upload.check_size(self.size, self.name)  # type: ignore[arg-type]
+        return super().write(data)
+
+
+class AttachmentUpload:
+    """
+    Attachments of one API request, written to disk while they are received.
+
+    Each request gets its own folder, files of concurrent requests with the same name never
+    collide. The folder is moved under the chat with move_to once the chat is known, and
+    removed with the chat by remove_attachments. Receiving blocks, run it in a thread.
+    """
+
+    def __init__(
+        self,
+        max_attachment_size: int = MAX_ATTACHMENT_SIZE,
+        max_request_size: int = MAX_REQUEST_SIZE,
+    ):
+        self.id = uuid.uuid4().hex
+        self.folder = files.get_abs_path(UPLOADS_FOLDER, INCOMING_FOLDER, self.id)
+        self.filenames: list[str] = []
+        self.size = 0
+        self.max_attachment_size = max_attachment_size
+        self.max_request_size = max_request_size
+        self._files: list[_AttachmentFile] = []
+
+    def check_size(self, file_size: int, path: str, pending: int = 0):
+        """Refuse the request over the limits, pending bytes are about to be written"""
+        if file_size > self.max_attachment_size:
+            raise RequestEntityTooLarge(
+                f"Attachment {os.path.basename(path)} is larger than {_format_mb(self.max_attachment_size)}"
+            )
+        if self.size + pending > self.max_request_size:
+            raise RequestEntityTooLarge(
+                f"Attachments are larger than {_format_mb(self.max_request_size)} in total"
+            )
+
+    def receive_multipart(self, environ: dict[str, Any]) -> dict[str, str]:
+        """
+        Parse a multipart request from its input stream, returns the text fields.
+
+        Every file part is an attachment, its chunks are written as they arrive and the
+        limits are checked on each write, the request body is never held in memory.
+        """
+        parser = FormDataParser(
+            stream_factory=self._stream_factory,  # type: ignore[arg-type]
+            max_form_memory_size=MAX_FORM_MEMORY_SIZE,
+            max_content_length=self.max_request_size + MAX_FORM_MEMORY_SIZE,
+            max_form_parts=MAX_FORM_PARTS,
+        )
+        try:
+            _, form, _ = parser.parse_from_environ(environ)
+        finally:
+            self._close_files()
+        return form.to_dict()
+
+    def receive_base64(self, attachments: list[Any]) -> list[str]:
+        """
+        Decode {filename, base64} attachments of a JSON request in chunks, returns errors of skipped items.
+
+        Sizes are checked before decoding, the decoded content is written chunk by chunk.
+        """
+        errors = []
+        for attachment in attachments:
+            if not isinstance(attachment, dict) or "filename" not in attachment or "base64" not in attachment:
+                continue
+            data = attachment["base64"]
+            if not isinstance(data, str) or not secure_filename(str(attachment["filename"])):
+                continue
+            if _WHITESPACE.search(data):
+                data = _WHITESPACE.sub("", data)
+            # the decoded size is known up front, oversized requests are refused before writing
+            size = len(data) * 3 // 4 - data.count("=", -2)
+            self.check_size(size, str(attachment["filename"]), pending=size)
+
+            file = self._open(str(attachment["filename"]))
+            try:
+                with file:
+                    for start in range(0, len(data), BASE64_CHUNK_SIZE):
+                        file.write(base64.b64decode(data[start : start + BASE64_CHUNK_SIZE]))
+            except RequestEntityTooLarge:
+                raise
+            except Exception as e:
+                os.remove(file.name)  # type: ignore[arg-type]
+                self.filenames.remove(os.path.basename(file.name))  # type: ignore[arg-type]
+                errors.append(f"Failed to process attachment {attachment['filename']}: {e}")
+        self._files.clear()
+        return errors
+
+    def move_to(self, context_id: str) -> list[str]:
+        """Move the received files under the chat, returns their paths for the agent"""
+        if not self.filenames:
+            return []
+        target = get_folder(context_id, self.id)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(self.folder, target)
+        self.folder = target
+        folder_int = f"{UPLOADS_FOLDER_INT}/{secure_filename(context_id)}/{self.id}"
+        return [f"{folder_int}/{name}" for name in self.filenames]
+
+    def discard(self):
+        """Remove files of a request that was refused or failed before reaching the chat"""
+        self._close_files()
+        if os.path.dirname(self.folder) == files.get_abs_path(UPLOADS_FOLDER, INCOMING_FOLDER):
+            shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _stream_factory(
+        self,
+        total_content_length: int | None,
+        content_type: str | None,
+        filename: str | None,
+        content_length: int | None = None,
+    ) -> _AttachmentFile:
+        if content_length is not None:
+            self.check_size(content_length, filename or "", pending=content_length)
+        return self._open(filename or "")
+
+    def _open(self, filename: str) -> _AttachmentFile:
+        name = secure_filename(filename) or "attachment"
+        stem, ext = os.path.splitext(name)
+        number = 1
+        while name in self.filenames:
+            number += 1
+            name = f"{stem}_{number}{ext}"
+        self.filenames.append(name)
+        os.makedirs(self.folder, exist_ok=True)
+        file = _AttachmentFile(os.path.join(self.folder, name), self)
+        self._files.append(file)
+        return file
+
+    def _close_files(self):
+        for file in self._files:
+            file.close()
+        self._files.clear()
+
+
+def get_folder(context_id: str, *parts: str) -> str:
+    return files.get_abs_path(UPLOADS_FOLDER, secure_filename(context_id), *parts)
+
+
+def remove_attachments(context_id: str):
+    """Remove all API attachments of a chat"""
+    if secure_filename(context_id):
+        shutil.rmtree(get_folder(context_id), ignore_errors=True)
+
+
+def _format_mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.0f} MB"
@@ -1,15 +1,19 @@
+import asyncio
 import zipfile
 import json
 import os
+import re
 import tempfile
 import datetime
 import platform
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 
 from pathspec import PathSpec
 from pathspec.patterns.gitwildmatch import GitWildMatchPattern
 
-from python.helpers import files, runtime, git
+from python.helpers import files, runtime, git, backup_store
 from python.helpers.print_style import PrintStyle
 
 
@@ -21,6 +25,7 @@ class BackupService:
     - JSON-based metadata with user-editable path specifications
     - Comprehensive system information collection
     - Checksum validation for integrity
+    - Incremental snapshots of content addressed chunks, zip backups stay restorable
     - RFC compatibility through existing file helpers
     - Git version integration consistent with main application
     """
@@ -48,7 +53,8 @@ class BackupService:
             "exclude_patterns": exclude_patterns,
             "backup_config": {
                 "compression_level": 6,
-                "integrity_check": True
+                "integrity_check": True,
+                "incremental": False
             }
         }
 
@@ -209,6 +215,35 @@ class BackupService:
         relative_path = file_path.lstrip('/')
         return relative_path in explicit_patterns
 
+    def _get_walk_prefixes(self, include_patterns: List[str]) -> Optional[List[str]]:
+        """Get directories that can contain files matched by include patterns, None if any directory can"""
+        prefixes = []
+
+        for pattern in include_patterns:
+            pattern = pattern.rstrip('/')
+
+            # Patterns without a leading or middle slash match at any depth
+            if '/' not in pattern:
+                return None
+
+            # Literal part up to the first wildcard, cut to its directory
+            literal = re.split(r"[*?\[\\]", pattern, maxsplit=1)[0]
+            if literal != pattern:
+                literal = literal[:literal.rfind('/')] if '/' in literal else ""
+
+            if not literal.strip('/'):
+                return None
+            prefixes.append('/' + literal.strip('/'))
+
+        return prefixes
+
+    def _may_contain_matches(self, dir_path: str, prefixes: List[str]) -> bool:
+        """Check if a directory is on the way to or inside a walk prefix"""
+        return any(
+            prefix == dir_path or prefix.startswith(dir_path + '/') or dir_path.startswith(prefix + '/')
+            for prefix in prefixes
+        )
+
     def _translate_patterns(self, patterns: List[str], backup_metadata: Dict[str, Any]) -> List[str]:
         """Translate patterns from backed up system to current system.
 
@@ -272,6 +307,9 @@ class BackupService:
         # Get explicit patterns for hidden file handling
         explicit_patterns = self._get_explicit_patterns(include_patterns)
 
+        # Directories outside of include pattern prefixes are not walked
+        walk_prefixes = self._get_walk_prefixes(include_patterns)
+
         matched_files = []
         processed_count = 0
 
@@ -283,7 +321,8 @@ class BackupService:
                 if not os.path.exists(base_real_path):
                     continue
 
-                for root, dirs, files_list in os.walk(base_real_path):
+                # Directory listings are cached, repeated previews only stat directories
+                for root, dirs, files_list in _walk(base_real_path):
                     # Filter hidden directories if not included, BUT allow explicit ones
                     if not include_hidden:
                         dirs_to_keep = []
@@ -298,6 +337,9 @@ class BackupService:
                                     dirs_to_keep.append(d)
                         dirs[:] = dirs_to_keep
 
+                    if walk_prefixes is not None:
+                        dirs[:] = [d for d in dirs if self._may_contain_matches(os.path.join(root, d), walk_prefixes)]
+
                     for file in files_list:
                         if processed_count >= max_files:
                             break
@@ -344,9 +386,16 @@ class BackupService:
         include_patterns: List[str],
         exclude_patterns: List[str],
         include_hidden: bool = False,
-        backup_name: str = "agent-zero-backup"
+        backup_name: str = "agent-zero-backup",
+        compression_level: int = 6,
+        incremental: bool = False
     ) -> str:
-        """Create backup archive and return path to created file"""
+        """Create backup archive and return path to created file.
+
+        Files are stored as a snapshot in the local backup store first, unchanged files and
+        chunks are reused from earlier snapshots. The archive contains the snapshot manifest and
+        its chunks, an incremental one only the chunks missing in the previous snapshot.
+        """
 
         # Create metadata for test_patterns
         metadata = {
@@ -366,64 +415,64 @@ class BackupService:
         zip_path = os.path.join(temp_dir, f"{backup_name}.zip")
 
         try:
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Add comprehensive metadata
-                metadata = {
-                    # Basic backup information
-                    "agent_zero_version": self.agent_zero_version,
-                    "timestamp": datetime.datetime.now().isoformat(),
-                    "backup_name": backup_name,
-                    "include_hidden": include_hidden,
-
-                    # Pattern arrays for granular control during restore
+            # Store changed files, compressed in parallel
+            manifest = await asyncio.to_thread(
+                backup_store.create_snapshot, matched_files, compression_level
+            )
+            stored_paths = {entry["path"] for entry in manifest["files"]}
+            matched_files = [f for f in matched_files if f["path"] in stored_paths]
+
+            # Add comprehensive metadata
+            metadata = {
+                # Basic backup information
+                "agent_zero_version": self.agent_zero_version,
+                "timestamp": datetime.datetime.now().isoformat(),
+                "backup_name": backup_name,
+                "include_hidden": include_hidden,
+                "backup_format": backup_store.SNAPSHOT_FORMAT,
+                "snapshot_id": manifest["id"],
+
+                # Pattern arrays for granular control during restore
+                "include_patterns": include_patterns,
+                "exclude_patterns": exclude_patterns,
+
+                # System and environment information
+                "system_info": await self._get_system_info(),
+                "environment_info": await self._get_environment_info(),
+                "backup_author": await self._get_backup_author(),
+
+                # Backup configuration
+                "backup_config": {
                     "include_patterns": include_patterns,
                     "exclude_patterns": exclude_patterns,
+                    "include_hidden": include_hidden,
+                    "compression_level": compression_level,
+                    "integrity_check": True,
+                    "incremental": incremental,
+                    "chunk_size": manifest["chunk_size"]
+                },
+
+                # File information
+                "files": [
+                    {
+                        "path": f["path"],
+                        "size": f["size"],
+                        "modified": f["modified"],
+                        "type": "file"
+                    }
+                    for f in matched_files
+                ],
+
+                # Statistics
+                "total_files": len(matched_files),
+                "backup_size": sum(f["size"] for f in matched_files),
+                "directory_count": self._count_directories(matched_files),
+                "snapshot_stats": manifest["stats"],
+            }
 
-                    # System and environment information
-                    "system_info": await self._get_system_info(),
-                    "environment_info": await self._get_environment_info(),
-                    "backup_author": await self._get_backup_author(),
-
-                    # Backup configuration
-                    "backup_config": {
-                        "include_patterns": include_patterns,
-                        "exclude_patterns": exclude_patterns,
-                        "include_hidden": include_hidden,
-                        "compression_level": 6,
-                        "integrity_check": True
-                    },
-
-                    # File information
-                    "files": [
-                        {
-                            "path": f["path"],
-                            "size": f["size"],
-                            "modified": f["modified"],
-                            "type": "file"
-                        }
-                        for f in matched_files
-                    ],
-
-                    # Statistics
-                    "total_files": len(matched_files),
-                    "backup_size": sum(f["size"] for f in matched_files),
-                    "directory_count": self._count_directories(matched_files),
-                }
-
-                zipf.writestr("metadata.json", json.dumps(metadata, indent=2))
-
-                # Add files
-                for file_info in matched_files:
-                    real_path = file_info["real_path"]
-                    archive_path = file_info["path"].lstrip('/')
-
-                    try:
-                        if os.path.exists(real_path) and os.path.isfile(real_path):
-                            zipf.write(real_path, archive_path)
-                    except (OSError, IOError) as e:
-                        # Log error but continue with other files
-                        PrintStyle().warning(f"Warning: Could not backup file {real_path}: {e}")
-                        continue
+            await asyncio.to_thread(
+                backup_store.write_archive, zip_path, metadata, manifest, incremental
+            )
 
             return zip_path
 
@@ -443,17 +492,15 @@ class BackupService:
         try:
             backup_file.save(temp_file)
 
-            with zipfile.ZipFile(temp_file, 'r') as zipf:
+            with backup_store.BackupArchive(temp_file) as archive:
                 # Read metadata
-                if "metadata.json" not in zipf.namelist():
+                if not archive.metadata:
                     raise Exception("Invalid backup file: missing metadata.json")
 
-                metadata_content = zipf.read("metadata.json").decode('utf-8')
-                metadata = json.loads(metadata_content)
+                metadata = archive.metadata
 
-                # Add file list from archive
-                files_in_archive = [name for name in zipf.namelist() if name != "metadata.json"]
-                metadata["files_in_archive"] = files_in_archive
+                # Add file list from archive (manifest paths for snapshots)
+                metadata["files_in_archive"] = archive.names()
 
                 return metadata
 
@@ -489,19 +536,15 @@ class BackupService:
         try:
             backup_file.save(temp_file)
 
-            with zipfile.ZipFile(temp_file, 'r') as zipf:
+            with backup_store.BackupArchive(temp_file) as archive:
                 # Read backup metadata from archive
-                original_backup_metadata = {}
-                if "metadata.json" in zipf.namelist():
-                    metadata_content = zipf.read("metadata.json").decode('utf-8')
-                    original_backup_metadata = json.loads(metadata_content)
+                original_backup_metadata = archive.metadata
 
                 # Use user-edited metadata if provided, otherwise fall back to original
                 backup_metadata = user_edited_metadata if user_edited_metadata else original_backup_metadata
 
                 # Get files from archive (excluding metadata files)
-                archive_files = [name for name in zipf.namelist()
-                                 if name not in ["metadata.json", "checksums.json"]]
+                archive_files = archive.names()
 
                 # Create pathspec for restore patterns if provided
                 restore_spec = None
@@ -620,16 +663,14 @@ class BackupService:
         skipped_files = []
         errors = []
         deleted_files = []
+        files_to_extract = []
 
         try:
             backup_file.save(temp_file)
 
-            with zipfile.ZipFile(temp_file, 'r') as zipf:
+            with backup_store.BackupArchive(temp_file) as archive:
                 # Read backup metadata from archive
-                original_backup_metadata = {}
-                if "metadata.json" in zipf.namelist():
-                    metadata_content = zipf.read("metadata.json").decode('utf-8')
-                    original_backup_metadata = json.loads(metadata_content)
+                original_backup_metadata = archive.metadata
 
                 # Use user-edited metadata if provided, otherwise fall back to original
                 backup_metadata = user_edited_metadata if user_edited_metadata else original_backup_metadata
@@ -657,8 +698,7 @@ class BackupService:
                             })
 
                 # Get files from archive (excluding metadata files)
-                archive_files = [name for name in zipf.namelist()
-                                 if name not in ["metadata.json", "checksums.json"]]
+                archive_files = archive.names()
 
                 # Create pathspec for restore patterns if provided
                 restore_spec = None
@@ -725,23 +765,39 @@ class BackupService:
                         if target_dir:
                             os.makedirs(target_dir, exist_ok=True)
 
-                        # Extract file
-                        import shutil
-                        with zipf.open(archive_path) as source, open(target_path, 'wb') as target:
-                            shutil.copyfileobj(source, target)
+                        files_to_extract.append((archive_path, original_path, target_path))
 
-                        restored_files.append({
-                            "archive_path": archive_path,
+                    except Exception as e:
+                        errors.append({
+                            "path": archive_path,
                             "original_path": original_path,
-                            "target_path": target_path,
-                            "status": "restored"
+                            "error": str(e)
                         })
 
+                # Extract files in parallel, chunks are decompressed and verified by worker threads
+                extract_errors = await asyncio.to_thread(
+                    archive.extract_many,
+                    [(archive_path, target_path) for archive_path, _, target_path in files_to_extract]
+                )
+                if archive.is_snapshot:
+                    # later incremental archives based on this one need its chunks in the store
+                    try:
+                        await asyncio.to_thread(archive.import_to_store)
                     except Exception as e:
+                        PrintStyle().warning(f"Warning: Could not add the snapshot to the backup store: {e}")
+                for (archive_path, original_path, target_path), error in zip(files_to_extract, extract_errors):
+                    if error:
                         errors.append({
                             "path": archive_path,
                             "original_path": original_path,
-                            "error": str(e)
+                            "error": str(error)
+                        })
+                    else:
+                        restored_files.append({
+                            "archive_path": archive_path,
+                            "original_path": original_path,
+                            "target_path": target_path,
+                            "status": "restored"
                         })
 
                 return {
@@ -854,3 +910,56 @@ class BackupService:
         except Exception:
             # If pattern testing fails, return empty list to avoid breaking restore
             return []
+
+
+# cached directory listings of pattern walks, limited by the number of directories
+WALK_CACHE_DIRS = 50_000
+
+_walk_cache: "OrderedDict[str, tuple[int, List[str], List[str]]]" = OrderedDict()
+_walk_cache_lock = threading.Lock()
+
+
+def _walk(top: str):
+    """os.walk (top-down, symlinked directories not followed) with listings cached by directory mtime"""
+    try:
+        dirs, files_list = _list_directory(top)
+    except OSError:
+        return
+
+    # Copies, the caller prunes dirs in place like with os.walk
+    dirs = list(dirs)
+    yield top, dirs, list(files_list)
+
+    for d in dirs:
+        yield from _walk(os.path.join(top, d))
+
+
+def _list_directory(path: str) -> tuple[List[str], List[str]]:
+    # listings are valid while the directory mtime is unchanged (entries added, removed or renamed)
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _walk_cache_lock:
+        cached = _walk_cache.get(path)
+        if cached and cached[0] == mtime_ns:
+            _walk_cache.move_to_end(path)
+            return cached[1], cached[2]
+
+    dirs: List[str] = []
+    files_list: List[str] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        dirs.append(entry.name)
+                else:
+                    files_list.append(entry.name)
+            except OSError:
+                # Skip entries we can't access
+                continue
+
+    with _walk_cache_lock:
+        _walk_cache[path] = (mtime_ns, dirs, files_list)
+        _walk_cache.move_to_end(path)
+        while len(_walk_cache) > WALK_CACHE_DIRS:
+            _walk_cache.popitem(last=False)
+    return dirs, files_list
@@ -0,0 +1,365 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from python.helpers import files
+from python.helpers.print_style import PrintStyle
+
+# local store of snapshot manifests and compressed chunks shared by all snapshots
+STORE_DIR = "tmp/backups"
+# files are split in fixed size chunks, unchanged chunks of changed files are stored once
+CHUNK_SIZE = 4 * 1024 * 1024
+# snapshots kept in the store, blobs not referenced by any of them are removed
+KEEP_SNAPSHOTS = 10
+# zlib and sha256 release the GIL, threads compress on multiple cores
+WORKERS = min(os.cpu_count() or 1, 8)
+
+SNAPSHOT_FORMAT = "snapshot"
+MANIFEST_FILE = "manifest.json"
+METADATA_FILE = "metadata.json"
+BLOB_DIR = "blobs"
+
+# first byte of a blob, incompressible chunks are kept raw
+_ZLIB = b"z"
+_RAW = b"r"
+
+_store_lock = threading.Lock()
+
+
+def get_store_dir(*parts: str) -> str:
+    return files.get_abs_path(STORE_DIR, *parts)
+
+
+def has_blob(digest: str) -> bool:
+    return os.path.exists(_blob_path(digest))
+
+
+def read_blob(digest: str) -> bytes:
+    """Raw blob from the store, still encoded"""
+    with open(_blob_path(digest), "rb") as file:
+        return file.read()
+
+
+def decode_blob(digest: str, blob: bytes, verify: bool = True) -> bytes:
+    data = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+    if verify and hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"Corrupted backup chunk {digest}")
+    return data
+
+
+def store_file(real_path: str, compression_level: int = 6, chunk_size: int = CHUNK_SIZE) -> tuple[List[str], int]:
+    """Split a file in chunks and store the new ones, returns the chunk digests and the bytes stored"""
+    digests = []
+    stored = 0
+    with open(real_path, "rb") as file:
+        while data := file.read(chunk_size):
+            digest = hashlib.sha256(data).hexdigest()
+            digests.append(digest)
+            if not has_blob(digest):
+                stored += _write_blob(digest, data, compression_level)
+    return digests, stored
+
+
+def create_snapshot(
+    matched_files: List[Dict[str, Any]],
+    compression_level: int = 6,
+    workers: int = WORKERS,
+) -> Dict[str, Any]:
+    """
+    Store files in the local store and save a manifest of the snapshot.
+
+    Files with the same size and modification time as in the previous snapshot are not read
+    again, their chunks are taken from its manifest. Changed files are chunked, hashed and
+    compressed in parallel, only chunks missing in the store are written.
+
+    Args:
+        matched_files: Files from BackupService.test_patterns with path and real_path
+        compression_level: zlib level of new chunks
+        workers: Threads reading and compressing files
+
+    Returns:
+        Snapshot manifest
+    """
+    with _store_lock:
+        return _create_snapshot(matched_files, compression_level, workers)
+
+
+def _create_snapshot(matched_files: List[Dict[str, Any]], compression_level: int, workers: int) -> Dict[str, Any]:
+    previous = get_latest_manifest()
+    previous_files = {f["path"]: f for f in previous["files"]} if previous else {}
+
+    entries: List[Dict[str, Any]] = []
+    changed: List[Dict[str, Any]] = []
+    for file_info in matched_files:
+        try:
+            stat = os.stat(file_info["real_path"])
+        except OSError as e:
+            PrintStyle().warning(f"Warning: Could not backup file {file_info['real_path']}: {e}")
+            continue
+        entry = {
+            "path": file_info["path"],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "mode": stat.st_mode & 0o777,
+            "chunks": [],
+        }
+        old = previous_files.get(entry["path"])
+        if (
+            old
+            and old["size"] == entry["size"]
+            and old["mtime_ns"] == entry["mtime_ns"]
+            and all(has_blob(digest) for digest in old["chunks"])
+        ):
+            entry["chunks"] = old["chunks"]
+        else:
+            changed.append({"entry": entry, "real_path": file_info["real_path"]})
+        entries.append(entry)
+
+    def store(item: Dict[str, Any]) -> int:
+        item["entry"]["chunks"], stored = store_file(item["real_path"], compression_level)
+        return stored
+
+    failed = set()
+    stored_bytes = 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="backup") as executor:
+        futures = [(item, executor.submit(store, item)) for item in changed]
+        for item, future in futures:
+            try:
+                stored_bytes += future.result()
+            except Exception as e:
+                # Log error but continue with other files
+                PrintStyle().warning(f"Warning: Could not backup file {item['real_path']}: {e}")
+                failed.add(item["entry"]["path"])
+
+    now = datetime.datetime.now()
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": 1,
+        "id": now.strftime("%Y%m%d-%H%M%S-%f"),
+        "created": now.isoformat(),
+        "base": previous["id"] if previous else "",
+        "chunk_size": CHUNK_SIZE,
+        "files": [entry for entry in entries if entry["path"] not in failed],
+        "stats": {
+            "changed_files": len(changed) - len(failed),
+            "reused_files": len(entries) - len(changed),
+            "stored_bytes": stored_bytes,
+        },
+    }
+    _save_manifest(manifest)
+    _prune_store()
+    return manifest
+
+
+def write_archive(zip_path: str, metadata: Dict[str, Any], manifest: Dict[str, Any], incremental: bool = False):
+    """
+    Write a snapshot archive with metadata, manifest and blobs.
+
+    Blobs are already compressed and are stored as they are. An incremental archive leaves out
+    blobs of its base snapshot, it can only be restored where the base is in the local store.
+    """
+    skip = set()
+    if incremental and manifest.get("base"):
+        base = load_manifest(manifest["base"])
+        if base:
+            skip = {digest for f in base["files"] for digest in f["chunks"]}
+        else:
+            manifest["base"] = ""
+    if not skip:
+        manifest["base"] = ""
+    metadata["base_snapshot"] = manifest["base"]
+
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED, allowZip64=True) as zipf:
+        zipf.writestr(METADATA_FILE, json.dumps(metadata, indent=2), zipfile.ZIP_DEFLATED)
+        zipf.writestr(MANIFEST_FILE, json.dumps(manifest), zipfile.ZIP_DEFLATED)
+        written = set()
+        for entry in manifest["files"]:
+            for digest in entry["chunks"]:
+                if digest in written or digest in skip:
+                    continue
+                zipf.write(_blob_path(digest), f"{BLOB_DIR}/{digest}")
+                written.add(digest)
+
+
+def list_snapshots() -> List[str]:
+    """Snapshot ids in the local store, oldest first"""
+    snapshots_dir = get_store_dir("snapshots")
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(name[:-5] for name in os.listdir(snapshots_dir) if name.endswith(".json"))
+
+
+def load_manifest(snapshot_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(get_store_dir("snapshots", f"{snapshot_id}.json"), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def get_latest_manifest() -> Optional[Dict[str, Any]]:
+    for snapshot_id in reversed(list_snapshots()):
+        manifest = load_manifest(snapshot_id)
+        if manifest:
+            return manifest
+    return None
+
+
+def prune_store(keep: int = KEEP_SNAPSHOTS):
+    """Remove old snapshots and blobs no kept snapshot refers to"""
+    with _store_lock:
+        _prune_store(keep)
+
+
+def _prune_store(keep: int = KEEP_SNAPSHOTS):
+    # blobs of a snapshot being created are not referenced yet, callers hold the store lock
+    snapshots = list_snapshots()
+    for snapshot_id in snapshots[:-keep]:
+        os.remove(get_store_dir("snapshots", f"{snapshot_id}.json"))
+
+    referenced = set()
+    for snapshot_id in snapshots[-keep:]:
+        manifest = load_manifest(snapshot_id)
+        if manifest:
+            referenced.update(digest for f in manifest["files"] for digest in f["chunks"])
+
+    blobs_dir = get_store_dir(BLOB_DIR)
+    if not os.path.isdir(blobs_dir):
+        return
+    for prefix in os.listdir(blobs_dir):
+        prefix_dir = os.path.join(blobs_dir, prefix)
+        for name in os.listdir(prefix_dir):
+            # temporary files of blobs being written have a suffix
+            if name not in referenced and "." not in name:
+                os.remove(os.path.join(prefix_dir, name))
+
+
+class BackupArchive:
+    """
+    Uploaded backup archive in either format.
+
+    Zip backups contain the files themselves, snapshot backups a manifest and the compressed
+    chunks. Files are addressed by their archive path (path without the leading slash) in both.
+    """
+
+    def __init__(self, zip_path: str):
+        self.zipf = zipfile.ZipFile(zip_path, "r")
+        names = self.zipf.namelist()
+        self.metadata: Dict[str, Any] = {}
+        if METADATA_FILE in names:
+            self.metadata = json.loads(self.zipf.read(METADATA_FILE).decode("utf-8"))
+
+        self.manifest: Optional[Dict[str, Any]] = None
+        if MANIFEST_FILE in names:
+            self.manifest = json.loads(self.zipf.read(MANIFEST_FILE).decode("utf-8"))
+            self._entries = {f["path"].lstrip("/"): f for f in self.manifest["files"]}
+            self._blobs = {name[len(BLOB_DIR) + 1:] for name in names if name.startswith(BLOB_DIR + "/")}
+            self._names = list(self._entries)
+        else:
+            self._names = [name for name in names if name not in [METADATA_FILE, "checksums.json"]]
+
+    @property
+    def is_snapshot(self) -> bool:
+        return self.manifest is not None
+
+    def names(self) -> List[str]:
+        return self._names
+
+    def extract(self, archive_path: str, target_path: str, verify: bool = True):
+        """Write one file of the archive to target_path, safe to call from multiple threads"""
+        if not self.manifest:
+            with self.zipf.open(archive_path) as source, open(target_path, "wb") as target:
+                shutil.copyfileobj(source, target)
+            return
+
+        entry = self._entries[archive_path]
+        with open(target_path, "wb") as target:
+            for digest in entry["chunks"]:
+                if digest in self._blobs:
+                    blob = self.zipf.read(f"{BLOB_DIR}/{digest}")
+                elif has_blob(digest):
+                    blob = read_blob(digest)
+                else:
+                    raise FileNotFoundError(
+                        f"Chunk {digest} is neither in the archive nor in the local store, "
+                        f"the archive is incremental and needs its base snapshot "
+                        f"{self.manifest.get('base', '')}, restore the archive of the base first"
+                    )
+                target.write(decode_blob(digest, blob, verify))
+        try:
+            os.chmod(target_path, entry.get("mode", 0o644))
+        except OSError:
+            pass
+
+    def extract_many(self, items: List[tuple[str, str]], workers: int = WORKERS) -> List[Optional[Exception]]:
+        """Extract (archive_path, target_path) pairs in parallel, returns the error of each item or None"""
+
+        def extract(item: tuple[str, str]) -> Optional[Exception]:
+            try:
+                self.extract(*item)
+                return None
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="restore") as executor:
+            return list(executor.map(extract, items))
+
+    def import_to_store(self):
+        """
+        Add the snapshot and its blobs to the local store after a restore.
+
+        Incremental archives based on this snapshot can then be restored here as well,
+        also when it was created on another instance.
+        """
+        if not self.manifest:
+            return
+        with _store_lock:
+            for digest in self._blobs:
+                if not has_blob(digest):
+                    _write_encoded_blob(digest, self.zipf.read(f"{BLOB_DIR}/{digest}"))
+            if not load_manifest(self.manifest["id"]):
+                _save_manifest(self.manifest)
+
+    def close(self):
+        self.zipf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _blob_path(digest: str) -> str:
+    return get_store_dir(BLOB_DIR, digest[:2], digest)
+
+
+def _write_blob(digest: str, data: bytes, compression_level: int) -> int:
+    compressed = zlib.compress(data, compression_level)
+    blob = _ZLIB + compressed if len(compressed) < len(data) else _RAW + data
+    return _write_encoded_blob(digest, blob)
+
+
+def _write_encoded_blob(digest: str, blob: bytes) -> int:
+    path = _blob_path(digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # written aside and moved in place, readers never see a partial blob
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(blob)
+    os.replace(temp_path, path)
+    return len(blob)
+
+
+def _save_manifest(manifest: Dict[str, Any]):
+    path = get_store_dir("snapshots", f"{manifest['id']}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
@@ -0,0 +1,115 @@
+from typing import Any, List, Optional
+
+from litellm import acompletion
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+
+from python.helpers import dirty_json, browser_use_monkeypatch
+import python.helpers.browser_use  # noqa: F401, turns off browser-use telemetry before its import
+from browser_use.llm import ChatGoogle, ChatOpenRouter
+from models import (
+    LiteLLMChatWrapper,
+    apply_rate_limiter,
+    estimate_input_tokens,
+    turn_off_logging,
+)
+
+# browser-use is only imported with the browser agent, models.py loads this module on first use
+browser_use_monkeypatch.apply()
+
+
+class AsyncAIChatReplacement:
+    class _Completions:
+        def __init__(self, wrapper):
+            self._wrapper = wrapper
+
+        async def create(self, *args, **kwargs):
+            # call the async _acall method on the wrapper
+            return await self._wrapper._acall(*args, **kwargs)
+
+    class _Chat:
+        def __init__(self, wrapper):
+            self.completions = AsyncAIChatReplacement._Completions(wrapper)
+
+    def __init__(self, wrapper, *args, **kwargs):
+        self._wrapper = wrapper
+        self.chat = AsyncAIChatReplacement._Chat(wrapper)
+
+
+class BrowserCompatibleChatWrapper(ChatOpenRouter):
+    """
+    A wrapper for browser agent that can filter/sanitize messages
+    before sending them to the LLM.
+    """
+
+    def __init__(self, *args, **kwargs):
+        turn_off_logging()
+        # Create the underlying LiteLLM wrapper
+        self._wrapper = LiteLLMChatWrapper(*args, **kwargs)
+        # Browser-use may expect a 'model' attribute
+        self.model = self._wrapper.model_name
+        self.kwargs = self._wrapper.kwargs
+
+    @property
+    def model_name(self) -> str:
+        return self._wrapper.model_name
+
+    @property
+    def provider(self) -> str:
+        return self._wrapper.provider
+
+    def get_client(self, *args, **kwargs):  # type: ignore
+        return AsyncAIChatReplacement(self, *args, **kwargs)
+
+    async def _acall(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ):
+        # Apply rate limiting if configured
+        await apply_rate_limiter(
+            self._wrapper.a0_model_conf,
+            lambda: estimate_input_tokens(messages, self._wrapper.a0_model_conf),
+        )
+
+        # Call the model
+        try:
+            model = kwargs.pop("model", None)
+            kwrgs = {**self._wrapper.kwargs, **kwargs}
+
+            # hack from browser-use to fix json schema for gemini (additionalProperties, $defs, $ref)
+            if "response_format" in kwrgs and "json_schema" in kwrgs["response_format"] and model.startswith("gemini/"):
+                kwrgs["response_format"]["json_schema"] = ChatGoogle("")._fix_gemini_schema(kwrgs["response_format"]["json_schema"])
+
+            resp = await acompletion(
+                model=self._wrapper.model_name,
+                messages=messages,
+                stop=stop,
+                **kwrgs,
+            )
+
+            # Gemini: strip triple backticks and conform schema
+            try:
+                msg = resp.choices[0].message # type: ignore
+                if self.provider == "gemini" and isinstance(getattr(msg, "content", None), str):
+                    cleaned = browser_use_monkeypatch.gemini_clean_and_conform(msg.content) # type: ignore
+                    if cleaned:
+                        msg.content = cleaned
+            except Exception:
+                pass
+
+        except Exception as e:
+            raise e
+
+        # another hack for browser-use post process invalid jsons
+        try:
+            if "response_format" in kwrgs and "json_schema" in kwrgs["response_format"] or "json_object" in kwrgs["response_format"]:
+                if resp.choices[0].message.content is not None and not resp.choices[0].message.content.startswith("{"): # type: ignore
+                    js = dirty_json.parse(resp.choices[0].message.content) # type: ignore
+                    resp.choices[0].message.content = dirty_json.stringify(js) # type: ignore
+        except Exception as e:
+            pass
+
+        return resp
@@ -0,0 +1,250 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+
+from agent import AgentConfig, AgentContext, AgentContextType
+from initialize import initialize_agent
+from python.helpers import settings, defer
+from python.helpers.persist_chat import remove_chat
+from python.helpers.print_style import PrintStyle
+
+LATENCY_SAMPLES = 500
+
+
+@dataclass
+class PoolEntry:
+    config: AgentConfig
+    idle: list[AgentContext] = field(default_factory=list)
+    in_use: int = 0
+    filling: int = 0
+    created: int = 0
+    hits: int = 0
+    misses: int = 0
+    discarded: int = 0
+    checkout_ms: deque = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+    request_ms: deque = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+
+class ContextPool:
+    """Pool of pre-initialized background contexts reused by external requests (MCP, A2A, API).
+
+    Idle contexts are not registered in AgentContext, so they are invisible to the UI and
+    can not be addressed by id. Each checkout gets a fresh context id.
+    """
+
+    _instance: "ContextPool | None" = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: dict[str, PoolEntry] = {}
+        self._configs: dict[str, AgentConfig] = {}
+        self._checkouts: dict[str, tuple[str, float]] = {}  # context id -> (key, start)
+        self._generation = 0
+
+    @staticmethod
+    def get_instance() -> "ContextPool":
+        with ContextPool._instance_lock:
+            if ContextPool._instance is None:
+                ContextPool._instance = ContextPool()
+            return ContextPool._instance
+
+    @staticmethod
+    def invalidate():
+        """Drop all idle contexts, called when settings change."""
+        if ContextPool._instance is not None:
+            ContextPool._instance.clear()
+
+    def acquire(
+        self,
+        profile: str = "",
+        type: AgentContextType = AgentContextType.BACKGROUND,
+    ) -> AgentContext:
+        start = time.perf_counter()
+        config = self._get_config(profile)
+        key = _config_key(config)
+
+        with self._lock:
+            entry = self._get_entry(key, config)
+            context = entry.idle.pop() if entry.idle else None
+            if context:
+                entry.hits += 1
+            else:
+                entry.misses += 1
+            entry.in_use += 1
+
+        if not context:
+            context = self._create_context(config)
+            with self._lock:
+                entry.created += 1
+
+        # register under a fresh id so previous checkouts can not be continued
+        now = datetime.now(timezone.utc)
+        context.id = AgentContext.generate_id()
+        AgentContext._counter += 1
+        context.no = AgentContext._counter  # listed as a new chat, not in the place of the previous one
+        context.type = type
+        context.created_at = now
+        context.last_message = now
+        context.last_access = time.monotonic()  # idle in the pool is not idle as a chat
+        AgentContext._contexts[context.id] = context
+
+        with self._lock:
+            self._checkouts[context.id] = (key, time.perf_counter())
+            entry.checkout_ms.append((time.perf_counter() - start) * 1000)
+
+        self._schedule_fill(key)
+        return context
+
+    def release(self, context: AgentContext, delete_chat: bool = True):
+        """Unregister the context, a context checked out of the pool returns to it once it is reset."""
+        AgentContext.remove(context.id)
+        context.kill_process()
+        if delete_chat:
+            remove_chat(context.id)
+
+        with self._lock:
+            checkout = self._checkouts.pop(context.id, None)
+            entry = self._entries.get(checkout[0]) if checkout else None
+            if checkout and entry:
+                entry.in_use = max(0, entry.in_use - 1)
+                entry.request_ms.append((time.perf_counter() - checkout[1]) * 1000)
+            generation = self._generation
+
+        # only contexts checked out of the pool are reused, others are just removed
+        if not checkout or not entry or checkout[0] != _config_key(context.config):
+            return  # not checked out of the pool or config changed
+
+        async def recycle():
+            try:
+                context.recycle()
+            except Exception as e:
+                PrintStyle.error(f"Failed to recycle pooled context: {e}")
+                return
+            with self._lock:
+                if generation == self._generation and len(entry.idle) < _get_max():
+                    entry.idle.append(context)
+                else:
+                    entry.discarded += 1
+
+        defer.DeferredTask(thread_name="ContextPool").start_task(recycle)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            for entry in self._entries.values():
+                entry.discarded += len(entry.idle)
+                entry.idle.clear()
+            self._entries = {k: e for k, e in self._entries.items() if e.in_use}
+            self._configs.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "min": _get_min(),
+                "max": _get_max(),
+                "pools": [
+                    {
+                        "key": key,
+                        "profile": entry.config.profile,
+                        "idle": len(entry.idle),
+                        "in_use": entry.in_use,
+                        "created": entry.created,
+                        "hits": entry.hits,
+                        "misses": entry.misses,
+                        "discarded": entry.discarded,
+                        "checkout_ms": _summarize(entry.checkout_ms),
+                        "request_ms": _summarize(entry.request_ms),
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
+
+    def _get_config(self, profile: str) -> AgentConfig:
+        with self._lock:
+            config = self._configs.get(profile)
+            if not config:
+                config = initialize_agent()
+                if profile:
+                    config = replace(config, profile=profile)
+                self._configs[profile] = config
+            return config
+
+    def _get_entry(self, key: str, config: AgentConfig) -> PoolEntry:
+        entry = self._entries.get(key)
+        if not entry:
+            entry = PoolEntry(config=config)
+            self._entries[key] = entry
+        return entry
+
+    def _create_context(self, config: AgentConfig) -> AgentContext:
+        context = AgentContext(config=config, type=AgentContextType.BACKGROUND)
+        # idle contexts live outside the global registry
+        AgentContext._contexts.pop(context.id, None)
+        return context
+
+    def _schedule_fill(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return
+            missing = _get_min() - len(entry.idle) - entry.filling
+            if missing <= 0:
+                return
+            entry.filling += missing
+            generation = self._generation
+
+        async def fill():
+            for _ in range(missing):
+                try:
+                    context = self._create_context(entry.config)
+                    await _warm_up(context)
+                except Exception as e:
+                    PrintStyle.error(f"Failed to pre-initialize pooled context: {e}")
+                    context = None
+                with self._lock:
+                    entry.filling -= 1
+                    if not context:
+                        continue
+                    entry.created += 1
+                    if generation == self._generation and len(entry.idle) < _get_max():
+                        entry.idle.append(context)
+                    else:
+                        entry.discarded += 1
+
+        defer.DeferredTask(thread_name="ContextPool").start_task(fill)
+
+
+async def _warm_up(context: AgentContext):
+    # load memory for the profile so the first message does not have to
+    from python.helpers.memory import Memory
+
+    await Memory.get(context.agent0)
+
+
+def _config_key(config: AgentConfig) -> str:
+    digest = hashlib.md5(repr(config).encode()).hexdigest()[:12]
+    return f"{config.profile or 'default'}:{digest}"
+
+
+def _get_min() -> int:
+    return max(0, int(settings.get_settings()["context_pool_min"]))
+
+
+def _get_max() -> int:
+    return max(_get_min(), int(settings.get_settings()["context_pool_max"]))
+
+
+def _summarize(samples: deque) -> dict:
+    if not samples:
+        return {"count": 0, "avg": 0, "p50": 0, "p95": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 2),
+        "p50": round(ordered[len(ordered) // 2], 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+    }
@@ -0,0 +1,59 @@
+import threading
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+import models
+from python.helpers import dirty_json
+
+
+class ContextWindow:
+    """Snapshot of the prompt sent to the chat model in the last iteration.
+
+    Messages are only referenced when the snapshot is taken, the formatted text and the
+    token counts are computed on first request (context window modal) and kept until the
+    next iteration replaces the snapshot.
+    """
+
+    def __init__(
+        self,
+        messages: list[BaseMessage],
+        extras: dict[str, Any],
+        model_config: models.ModelConfig | None = None,
+    ):
+        self.messages = messages  # system message first, then history with extras
+        self.extras = extras
+        self.model_config = model_config
+        self._lock = threading.Lock()
+        self._text: str | None = None
+        self._breakdown: dict[str, int] | None = None
+
+    def get_text(self) -> str:
+        with self._lock:
+            if self._text is None:
+                self._text = ChatPromptTemplate.from_messages(self.messages).format()
+            return self._text
+
+    def get_tokens(self) -> int:
+        return self.get_breakdown()["total"]
+
+    def get_breakdown(self) -> dict[str, int]:
+        """Approximate tokens of the system prompt, the messages and each extra (part of messages)."""
+        with self._lock:
+            if self._breakdown is None:
+                # per message counts are memoized, unchanged messages are not encoded again
+                system = models.estimate_input_tokens(self.messages[:1], self.model_config)
+                messages = models.estimate_input_tokens(self.messages[1:], self.model_config)
+                # estimates already include the approximation buffer
+                breakdown = {
+                    "total": system + messages,
+                    "system": system,
+                    "messages": messages,
+                }
+                for key, value in self.extras.items():
+                    breakdown[f"extras.{key}"] = models.estimate_input_tokens(
+                        [dirty_json.stringify(value)], self.model_config
+                    )
+                self._breakdown = breakdown
+            return self._breakdown
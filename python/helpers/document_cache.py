@@ -0,0 +1,260 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import aiohttp
+import numpy as np
+
+from python.helpers import files
+from python.helpers.print_style import PrintStyle
+
+CACHE_FOLDER = "tmp/document_cache"
+MAX_BYTES = 1024 * 1024 * 1024  # disk budget, least recently used documents are evicted
+MAX_DOCUMENTS = 500
+REMOTE_TTL = 3600  # seconds, remote documents without ETag/Last-Modified are trusted this long
+REQUEST_TIMEOUT = 5
+SAVE_DELAY = 5.0  # seconds, access times updated in this time are saved together
+
+
+@dataclass
+class CachedDocument:
+    key: str
+    text: str
+
+
+class DocumentCache:
+    """Disk cache of extracted document text and chunk embeddings.
+
+    Documents are keyed by normalized URI. Local files are validated by stat and content
+    hash, remote documents by a conditional request with the stored ETag/Last-Modified.
+    Embeddings are stored per embedding model next to the text.
+    """
+
+    _instance: "DocumentCache | None" = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index: dict[str, dict] = {}
+        self._index_path = files.get_abs_path(CACHE_FOLDER, "index.json")
+        self._save_timer: threading.Timer | None = None
+        try:
+            if os.path.exists(self._index_path):
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+        except Exception as e:
+            PrintStyle.error(f"Failed to load document cache index: {e}")
+
+    @staticmethod
+    def get() -> "DocumentCache":
+        with DocumentCache._instance_lock:
+            if DocumentCache._instance is None:
+                DocumentCache._instance = DocumentCache()
+            return DocumentCache._instance
+
+    async def get_text(self, document_uri: str, source: str) -> CachedDocument | None:
+        """Return cached text when the source is unchanged, source is a local path or URL."""
+        key = _get_key(document_uri)
+        with self._lock:
+            entry = self._index.get(key)
+        if not entry:
+            return None
+        try:
+            if not await self._is_valid(entry, source):
+                self.remove(key)
+                return None
+            text = _read_text(os.path.join(self._dir(key), "text.txt"))
+        except Exception as e:
+            PrintStyle.error(f"Document cache entry for '{document_uri}' is not usable: {e}")
+            self.remove(key)
+            return None
+        self._touch(key)
+        return CachedDocument(key=key, text=text)
+
+    async def set_text(self, document_uri: str, source: str, text: str) -> str:
+        key = _get_key(document_uri)
+        validator = await _get_validator(source)
+        self.remove(key)
+        _write_atomic(os.path.join(self._dir(key), "text.txt"), text.encode("utf-8"))
+        with self._lock:
+            self._index[key] = {
+                "uri": document_uri,
+                "validator": validator,
+                "cached_at": time.time(),
+                "last_access": time.time(),
+                "size": len(text.encode("utf-8")),
+                "embeddings": {},
+            }
+            self._evict()
+            self._save_index()
+        return key
+
+    def get_embeddings(self, document_uri: str, model: str, chunks: list[str]) -> np.ndarray | None:
+        key = _get_key(document_uri)
+        with self._lock:
+            entry = self._index.get(key)
+            file_name = entry["embeddings"].get(model) if entry else None
+        if not file_name:
+            return None
+        try:
+            vectors = np.load(os.path.join(self._dir(key), file_name))
+        except Exception:
+            return None
+        if len(vectors) != len(chunks):
+            return None  # chunking changed
+        self._touch(key)
+        return vectors
+
+    def set_embeddings(self, document_uri: str, model: str, vectors: np.ndarray):
+        key = _get_key(document_uri)
+        with self._lock:
+            entry = self._index.get(key)
+            if not entry:
+                return  # text is not cached, nothing to attach to
+            file_name = hashlib.sha1(model.encode()).hexdigest()[:16] + ".npy"
+            path = os.path.join(self._dir(key), file_name)
+            data = _to_npy_bytes(vectors.astype(np.float32))
+            _write_atomic(path, data)
+            entry["embeddings"][model] = file_name
+            entry["size"] += len(data)
+            self._evict()
+            self._save_index()
+
+    def remove(self, key: str):
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry is not None:
+                self._save_index()
+        folder = self._dir(key)
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+            os.rmdir(folder)
+
+    async def _is_valid(self, entry: dict, source: str) -> bool:
+        validator = entry.get("validator") or {}
+        if validator.get("type") == "file":
+            stat = _get_stat(source)
+            if stat == validator.get("stat"):
+                return True
+            # touched but maybe not changed, compare content
+            if _hash_file(source) != validator.get("hash"):
+                return False
+            validator["stat"] = stat
+            with self._lock:
+                self._save_index()
+            return True
+        if validator.get("type") == "remote":
+            headers = {}
+            if validator.get("etag"):
+                headers["If-None-Match"] = validator["etag"]
+            if validator.get("last_modified"):
+                headers["If-Modified-Since"] = validator["last_modified"]
+            if not headers:
+                return time.time() - entry.get("cached_at", 0) < REMOTE_TTL
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    source,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                    allow_redirects=True,
+                ) as response:
+                    return response.status == 304
+        return False
+
+    def _touch(self, key: str):
+        # cache hits only update memory, the index is written with the next change or by a timer
+        with self._lock:
+            if key in self._index:
+                self._index[key]["last_access"] = time.time()
+                if self._save_timer is None:
+                    self._save_timer = threading.Timer(SAVE_DELAY, self._save_pending)
+                    self._save_timer.daemon = True
+                    self._save_timer.start()
+
+    def _evict(self):
+        total = sum(entry.get("size", 0) for entry in self._index.values())
+        by_age = sorted(self._index.items(), key=lambda item: item[1].get("last_access", 0))
+        while by_age and (total > MAX_BYTES or len(self._index) > MAX_DOCUMENTS):
+            key, entry = by_age.pop(0)
+            total -= entry.get("size", 0)
+            self.remove(key)
+
+    def _save_index(self):
+        # called with the lock held, the written index includes pending access times
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+        _write_atomic(self._index_path, json.dumps(self._index).encode("utf-8"))
+
+    def _save_pending(self):
+        with self._lock:
+            self._save_timer = None
+            try:
+                self._save_index()
+            except Exception as e:
+                PrintStyle.error(f"Failed to save document cache index: {e}")
+
+    def _dir(self, key: str) -> str:
+        return files.get_abs_path(CACHE_FOLDER, key)
+
+
+def _get_key(document_uri: str) -> str:
+    return hashlib.sha256(document_uri.encode("utf-8")).hexdigest()[:32]
+
+
+async def _get_validator(source: str) -> dict:
+    scheme = urlparse(source).scheme
+    if scheme in ["http", "https"]:
+        validator = {"type": "remote"}
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.head(
+                    source,
+                    timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                    allow_redirects=True,
+                ) as response:
+                    if etag := response.headers.get("ETag"):
+                        validator["etag"] = etag
+                    if last_modified := response.headers.get("Last-Modified"):
+                        validator["last_modified"] = last_modified
+        except Exception:
+            pass  # falls back to REMOTE_TTL
+        return validator
+    return {"type": "file", "stat": _get_stat(source), "hash": _hash_file(source)}
+
+
+def _get_stat(path: str) -> list[int]:
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while buf := f.read(1024 * 1024):
+            hasher.update(buf)
+    return hasher.hexdigest()
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _to_npy_bytes(vectors: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, vectors)
+    return buffer.getvalue()
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
@@ -4,7 +4,10 @@ import asyncio
 import aiohttp
 import json
 
+import numpy as np
+
 from python.helpers.vector_db import VectorDB
+from python.helpers.document_cache import DocumentCache
 
 os.environ["USER_AGENT"] = "@mixedbread-ai/unstructured"  # noqa E402
 from langchain_unstructured import UnstructuredLoader  # noqa E402
@@ -23,13 +26,14 @@ from langchain_core.documents import Document
 from langchain.schema import SystemMessage, HumanMessage
 
 from python.helpers.print_style import PrintStyle
-from python.helpers import files, errors
+from python.helpers import files, errors, tokens
 from agent import Agent
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
 DEFAULT_SEARCH_THRESHOLD = 0.5
+QA_CONTEXT_RATIO = 0.7  # share of the chat model context available for document chunks
 
 
 class DocumentQueryStore:
@@ -97,6 +101,10 @@ class DocumentQueryStore:
     def init_vector_db(self):
         return VectorDB(self.agent, cache=True)
 
+    def get_embedding_model_key(self) -> str:
+        model = self.agent.config.embeddings_model
+        return f"{model.provider}/{model.name}"
+
     async def add_document(
         self, text: str, document_uri: str, metadata: dict | None = None
     ) -> tuple[bool, list[str]]:
@@ -145,7 +153,18 @@ class DocumentQueryStore:
             if not self.vector_db:
                 self.vector_db = self.init_vector_db()
 
-            ids = await self.vector_db.insert_documents(docs)
+            # reuse chunk embeddings from the document cache when available
+            cache = DocumentCache.get()
+            model = self.get_embedding_model_key()
+            texts = [doc.page_content for doc in docs]
+            embeddings = cache.get_embeddings(document_uri, model, texts)
+            if embeddings is None:
+                embeddings = np.array(
+                    await self.vector_db.embed_documents(texts), dtype=np.float32
+                )
+                cache.set_embeddings(document_uri, model, embeddings)
+
+            ids = await self.vector_db.insert_documents(docs, embeddings=embeddings)
             PrintStyle.standard(
                 f"Added document '{document_uri}' with {len(docs)} chunks"
             )
@@ -329,6 +348,36 @@ class DocumentQueryStore:
             query, limit, threshold, f"document_uri == '{document_uri}'"
         )
 
+    async def search_document_multi(
+        self, document_uri: str, queries: Sequence[str], limit: int = 10, threshold: float = 0.5
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several queries within a specific document at once.
+
+        Query embeddings are computed in one batch and searched in one index call.
+
+        Args:
+            document_uri: The URI of the document to search within
+            queries: The search query strings
+            limit: Maximum number of results to return per query
+            threshold: Minimum similarity score threshold (0-1)
+
+        Returns:
+            List of (chunk, score) lists, one per query, best matches first
+        """
+        # DB not initialized, no documents inside
+        if not self.vector_db or not queries:
+            return [[] for _ in queries]
+
+        try:
+            vectors = await self.vector_db.embed_documents(list(queries))
+            return await self.vector_db.search_by_vectors(
+                vectors, limit, threshold, f"document_uri == '{document_uri}'"
+            )
+        except Exception as e:
+            PrintStyle.error(f"Error searching documents: {str(e)}")
+            return [[] for _ in queries]
+
     async def list_documents(self) -> List[str]:
         """
         Get a list of all document URIs in the store.
@@ -367,34 +416,41 @@ class DocumentQueryHelper:
 
         # index document
         _ = await self.document_get_content(document_uri, True)
-        selected_chunks = {}
-        for question in questions:
-            self.progress_callback(f"Optimizing query: {question}")
-            human_content = f'Search Query: "{question}"'
-            system_content = self.agent.parse_prompt(
-                "fw.document_query.optmimize_query.md"
-            )
-
-            optimized_query = (
-                await self.agent.call_utility_model(
-                    system=system_content, message=human_content
-                )
-            ).strip()
 
-            self.progress_callback(f"Searching document with query: {optimized_query}")
-
-            normalized_uri = self.store.normalize_uri(document_uri)
-            chunks = await self.store.search_document(
-                document_uri=normalized_uri,
-                query=optimized_query,
-                limit=100,
-                threshold=DEFAULT_SEARCH_THRESHOLD,
+        # optimize all queries concurrently
+        self.progress_callback(f"Optimizing {len(questions)} queries")
+        system_content = self.agent.parse_prompt("fw.document_query.optmimize_query.md")
+        optimized_queries = [
+            query.strip()
+            for query in await asyncio.gather(
+                *[
+                    self.agent.call_utility_model(
+                        system=system_content, message=f'Search Query: "{question}"'
+                    )
+                    for question in questions
+                ]
             )
+        ]
 
-            self.progress_callback(f"Found {len(chunks)} chunks")
+        self.progress_callback(
+            f"Searching document with queries: {json.dumps(optimized_queries)}"
+        )
+        normalized_uri = self.store.normalize_uri(document_uri)
+        results = await self.store.search_document_multi(
+            document_uri=normalized_uri,
+            queries=optimized_queries,
+            limit=100,
+            threshold=DEFAULT_SEARCH_THRESHOLD,
+        )
+        self.progress_callback(f"Found {sum(len(r) for r in results)} chunks")
 
-            for chunk in chunks:
-                selected_chunks[chunk.metadata["id"]] = chunk
+        questions_str = "\n".join([f" *  {question}" for question in questions])
+        qa_system_message = self.agent.parse_prompt(
+            "fw.document_query.system_prompt.md"
+        )
+        selected_chunks = self.select_chunks(
+            results, self.get_content_budget(qa_system_message + questions_str)
+        )
 
         if not selected_chunks:
             self.progress_callback(f"No relevant content found in the document")
@@ -405,14 +461,10 @@ class DocumentQueryHelper:
             f"Processing {len(questions)} questions in context of {len(selected_chunks)} chunks"
         )
 
-        questions_str = "\n".join([f" *  {question}" for question in questions])
         content = "\n\n----\n\n".join(
-            [chunk.page_content for chunk in selected_chunks.values()]
+            [chunk.page_content for chunk in selected_chunks]
         )
 
-        qa_system_message = self.agent.parse_prompt(
-            "fw.document_query.system_prompt.md"
-        )
         qa_user_message = f"# Document:\n{content}\n\n# Queries:\n{questions_str}"
 
         ai_response, _reasoning = await self.agent.call_chat_model(
@@ -426,6 +478,50 @@ class DocumentQueryHelper:
 
         return True, str(ai_response)
 
+    def get_content_budget(self, prompt: str) -> int:
+        """Tokens left for document chunks in the chat model context, 0 means unlimited."""
+        ctx_length = self.agent.config.chat_model.ctx_length
+        if not ctx_length:
+            return 0
+        encoding = tokens.get_encoding_name(self.agent.config.chat_model)
+        budget = int(ctx_length * QA_CONTEXT_RATIO) - tokens.approximate_tokens(prompt, encoding)
+        return max(budget, 1)
+
+    def select_chunks(
+        self, results: Sequence[Sequence[Tuple[Document, float]]], budget: int
+    ) -> List[Document]:
+        """Take the best chunks of each query in turns until the token budget is used up."""
+        selected: dict[str, Document] = {}
+        used = 0
+        sizes: dict[str, int] = {}
+        if budget:
+            # count all candidate chunks in one batch
+            unique = {chunk.metadata["id"]: chunk for result in results for chunk, _ in result}
+            counts = tokens.count_tokens_batch(
+                [chunk.page_content for chunk in unique.values()],
+                tokens.get_encoding_name(self.agent.config.chat_model),
+            )
+            sizes = {
+                id: int(count * tokens.APPROX_BUFFER) for id, count in zip(unique, counts)
+            }
+        depth = max((len(r) for r in results), default=0)
+        for rank in range(depth):
+            for result in results:
+                if rank >= len(result):
+                    continue
+                chunk = result[rank][0]
+                if chunk.metadata["id"] in selected:
+                    continue
+                size = sizes.get(chunk.metadata["id"], 0)
+                if budget and used + size > budget:
+                    continue  # a smaller chunk may still fit
+                selected[chunk.metadata["id"]] = chunk
+                used += size
+        # keep document order for the model
+        return sorted(
+            selected.values(), key=lambda chunk: chunk.metadata.get("chunk_index", 0)
+        )
+
     async def document_get_content(
         self, document_uri: str, add_to_db: bool = False
     ) -> str:
@@ -494,7 +590,17 @@ class DocumentQueryHelper:
 
         exists = await self.store.document_exists(document_uri_norm)
         document_content = ""
+        cached = None
         if not exists:
+            # extracted text of unchanged documents comes from the disk cache
+            try:
+                cached = await DocumentCache.get().get_text(document_uri_norm, document_uri)
+            except Exception as e:
+                PrintStyle.error(f"Document cache lookup failed: {e}")
+        if cached:
+            self.progress_callback(f"Using cached document content")
+            document_content = cached.text
+        if not exists and not cached:
             if mimetype.startswith("image/"):
                 document_content = self.handle_image_document(document_uri, scheme)
             elif mimetype == "text/html":
@@ -507,6 +613,14 @@ class DocumentQueryHelper:
                 document_content = self.handle_unstructured_document(
                     document_uri, scheme
                 )
+            if document_content:
+                try:
+                    await DocumentCache.get().set_text(
+                        document_uri_norm, document_uri, document_content
+                    )
+                except Exception as e:
+                    PrintStyle.error(f"Failed to cache document content: {e}")
+        if not exists:
             if add_to_db:
                 self.progress_callback(f"Indexing document")
                 success, ids = await self.store.add_document(
@@ -1,6 +1,6 @@
 from abc import abstractmethod
 from typing import Any
-from python.helpers import extract_tools, files 
+from python.helpers import extract_tools, files, tracing
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from agent import Agent
@@ -34,9 +34,11 @@ async def call_extensions(extension_point: str, agent: "Agent|None" = None, **kw
             # sort by name
             classes = sorted(unique.values(), key=lambda cls: _get_file_from_module(cls.__module__))
 
-    # call extensions
-    for cls in classes:
-        await cls(agent=agent).execute(**kwargs)
+    # call extensions, traced per extension point and class
+    with tracing.span(extension_point, "extensions", agent=agent):
+        for cls in classes:
+            with tracing.span(cls.__name__, "extension", extension_point=extension_point):
+                await cls(agent=agent).execute(**kwargs)
 
 
 def _get_file_from_module(module_name: str) -> str:
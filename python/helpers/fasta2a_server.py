@@ -11,9 +11,8 @@ from starlette.requests import Request
 
 # Local imports
 from python.helpers.print_style import PrintStyle
-from agent import AgentContext, UserMessage, AgentContextType
-from initialize import initialize_agent
-from python.helpers.persist_chat import remove_chat
+from agent import UserMessage
+from python.helpers.context_pool import ContextPool
 
 # Import FastA2A
 try:
@@ -75,14 +74,13 @@ class AgentZeroWorker(Worker):  # type: ignore[misc]
             task_id = params['id']
             message = params['message']
 
-            _PRINTER.print(f"[A2A] Processing task {task_id} with new temporary context")
+            _PRINTER.print(f"[A2A] Processing task {task_id} with pooled temporary context")
 
             # Convert A2A message to Agent Zero format
             agent_message = self._convert_message(message)
 
-            # Always create new temporary context for this A2A conversation
-            cfg = initialize_agent()
-            context = AgentContext(cfg, type=AgentContextType.BACKGROUND)
+            # Always use a fresh temporary context for this A2A conversation
+            context = ContextPool.get_instance().acquire()
 
             # Log user message so it appears instantly in UI chat window
             context.log.log(
@@ -111,10 +109,8 @@ class AgentZeroWorker(Worker):  # type: ignore[misc]
                 new_messages=[response_message]
             )
 
-            # Clean up context like non-persistent MCP chats
-            context.reset()
-            AgentContext.remove(context.id)
-            remove_chat(context.id)
+            # Return context to the pool like non-persistent MCP chats
+            ContextPool.get_instance().release(context)
 
             _PRINTER.print(f"[A2A] Completed task {task_id} and cleaned up context")
 
@@ -127,9 +123,7 @@ class AgentZeroWorker(Worker):  # type: ignore[misc]
 
             # Clean up context even on failure to prevent resource leaks
             if context:
-                context.reset()
-                AgentContext.remove(context.id)
-                remove_chat(context.id)
+                ContextPool.get_instance().release(context)
                 _PRINTER.print(f"[A2A] Cleaned up failed context {context.id}")
 
     async def cancel_task(self, params: Any) -> None:  # params: TaskIdParams
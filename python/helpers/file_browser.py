@@ -1,8 +1,12 @@
 import os
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from operator import attrgetter
 from pathlib import Path
 import shutil
 import base64
-import subprocess
 from typing import Dict, List, Tuple, Any
 from werkzeug.utils import secure_filename
 from datetime import datetime
@@ -19,6 +23,8 @@ class FileBrowser:
     }
 
     MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+    PAGE_SIZE = 200
+    MAX_PAGE_SIZE = 1000
 
     def __init__(self):
         # if runtime.is_development():
@@ -37,12 +43,16 @@ class FileBrowser:
         except (AttributeError, IOError):
             return False
 
+    def get_target_file(self, current_path: str, filename: str) -> str:
+        # Resolve the target file path
+        target_file = (self.base_dir / current_path / filename).resolve()
+        if not str(target_file).startswith(str(self.base_dir)):
+            raise ValueError("Invalid target directory")
+        return str(target_file)
+
     def save_file_b64(self, current_path: str, filename: str, base64_content: str):
         try:
-            # Resolve the target directory path
-            target_file = (self.base_dir / current_path / filename).resolve()
-            if not str(target_file).startswith(str(self.base_dir)):
-                raise ValueError("Invalid target directory")
+            target_file = Path(self.get_target_file(current_path, filename))
 
             os.makedirs(target_file.parent, exist_ok=True)
             # Save file
@@ -122,148 +132,95 @@ class FileBrowser:
     def _get_file_extension(self, filename: str) -> str:
         return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
-    def _get_files_via_ls(self, full_path: Path) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-        """Get files and folders using ls command for better error handling"""
-        files: List[Dict[str, Any]] = []
-        folders: List[Dict[str, Any]] = []
-
-        try:
-            # Use ls command to get directory listing
-            result = subprocess.run(
-                ['ls', '-la', str(full_path)],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            if result.returncode != 0:
-                PrintStyle.error(f"ls command failed: {result.stderr}")
-                return files, folders
-
-            # Parse ls output (skip first line which is "total X")
-            lines = result.stdout.strip().split('\n')
-            if len(lines) <= 1:
-                return files, folders
-
-            for line in lines[1:]:  # Skip the "total" line
-                try:
-                    # Skip current and parent directory entries
-                    if line.endswith(' .') or line.endswith(' ..'):
-                        continue
-
-                    # Parse ls -la output format
-                    parts = line.split()
-                    if len(parts) < 9:
-                        continue
-
-                    # Check if this is a symlink (permissions start with 'l')
-                    permissions = parts[0]
-                    is_symlink = permissions.startswith('l')
-
-                    if is_symlink:
-                        # For symlinks, extract the name before the '->' arrow
-                        full_name_part = ' '.join(parts[8:])
-                        if ' -> ' in full_name_part:
-                            filename = full_name_part.split(' -> ')[0]
-                            symlink_target = full_name_part.split(' -> ')[1]
-                        else:
-                            filename = full_name_part
-                            symlink_target = None
-                    else:
-                        filename = ' '.join(parts[8:])  # Handle filenames with spaces
-                        symlink_target = None
-
-                    if not filename:
-                        continue
-
-                    # Get full path for this entry
-                    entry_path = full_path / filename
-
-                    try:
-                        stat_info = entry_path.stat()
-
-                        entry_data: Dict[str, Any] = {
-                            "name": filename,
-                            "path": str(entry_path.relative_to(self.base_dir)),
-                            "modified": datetime.fromtimestamp(stat_info.st_mtime).isoformat()
-                        }
-
-                        # Add symlink information if this is a symlink
-                        if is_symlink and symlink_target:
-                            entry_data["symlink_target"] = symlink_target
-                            entry_data["is_symlink"] = True
-
-                        if entry_path.is_file():
-                            entry_data.update({
-                                "type": self._get_file_type(filename),
-                                "size": stat_info.st_size,
-                                "is_dir": False
-                            })
-                            files.append(entry_data)
-                        elif entry_path.is_dir():
-                            entry_data.update({
-                                "type": "folder",
-                                "size": 0,  # Directories show as 0 bytes
-                                "is_dir": True
-                            })
-                            folders.append(entry_data)
-
-                    except (OSError, PermissionError, FileNotFoundError) as e:
-                        # Log error but continue with other files
-                        PrintStyle.warning(f"No access to {filename}: {e}")
-                        continue
-
-                    if len(files) + len(folders) > 10000:
-                        break
-
-                except Exception as e:
-                    # Log error and continue with next line
-                    PrintStyle.error(f"Error parsing ls line '{line}': {e}")
-                    continue
-
-        except subprocess.TimeoutExpired:
-            PrintStyle.error("ls command timed out")
-        except Exception as e:
-            PrintStyle.error(f"Error running ls command: {e}")
-
-        return files, folders
-
-    def get_files(self, current_path: str = "") -> Dict:
+    def get_files(
+        self,
+        current_path: str = "",
+        cursor: str = "",
+        limit: int = 0,
+        sort: str = "name",
+        direction: str = "asc",
+        filter: str = "",
+    ) -> Dict:
+        """List a page of directory entries, folders first, sorted and filtered on the server"""
         try:
             # Resolve the full path while preventing directory traversal
             full_path = (self.base_dir / current_path).resolve()
             if not str(full_path).startswith(str(self.base_dir)):
                 raise ValueError("Invalid path")
 
-            # Use ls command instead of os.scandir for better error handling
-            files, folders = self._get_files_via_ls(full_path)
+            index = _get_directory_index(str(full_path))
+            ordered, positions = index.get_order(sort, direction == "desc", filter.lower())
+
+            # cursor is the offset and name of the last returned entry, the name survives changes in the directory
+            start = 0
+            if cursor:
+                offset, name = json.loads(cursor)
+                start = positions.get(name, offset - 1) + 1
 
-            # Combine folders and files, folders first
-            all_entries = folders + files
+            limit = min(limit or self.PAGE_SIZE, self.MAX_PAGE_SIZE)
+            page = ordered[start : start + limit]
+
+            next_cursor = ""
+            if page and start + limit < len(ordered):
+                next_cursor = json.dumps([start + limit, page[-1].name])
 
             # Get parent directory path if not at root
             parent_path = ""
             if current_path:
                 try:
-                    # Get the absolute path of current directory
-                    current_abs = (self.base_dir / current_path).resolve()
-
                     # parent_path is empty only if we're already at root
-                    if str(current_abs) != str(self.base_dir):
+                    if str(full_path) != str(self.base_dir):
                         parent_path = str(Path(current_path).parent)
 
                 except Exception:
                     parent_path = ""
 
             return {
-                "entries": all_entries,
+                "entries": [self._entry_data(full_path, entry) for entry in page],
                 "current_path": current_path,
-                "parent_path": parent_path
+                "parent_path": parent_path,
+                "next_cursor": next_cursor,
+                "total": len(ordered),
             }
 
         except Exception as e:
             PrintStyle.error(f"Error reading directory: {e}")
-            return {"entries": [], "current_path": "", "parent_path": ""}
+            return {"entries": [], "current_path": "", "parent_path": "", "next_cursor": "", "total": 0}
+
+    def _entry_data(self, full_path: Path, entry: "_Entry") -> Dict[str, Any]:
+        entry_path = full_path / entry.name
+        size, mtime = entry.size, entry.mtime
+        try:
+            # only the returned page is stat-ed again, file sizes change without touching the directory
+            stat_info = entry_path.stat()
+            size, mtime = stat_info.st_size, stat_info.st_mtime
+        except OSError:
+            size = max(size, 0)
+
+        entry_data: Dict[str, Any] = {
+            "name": entry.name,
+            "path": str(entry_path.relative_to(self.base_dir)),
+            "modified": datetime.fromtimestamp(mtime).isoformat(),
+        }
+
+        # Add symlink information if this is a symlink
+        if entry.symlink_target:
+            entry_data["symlink_target"] = entry.symlink_target
+            entry_data["is_symlink"] = True
+
+        if entry.is_dir:
+            entry_data.update({
+                "type": "folder",
+                "size": 0,  # Directories show as 0 bytes
+                "is_dir": True
+            })
+        else:
+            entry_data.update({
+                "type": self._get_file_type(entry.name),
+                "size": size,
+                "is_dir": False
+            })
+        return entry_data
 
     def get_full_path(self, file_path: str, allow_dir: bool = False) -> str:
         """Get full file path if it exists and is within base_dir"""
@@ -278,3 +235,126 @@ class FileBrowser:
             if ext in extensions:
                 return file_type
         return 'unknown'
+
+
+# cached directory listings, limited by the total number of entries
+INDEX_CACHE_ENTRIES = 500_000
+
+
+@dataclass(slots=True)
+class _Entry:
+    name: str
+    name_lower: str
+    is_dir: bool
+    size: int
+    mtime: float
+    symlink_target: str | None
+
+
+class _DirectoryIndex:
+    """Entries of one directory with sort orders computed on demand."""
+
+    FILTERS_CACHED = 8
+
+    def __init__(self, path: str, mtime_ns: int, entries: List[_Entry]):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.entries = entries
+        self._orders: Dict[Tuple[str, bool, str], Tuple[List[_Entry], Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def get_order(self, sort: str, descending: bool, filter: str = "") -> Tuple[List[_Entry], Dict[str, int]]:
+        """Entries sorted folders first and optionally filtered by name, and positions of entries by name"""
+        if filter:
+            with self._lock:
+                order = self._orders.get((sort, descending, filter))
+            if order is None:
+                ordered = [e for e in self.get_order(sort, descending)[0] if filter in e.name_lower]
+                order = (ordered, {entry.name: i for i, entry in enumerate(ordered)})
+                with self._lock:
+                    # keep the most recent filters only, typing produces one per keystroke
+                    filtered = [key for key in self._orders if key[2]]
+                    for key in filtered[: max(len(filtered) - self.FILTERS_CACHED + 1, 0)]:
+                        del self._orders[key]
+                    self._orders[(sort, descending, filter)] = order
+            return order
+
+        with self._lock:
+            order = self._orders.get((sort, descending, ""))
+            if order is None:
+                if sort in ("size", "date"):
+                    self._read_stats()
+                # stable sorts by name, then by the sort column, are faster than tuple keys
+                ordered = sorted(self.entries, key=attrgetter("name_lower"), reverse=descending)
+                if sort == "size":
+                    ordered.sort(key=attrgetter("size"), reverse=descending)
+                elif sort == "date":
+                    ordered.sort(key=attrgetter("mtime"), reverse=descending)
+                ordered.sort(key=attrgetter("is_dir"), reverse=True)  # folders first
+                order = self._orders[(sort, descending, "")] = (
+                    ordered,
+                    {entry.name: i for i, entry in enumerate(ordered)},
+                )
+            return order
+
+    def _read_stats(self):
+        for entry in self.entries:
+            if entry.size >= 0:
+                continue
+            entry_path = os.path.join(self.path, entry.name)
+            try:
+                stat_info = os.stat(entry_path)
+            except OSError:
+                try:
+                    stat_info = os.lstat(entry_path)  # broken symlink
+                except OSError:
+                    entry.size = 0
+                    continue
+            entry.size = stat_info.st_size
+            entry.mtime = stat_info.st_mtime
+
+
+_index_cache: "OrderedDict[str, _DirectoryIndex]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _get_directory_index(path: str) -> _DirectoryIndex:
+    # cached listings are valid while the directory mtime is unchanged (entries added, removed or renamed)
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _index_cache_lock:
+        index = _index_cache.get(path)
+        if index and index.mtime_ns == mtime_ns:
+            _index_cache.move_to_end(path)
+            return index
+
+    index = _DirectoryIndex(path, mtime_ns, _scan_directory(path))
+    with _index_cache_lock:
+        _index_cache[path] = index
+        _index_cache.move_to_end(path)
+        total = sum(len(i.entries) for i in _index_cache.values())
+        while len(_index_cache) > 1 and total > INDEX_CACHE_ENTRIES:
+            total -= len(_index_cache.popitem(last=False)[1].entries)
+    return index
+
+
+def _scan_directory(path: str) -> List[_Entry]:
+    # names and types come from the directory itself, sizes and dates are read only when needed
+    entries: List[_Entry] = []
+    with os.scandir(path) as it:
+        for item in it:
+            try:
+                symlink_target = os.readlink(item.path) if item.is_symlink() else None
+                entries.append(
+                    _Entry(
+                        name=item.name,
+                        name_lower=item.name.lower(),
+                        is_dir=item.is_dir(),
+                        size=-1,
+                        mtime=0.0,
+                        symlink_target=symlink_target,
+                    )
+                )
+            except OSError as e:
+                # Log error but continue with other files
+                PrintStyle.warning(f"No access to {item.name}: {e}")
+    return entries
@@ -7,9 +7,7 @@ import sys
 import re
 import base64
 import shutil
-import tempfile
 from typing import Any
-import zipfile
 import importlib
 import importlib.util
 import inspect
@@ -414,19 +412,6 @@ def get_subdirectories(
     ]
 
 
-def zip_dir(dir_path: str):
-    full_path = get_abs_path(dir_path)
-    zip_file_path = tempfile.NamedTemporaryFile(suffix=".zip", delete=False).name
-    base_name = os.path.basename(full_path)
-    with zipfile.ZipFile(zip_file_path, "w", compression=zipfile.ZIP_DEFLATED) as zip:
-        for root, _, files in os.walk(full_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, full_path)
-                zip.write(file_path, os.path.join(base_name, rel_path))
-    return zip_file_path
-
-
 def move_file(relative_path: str, new_path: str):
     abs_path = get_abs_path(relative_path)
     new_abs_path = get_abs_path(new_path)
@@ -6,6 +6,7 @@ import json
 import math
 from typing import Coroutine, Literal, TypedDict, cast, Union, Dict, List, Any
 from python.helpers import messages, tokens, settings, call_llm
+from python.helpers.utility_scheduler import UtilityPriority
 from enum import Enum
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
 
@@ -17,6 +18,10 @@ HISTORY_BULK_RATIO = 0.2
 TOPIC_COMPRESS_RATIO = 0.65
 LARGE_MESSAGE_TO_TOPIC_RATIO = 0.25
 RAW_MESSAGE_OUTPUT_TEXT_TRIM = 100
+HISTORY_SOFT_LIMIT_RATIO = 0.8  # background compression starts when history reaches this part of its budget
+HISTORY_COMPRESS_TARGET_RATIO = 0.7  # and compresses it down to this part, the next prompt does not wait
+SUMMARY_TOKENS_RATIO = 0.2  # expected summary size relative to its input, for planning
+COMPRESSION_CONCURRENCY = 4  # summarizations of one compression round running at once
 
 
 class RawMessage(TypedDict):
@@ -80,6 +85,7 @@ class Message(Record):
         self.ai = ai
         self.content = content
         self.summary: str = ""
+        self.text_length: int = 0
         self.tokens: int = tokens or self.calculate_tokens()
 
     def get_tokens(self) -> int:
@@ -87,8 +93,15 @@ class Message(Record):
             self.tokens = self.calculate_tokens()
         return self.tokens
 
+    def get_text_length(self) -> int:
+        """Length of the rendered message, kept with the tokens so it is rendered once"""
+        if not self.text_length:
+            self.tokens = self.calculate_tokens()
+        return self.text_length
+
     def calculate_tokens(self):
         text = self.output_text()
+        self.text_length = len(text)
         return tokens.approximate_tokens(text)
 
     def set_summary(self, summary: str):
@@ -156,44 +169,38 @@ class Topic(Record):
         return self.summary
 
     async def compress_large_messages(self) -> bool:
-        set = settings.get_settings()
-        msg_max_size = (
-            set["chat_model_ctx_length"]
-            * set["chat_model_ctx_history"]
-            * CURRENT_TOPIC_RATIO
-            * LARGE_MESSAGE_TO_TOPIC_RATIO
-        )
-        large_msgs = []
-        for m in (m for m in self.messages if not m.summary):
-            # TODO refactor this
-            out = m.output()
-            text = output_text(out)
-            tok = m.get_tokens()
-            leng = len(text)
-            if tok > msg_max_size:
-                large_msgs.append((m, tok, leng, out))
-        large_msgs.sort(key=lambda x: x[1], reverse=True)
-        for msg, tok, leng, out in large_msgs:
-            trim_to_chars = leng * (msg_max_size / tok)
-            # raw messages will be replaced as a whole, they would become invalid when truncated
-            if _is_raw_message(out[0]["content"]):
-                msg.set_summary(
-                    "Message content replaced to save space in context window"
-                )
-
-            # regular messages will be truncated
-            else:
-                trunc = messages.truncate_dict_by_ratio(
-                    self.history.agent,
-                    out[0]["content"],
-                    trim_to_chars * 1.15,
-                    trim_to_chars * 0.85,
-                )
-                msg.set_summary(_json_dumps(trunc))
-
+        msg_max_size = _get_ctx_size_for_history() * CURRENT_TOPIC_RATIO * LARGE_MESSAGE_TO_TOPIC_RATIO
+        for msg, tok in self.get_large_messages(msg_max_size):
+            msg.set_summary(self.get_truncated_content(msg, tok, msg_max_size))
             return True
         return False
 
+    def get_large_messages(self, msg_max_size: float) -> list[tuple[Message, int]]:
+        """Messages over the size limit with their tokens, largest first"""
+        large_msgs = [
+            (m, m.get_tokens())
+            for m in self.messages
+            if not m.summary and m.get_tokens() > msg_max_size
+        ]
+        large_msgs.sort(key=lambda x: x[1], reverse=True)
+        return large_msgs
+
+    def get_truncated_content(self, msg: Message, tok: int, msg_max_size: float) -> str:
+        out = msg.output()
+        trim_to_chars = msg.get_text_length() * (msg_max_size / tok)
+        # raw messages will be replaced as a whole, they would become invalid when truncated
+        if _is_raw_message(out[0]["content"]):
+            return "Message content replaced to save space in context window"
+
+        # regular messages will be truncated
+        trunc = messages.truncate_dict_by_ratio(
+            self.history.agent,
+            out[0]["content"],
+            trim_to_chars * 1.15,
+            trim_to_chars * 0.85,
+        )
+        return _json_dumps(trunc)
+
     async def compress(self) -> bool:
         compress = await self.compress_large_messages()
         if not compress:
@@ -214,6 +221,13 @@ class Topic(Record):
             return True
         return False
 
+    def get_attention_messages(self) -> list[Message]:
+        """Messages after the first one to summarize when compressing attention"""
+        if len(self.messages) > 2:
+            cnt_to_sum = math.ceil((len(self.messages) - 2) * TOPIC_COMPRESS_RATIO)
+            return self.messages[1 : cnt_to_sum + 1]
+        return []
+
     async def summarize_messages(self, messages: list[Message]):
         # FIXME: vision bytes are sent to utility LLM, send summary instead
         msg_txt = [m.output_text() for m in messages]
@@ -222,6 +236,7 @@ class Topic(Record):
             message=self.history.agent.read_prompt(
                 "fw.topic_summary.msg.md", content=msg_txt
             ),
+            priority=UtilityPriority.COMPRESSION,
         )
         return summary
 
@@ -272,6 +287,7 @@ class Bulk(Record):
             message=self.history.agent.read_prompt(
                 "fw.topic_summary.msg.md", content=self.output_text()
             ),
+            priority=UtilityPriority.COMPRESSION,
         )
         return self.summary
 
@@ -313,6 +329,12 @@ class History(Record):
         total = self.get_tokens()
         return total > limit
 
+    def get_compress_target(self) -> float:
+        """Part of the history budget to compress to, lower once over the soft limit"""
+        if self.get_tokens() > _get_ctx_size_for_history() * HISTORY_SOFT_LIMIT_RATIO:
+            return HISTORY_COMPRESS_TARGET_RATIO
+        return 1.0
+
     def get_bulks_tokens(self) -> int:
         return sum(record.get_tokens() for record in self.bulks)
 
@@ -361,39 +383,147 @@ class History(Record):
         data = self.to_dict()
         return _json_dumps(data)
 
-    async def compress(self):
+    async def compress(self, target_ratio: float = 1.0) -> bool:
+        """Compress parts of the history over their share of the budget.
+
+        Each round is planned from the cached token counts of all parts, its summarizations run
+        concurrently and the results are applied together. Another round follows when summaries
+        come out larger than estimated or topics were moved to bulks that can now be merged.
+        """
         compressed = False
         while True:
-            curr, hist, bulk = (
-                self.get_current_topic_tokens(),
-                self.get_topics_tokens(),
-                self.get_bulks_tokens(),
-            )
-            total = _get_ctx_size_for_history()
-            ratios = [
-                (curr, CURRENT_TOPIC_RATIO, "current_topic"),
-                (hist, HISTORY_TOPIC_RATIO, "history_topic"),
-                (bulk, HISTORY_BULK_RATIO, "history_bulk"),
-            ]
-            ratios = sorted(ratios, key=lambda x: (x[0] / total) / x[1], reverse=True)
-            compressed_part = False
-            for ratio in ratios:
-                if ratio[0] > ratio[1] * total:
-                    over_part = ratio[2]
-                    if over_part == "current_topic":
-                        compressed_part = await self.current.compress()
-                    elif over_part == "history_topic":
-                        compressed_part = await self.compress_topics()
-                    else:
-                        compressed_part = await self.compress_bulks()
-                    if compressed_part:
-                        break
-
-            if compressed_part:
-                compressed = True
-                continue
-            else:
+            plan = self.plan_compression(target_ratio)
+            if not plan:
+                return compressed
+            before = self.get_tokens()
+            topics_before = len(self.topics)
+            await self.apply_compression(plan)
+            # moves keep the token count, but they are limited by the number of topics,
+            # summaries that do not shrink the history would loop forever
+            if self.get_tokens() >= before and len(self.topics) >= topics_before:
                 return compressed
+            compressed = True
+
+    def plan_compression(self, target_ratio: float = 1.0) -> "CompressionPlan":
+        limit = _get_ctx_size_for_history() * target_ratio
+        plan = CompressionPlan()
+        self._plan_current_topic(plan, limit * CURRENT_TOPIC_RATIO)
+        moved_tokens = self._plan_topics(plan, limit * HISTORY_TOPIC_RATIO)
+        self._plan_bulks(plan, limit * HISTORY_BULK_RATIO, moved_tokens)
+        return plan
+
+    def _plan_current_topic(self, plan: "CompressionPlan", budget: float):
+        total = self.current.get_tokens()
+        if total <= budget:
+            return
+
+        # large messages are truncated locally, all of them in one round
+        msg_max_size = budget * LARGE_MESSAGE_TO_TOPIC_RATIO
+        for msg, tok in self.current.get_large_messages(msg_max_size):
+            content = self.current.get_truncated_content(msg, tok, msg_max_size)
+            plan.truncate.append((msg, content))
+            total -= tok - tokens.approximate_tokens(content)
+
+        if total > budget:
+            attention = self.current.get_attention_messages()
+            if attention:
+                plan.attention.append((self.current, attention))
+
+    def _plan_topics(self, plan: "CompressionPlan", budget: float) -> int:
+        total = self.get_topics_tokens()
+        moved_tokens = 0
+
+        # summarize oldest topics first
+        for topic in self.topics:
+            if total <= budget:
+                break
+            if not topic.summary:
+                tok = topic.get_tokens()
+                plan.summarize.append(topic)
+                total -= tok - int(tok * SUMMARY_TOKENS_RATIO)
+
+        # all summarized and still over, move oldest topics to bulks
+        for topic in self.topics:
+            if total <= budget:
+                break
+            tok = topic.get_tokens()
+            if not topic.summary:
+                tok = int(tok * SUMMARY_TOKENS_RATIO)
+            plan.move.append(topic)
+            total -= tok
+            moved_tokens += tok
+
+        return moved_tokens
+
+    def _plan_bulks(self, plan: "CompressionPlan", budget: float, moved_tokens: int):
+        total = self.get_bulks_tokens() + moved_tokens
+        if total <= budget:
+            return
+
+        # merge bulks in groups of BULK_MERGE_COUNT, a single bulk is summarized again,
+        # topics moved in this round are merged in the next one
+        groups = [
+            self.bulks[i : i + BULK_MERGE_COUNT]
+            for i in range(0, len(self.bulks), BULK_MERGE_COUNT)
+        ]
+        groups = [group for group in groups if len(group) > 1] or groups
+        for group in groups:
+            plan.merge.append(group)
+            tok = sum(bulk.get_tokens() for bulk in group)
+            total -= tok - int(tok * SUMMARY_TOKENS_RATIO)
+
+        # remove oldest bulks if merging is not enough
+        for bulk in self.bulks:
+            if total <= budget:
+                break
+            if not any(bulk in group for group in plan.merge):
+                plan.drop.append(bulk)
+                total -= bulk.get_tokens()
+
+    async def apply_compression(self, plan: "CompressionPlan"):
+        # truncation needs no model, summaries are made from the truncated messages
+        for msg, content in plan.truncate:
+            msg.set_summary(content)
+
+        semaphore = asyncio.Semaphore(COMPRESSION_CONCURRENCY)
+
+        async def limited(coro: Coroutine[Any, Any, Any]):
+            async with semaphore:
+                return await coro
+
+        # history is not changed until all summaries are done, a failed one fails the round
+        attention, summaries, merged = await asyncio.gather(
+            asyncio.gather(*[limited(topic.summarize_messages(msgs)) for topic, msgs in plan.attention]),
+            asyncio.gather(*[limited(topic.summarize_messages(topic.messages)) for topic in plan.summarize]),
+            asyncio.gather(*[limited(self.merge_bulks(group)) for group in plan.merge]),
+        )
+
+        # messages and topics were added meanwhile, records are found by identity
+        for (topic, msgs), summary in zip(plan.attention, attention):
+            start = _find_run(topic.messages, msgs)
+            if start >= 0:
+                sum_msg_content = self.agent.parse_prompt("fw.msg_summary.md", summary=summary)
+                topic.messages[start : start + len(msgs)] = [Message(False, sum_msg_content)]
+
+        for topic, summary in zip(plan.summarize, summaries):
+            topic.summary = summary
+
+        for group, bulk in zip(plan.merge, merged):
+            start = _find_run(self.bulks, group)
+            if start >= 0:
+                self.bulks[start : start + len(group)] = [bulk]
+
+        for bulk in plan.drop:
+            if any(b is bulk for b in self.bulks):
+                self.bulks.remove(bulk)
+
+        for topic in plan.move:
+            if topic.summary and any(t is topic for t in self.topics):
+                bulk = Bulk(history=self)
+                bulk.records.append(topic)
+                bulk.summary = topic.summary
+                self.bulks.append(bulk)
+                self.topics.remove(topic)
 
     async def compress_topics(self) -> bool:
         # summarize topics one by one
@@ -445,6 +575,34 @@ class History(Record):
         return bulk
 
 
+class CompressionPlan:
+    """Steps of one history compression round."""
+
+    def __init__(self):
+        self.truncate: list[tuple[Message, str]] = []  # large messages and their truncated content
+        self.attention: list[tuple[Topic, list[Message]]] = []  # messages to replace by a summary
+        self.summarize: list[Topic] = []  # topics to summarize
+        self.move: list[Topic] = []  # summarized topics to move to bulks
+        self.merge: list[list[Bulk]] = []  # groups of bulks to merge into one
+        self.drop: list[Bulk] = []  # oldest bulks to remove
+
+    def __bool__(self):
+        return bool(
+            self.truncate or self.attention or self.summarize
+            or self.move or self.merge or self.drop
+        )
+
+
+def _find_run(records: list, run: list) -> int:
+    """Index of the run of records in the list, compared by identity, -1 if not there in order"""
+    for i, record in enumerate(records):
+        if record is run[0]:
+            if len(records) >= i + len(run) and all(a is b for a, b in zip(records[i:], run)):
+                return i
+            return -1
+    return -1
+
+
 def deserialize_history(json_data: str, agent) -> History:
     history = History(agent=agent)
     if json_data:
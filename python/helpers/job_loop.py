@@ -5,6 +5,7 @@ from python.helpers.task_scheduler import TaskScheduler
 from python.helpers.print_style import PrintStyle
 from python.helpers import errors
 from python.helpers import runtime
+from python.helpers import persist_chat
 
 
 SLEEP_TIME = 60
@@ -15,23 +16,33 @@ pause_time = 0
 
 async def run_loop():
     global pause_time, keep_running
+    last_pause_call = 0.0
 
     while True:
-        if runtime.is_development():
+        if runtime.is_development() and time.time() - last_pause_call >= SLEEP_TIME:
             # Signal to container that the job loop should be paused
             # if we are runing a development instance to avoid duble-running the jobs
+            last_pause_call = time.time()
             try:
                 await runtime.call_development_function(pause_loop)
             except Exception as e:
                 PrintStyle().error("Failed to pause job loop by development instance: " + errors.error_text(e))
         if not keep_running and (time.time() - pause_time) > (SLEEP_TIME * 2):
             resume_loop()
+        try:
+            # idle chats are saved and dropped from memory, they are loaded again when opened
+            persist_chat.unload_idle_chats()
+        except Exception as e:
+            PrintStyle().error(errors.format_error(e))
         if keep_running:
             try:
                 await scheduler_tick()
             except Exception as e:
                 PrintStyle().error(errors.format_error(e))
-        await asyncio.sleep(SLEEP_TIME)  # TODO! - if we lower it under 1min, it can run a 5min job multiple times in it's target minute
+            # wake up exactly when the next task is due, each scheduled run is queued only once
+            await TaskScheduler.get().wait_for_next(SLEEP_TIME)
+        else:
+            await asyncio.sleep(SLEEP_TIME)
 
 
 async def scheduler_tick():
@@ -1,7 +1,10 @@
+import asyncio
 import glob
 import os
 import hashlib
-from typing import Any, Dict, Literal, TypedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Literal, NotRequired, TypedDict
 from langchain_community.document_loaders import (
     CSVLoader,
     PyPDFLoader,
@@ -13,6 +16,23 @@ from python.helpers.print_style import PrintStyle
 
 text_loader_kwargs = {"autodetect_encoding": True}
 
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+MAX_WORKERS = 4  # processes parsing changed files
+MAX_PENDING_FILES = MAX_WORKERS * 2  # parsed files waiting for insertion, limits memory use
+
+# Mapping file extensions to corresponding loader classes
+# Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
+file_types_loaders = {
+    "txt": TextLoader,
+    "pdf": PyPDFLoader,
+    "csv": CSVLoader,
+    "html": UnstructuredHTMLLoader,
+    "json": TextLoader,  # Use TextLoader for better consolidation compatibility
+    "md": TextLoader,    # Use TextLoader for better consolidation compatibility
+}
+
+_executor: ProcessPoolExecutor | None = None
+
 
 class KnowledgeImport(TypedDict):
     file: str
@@ -20,16 +40,23 @@ class KnowledgeImport(TypedDict):
     ids: list[str]
     state: Literal["changed", "original", "removed"]
     documents: list[Any]
+    stat: NotRequired[list[int]]  # mtime_ns, size, inode at the time of checksum
+    metadata: NotRequired[dict[str, Any]]  # metadata for changed files, set until parsed
 
 
 def calculate_checksum(file_path: str) -> str:
     hasher = hashlib.md5()
     with open(file_path, "rb") as f:
-        buf = f.read()
-        hasher.update(buf)
+        while buf := f.read(CHECKSUM_CHUNK_SIZE):
+            hasher.update(buf)
     return hasher.hexdigest()
 
 
+def get_file_stat(file_path: str) -> list[int]:
+    st = os.stat(file_path)
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
 def load_knowledge(
     log_item: LogItem | None,
     knowledge_dir: str,
@@ -38,25 +65,14 @@ def load_knowledge(
     filename_pattern: str = "**/*",
 ) -> Dict[str, KnowledgeImport]:
     """
-    Load knowledge files from a directory with change detection and metadata enhancement.
+    Scan knowledge files in a directory and detect changes.
 
-    This function now includes enhanced error handling and compatibility with the
-    intelligent memory consolidation system.
+    Files whose mtime, size and inode match the index are not read at all, other files
+    are hashed and marked "changed" when the checksum differs. Changed files are only
+    marked here, their documents are produced by load_documents.
     """
 
-    # Mapping file extensions to corresponding loader classes
-    # Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
-    file_types_loaders = {
-        "txt": TextLoader,
-        "pdf": PyPDFLoader,
-        "csv": CSVLoader,
-        "html": UnstructuredHTMLLoader,
-        "json": TextLoader,  # Use TextLoader for better consolidation compatibility
-        "md": TextLoader,    # Use TextLoader for better consolidation compatibility
-    }
-
     cnt_files = 0
-    cnt_docs = 0
 
     # Validate and create knowledge directory if needed
     if not knowledge_dir:
@@ -124,10 +140,6 @@ def load_knowledge(
             if ext not in file_types_loaders:
                 continue  # Skip unsupported file types
 
-            checksum = calculate_checksum(file_path)
-            if not checksum:
-                continue  # Skip files with checksum errors
-
             file_key = file_path
 
             # Load existing data from the index or create a new entry
@@ -139,51 +151,27 @@ def load_knowledge(
                 "documents": []
             })
 
+            # Fast path, unchanged stat means unchanged file, no need to read it
+            stat = get_file_stat(file_path)
+            if file_data.get("checksum") and file_data.get("stat") == stat:
+                file_data["state"] = "original"
+                index[file_key] = file_data
+                continue
+
+            checksum = calculate_checksum(file_path)
+            if not checksum:
+                continue  # Skip files with checksum errors
+            file_data["stat"] = stat
+
             # Check if file has changed
             if file_data.get("checksum") == checksum:
                 file_data["state"] = "original"
             else:
                 file_data["state"] = "changed"
-
-            # Process changed files
-            if file_data["state"] == "changed":
                 file_data["checksum"] = checksum
-                loader_cls = file_types_loaders[ext]
-
-                try:
-                    loader = loader_cls(
-                        file_path,
-                        **(
-                            text_loader_kwargs
-                            if ext in ["txt", "csv", "html", "md"]
-                            else {}
-                        ),
-                    )
-                    documents = loader.load_and_split()
-
-                    # Enhanced metadata for better consolidation compatibility
-                    enhanced_metadata = {
-                        **metadata,
-                        "source_file": os.path.basename(file_path),
-                        "source_path": file_path,
-                        "file_type": ext,
-                        "knowledge_source": True,  # Flag to distinguish from conversation memories
-                        "import_timestamp": None,  # Will be set when inserted into memory
-                    }
-
-                    # Apply metadata to all documents
-                    for doc in documents:
-                        doc.metadata = {**doc.metadata, **enhanced_metadata}
-
-                    file_data["documents"] = documents
-                    cnt_files += 1
-                    cnt_docs += len(documents)
-
-                except Exception as e:
-                    PrintStyle(font_color="red").print(f"Error loading {file_path}: {e}")
-                    if log_item:
-                        log_item.stream(progress=f"\nError loading {os.path.basename(file_path)}: {e}")
-                    continue
+                file_data["documents"] = []
+                file_data["metadata"] = metadata
+                cnt_files += 1
 
             # Update the index
             index[file_key] = file_data
@@ -199,11 +187,109 @@ def load_knowledge(
             index[file_key]["state"] = "removed"
 
     # Log results
-    if cnt_files > 0 or cnt_docs > 0:
-        PrintStyle.standard(f"Processed {cnt_docs} documents from {cnt_files} files.")
+    if cnt_files > 0:
+        PrintStyle.standard(f"Found {cnt_files} new or changed files.")
         if log_item:
-            log_item.stream(
-                progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files."
-            )
+            log_item.stream(progress=f"\nFound {cnt_files} new or changed files.")
 
     return index
+
+
+async def load_documents(
+    log_item: LogItem | None,
+    index: Dict[str, KnowledgeImport],
+    on_documents: Callable[[KnowledgeImport, list[Any]], Awaitable[None]],
+):
+    """
+    Parse changed files of the index in a process pool and pass the documents of each file
+    to on_documents as soon as they are ready. At most MAX_PENDING_FILES files are parsed
+    ahead of the consumer, so a slow consumer (embedding) holds back parsing.
+    """
+    changed = [data for data in index.values() if data["state"] == "changed"]
+    if not changed:
+        return
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor() if len(changed) > 1 else None
+    pending: dict[asyncio.Future, KnowledgeImport] = {}
+    queued = list(changed)
+    cnt_files = 0
+    cnt_docs = 0
+
+    def submit(file_data: KnowledgeImport):
+        future = loop.run_in_executor(
+            executor,
+            _load_file,
+            file_data["file"],
+            file_data.get("metadata", {}),
+        )
+        pending[future] = file_data
+
+    while queued or pending:
+        while queued and len(pending) < MAX_PENDING_FILES:
+            submit(queued.pop(0))
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            file_data = pending.pop(future)
+            file_data.pop("metadata", None)
+            try:
+                documents = future.result()
+            except Exception as e:
+                # clear the checksum so the file is retried next time
+                file_data["checksum"] = ""
+                file_data["ids"] = []
+                PrintStyle(font_color="red").print(f"Error loading {file_data['file']}: {e}")
+                if log_item:
+                    log_item.stream(progress=f"\nError loading {os.path.basename(file_data['file'])}: {e}")
+                continue
+            await on_documents(file_data, documents)
+            cnt_files += 1
+            cnt_docs += len(documents)
+            if log_item:
+                log_item.update(heading=f"Preloading knowledge... {cnt_files}/{len(changed)} files, {cnt_docs} documents")
+
+    PrintStyle.standard(f"Processed {cnt_docs} documents from {cnt_files} files.")
+    if log_item:
+        log_item.stream(progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files.")
+
+
+def _load_file(file_path: str, metadata: dict[str, Any]) -> list[Any]:
+    # runs in a worker process
+    ext = os.path.basename(file_path).split('.')[-1].lower()
+    loader_cls = file_types_loaders[ext]
+    loader = loader_cls(
+        file_path,
+        **(
+            text_loader_kwargs
+            if ext in ["txt", "csv", "html", "md"]
+            else {}
+        ),
+    )
+    documents = loader.load_and_split()
+
+    # Enhanced metadata for better consolidation compatibility
+    enhanced_metadata = {
+        **metadata,
+        "source_file": os.path.basename(file_path),
+        "source_path": file_path,
+        "file_type": ext,
+        "knowledge_source": True,  # Flag to distinguish from conversation memories
+        "import_timestamp": None,  # Will be set when inserted into memory
+    }
+
+    # Apply metadata to all documents
+    for doc in documents:
+        doc.metadata = {**doc.metadata, **enhanced_metadata}
+
+    return documents
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, forking the multi-threaded server process is not safe
+        _executor = ProcessPoolExecutor(
+            max_workers=min(MAX_WORKERS, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
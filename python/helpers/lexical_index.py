@@ -0,0 +1,200 @@
+import bisect
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Callable, Iterable
+
+from langchain_core.documents import Document
+
+from python.helpers.print_style import PrintStyle
+
+INDEX_FILE = "lexical.json"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # reciprocal rank fusion constant
+
+_TOKEN_RE = re.compile(r"\w+(?:[.\-/:]\w+)*")
+_PART_RE = re.compile(r"[.\-/:_]")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens, compound identifiers like file names and error codes are kept whole and split."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = [part for part in _PART_RE.split(token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class LexicalIndex:
+    """Inverted index over document contents with BM25 scoring.
+
+    Also keeps documents ordered by timestamp for cursor paginated listing.
+    Term frequencies are persisted next to the FAISS index, postings are rebuilt on load.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._terms: dict[str, dict[str, int]] = {}  # doc id -> term frequencies
+        self._lengths: dict[str, int] = {}
+        self._postings: dict[str, dict[str, int]] = {}  # term -> doc id -> frequency
+        self._total_length = 0
+        self._timestamps: dict[str, str] = {}
+        self._by_time: list[tuple[str, str]] = []  # sorted (timestamp, id)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def add(self, docs: Iterable[Document]):
+        with self._lock:
+            for doc in docs:
+                id = doc.metadata["id"]
+                self._remove(id)
+                terms = dict(Counter(tokenize(doc.page_content)))
+                self._insert(id, terms, doc.metadata.get("timestamp", ""))
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for id in ids:
+                self._remove(id)
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        accept: Callable[[str], bool] | None = None,
+    ) -> list[tuple[str, float]]:
+        """Return (doc id, BM25 score) pairs, best first, optionally filtered by accept(id)."""
+        query_terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._terms)
+            if not count or not query_terms:
+                return []
+            avg_length = self._total_length / count
+            scores: dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for id, freq in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[id] / avg_length)
+                    scores[id] = scores.get(id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        result = []
+        for id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            if accept and not accept(id):
+                continue
+            result.append((id, score))
+            if len(result) >= limit:
+                break
+        return result
+
+    def list(
+        self,
+        limit: int,
+        cursor: str = "",
+        accept: Callable[[str], bool] | None = None,
+    ) -> tuple[list[str], str]:
+        """Return doc ids newest first after the cursor and the cursor for the next page ("" when done)."""
+        with self._lock:
+            position = len(self._by_time)
+            if cursor:
+                timestamp, _, id = cursor.partition("|")
+                position = bisect.bisect_left(self._by_time, (timestamp, id))
+            ids = []
+            while position > 0 and len(ids) < limit:
+                position -= 1
+                id = self._by_time[position][1]
+                if accept and not accept(id):
+                    continue
+                ids.append(id)
+            if position == 0 or not ids:
+                return ids, ""
+            last = ids[-1]
+            return ids, f"{self._timestamps[last]}|{last}"
+
+    def matches(self, docs: dict[str, Document]) -> bool:
+        return self._terms.keys() == docs.keys()
+
+    def save(self, folder: str):
+        with self._lock:
+            data = {
+                id: [self._timestamps.get(id, ""), terms]
+                for id, terms in self._terms.items()
+            }
+            content = json.dumps(data, ensure_ascii=False)
+        path = os.path.join(folder, INDEX_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(folder: str, docs: dict[str, Document]) -> "LexicalIndex":
+        """Load the persisted index, rebuild it from docs when missing or out of sync."""
+        index = LexicalIndex()
+        path = os.path.join(folder, INDEX_FILE)
+        try:
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for id, (timestamp, terms) in data.items():
+                    index._insert(id, terms, timestamp, sort=False)
+                index._by_time.sort()
+                if index.matches(docs):
+                    return index
+        except Exception as e:
+            PrintStyle.error(f"Failed to load lexical index: {e}")
+        index = LexicalIndex()
+        for id, doc in docs.items():
+            terms = dict(Counter(tokenize(doc.page_content)))
+            index._insert(id, terms, doc.metadata.get("timestamp", ""), sort=False)
+        index._by_time.sort()
+        try:
+            index.save(folder)
+        except Exception as e:
+            PrintStyle.error(f"Failed to save lexical index: {e}")
+        return index
+
+    def _insert(self, id: str, terms: dict[str, int], timestamp: str, sort: bool = True):
+        self._terms[id] = terms
+        length = sum(terms.values())
+        self._lengths[id] = length
+        self._total_length += length
+        for term, freq in terms.items():
+            self._postings.setdefault(term, {})[id] = freq
+        self._timestamps[id] = timestamp
+        if sort:
+            bisect.insort(self._by_time, (timestamp, id))
+        else:
+            self._by_time.append((timestamp, id))
+
+    def _remove(self, id: str):
+        terms = self._terms.pop(id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(id, 0)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings:
+                postings.pop(id, None)
+                if not postings:
+                    del self._postings[term]
+        timestamp = self._timestamps.pop(id, "")
+        position = bisect.bisect_left(self._by_time, (timestamp, id))
+        if position < len(self._by_time) and self._by_time[position] == (timestamp, id):
+            del self._by_time[position]
+
+
+def fuse_rankings(*rankings: list[str], k: int = RRF_K) -> list[str]:
+    """Reciprocal rank fusion of several ranked id lists."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking):
+            scores[id] = scores.get(id, 0.0) + 1 / (k + rank + 1)
+    return sorted(scores, key=lambda id: scores[id], reverse=True)
@@ -38,7 +38,7 @@ from anyio.streams.memory import (
 )
 
 from pydantic import BaseModel, Field, Discriminator, Tag, PrivateAttr
-from python.helpers import dirty_json
+from python.helpers import dirty_json, tracing
 from python.helpers.print_style import PrintStyle
 from python.helpers.tool import Tool, Response
 
@@ -775,7 +775,8 @@ class MCPConfig(BaseModel):
         with self.__lock:
             for server in self.servers:
                 if server.name == server_name_part and server.has_tool(tool_name_part):
-                    return await server.call_tool(tool_name_part, input_data)
+                    with tracing.span(tool_name, "mcp", server=server_name_part):
+                        return await server.call_tool(tool_name_part, input_data)
             raise ValueError(f"Tool {tool_name} not found")
 
 
@@ -5,9 +5,8 @@ from openai import BaseModel
 from pydantic import Field
 from fastmcp import FastMCP
 
-from agent import AgentContext, AgentContextType, UserMessage
-from python.helpers.persist_chat import remove_chat
-from initialize import initialize_agent
+from agent import AgentContext, UserMessage
+from python.helpers.context_pool import ContextPool
 from python.helpers.print_style import PrintStyle
 from python.helpers import settings
 from starlette.middleware import Middleware
@@ -138,8 +137,9 @@ async def send_message(
             # If we continue a conversation, it must be persistent
             persistent_chat = True
     else:
-        config = initialize_agent()
-        context = AgentContext(config=config, type=AgentContextType.BACKGROUND)
+        if not message:
+            return ToolError(error="Message is required", chat_id="")
+        context = ContextPool.get_instance().acquire()
 
     if not message:
         return ToolError(
@@ -149,13 +149,13 @@ async def send_message(
     try:
         response = await _run_chat(context, message, attachments)
         if not persistent_chat:
-            context.reset()
-            AgentContext.remove(context.id)
-            remove_chat(context.id)
+            ContextPool.get_instance().release(context)
         return ToolResponse(
             response=response, chat_id=context.id if persistent_chat else ""
         )
     except Exception as e:
+        if not persistent_chat:
+            ContextPool.get_instance().release(context)
         return ToolError(error=str(e), chat_id=context.id if persistent_chat else "")
 
 
@@ -212,9 +212,7 @@ async def finish_chat(
     if not context:
         return ToolError(error="Chat not found", chat_id=chat_id)
     else:
-        context.reset()
-        AgentContext.remove(context.id)
-        remove_chat(context.id)
+        ContextPool.get_instance().release(context)
         return ToolResponse(response="Chat finished", chat_id=chat_id)
 
 
@@ -18,14 +18,15 @@ from langchain_community.vectorstores.utils import (
 )
 from langchain_core.embeddings import Embeddings
 
-import os, json
+import os, json, asyncio
 
 import numpy as np
 
 from python.helpers.print_style import PrintStyle
 from . import files
 from langchain_core.documents import Document
-from python.helpers import knowledge_import
+from python.helpers import knowledge_import, tracing
+from python.helpers.lexical_index import LexicalIndex, fuse_rankings
 from python.helpers.log import Log, LogItem
 from enum import Enum
 from agent import Agent
@@ -34,11 +35,15 @@ import logging
 from simpleeval import simple_eval
 
 
+KNOWLEDGE_BATCH_SIZE = 256  # documents embedded and inserted at once during knowledge import
+
 # Raise the log level so WARNING messages aren't shown
 logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
 
 class MyFaiss(FAISS):
+    lexical: LexicalIndex  # kept in sync with the docstore by Memory
+
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -232,6 +237,7 @@ class Memory:
 
             created = True
 
+        db.lexical = LexicalIndex.load(db_dir, db.get_all_docs())
         return db, created
 
     def __init__(
@@ -263,20 +269,41 @@ class Memory:
             with open(index_path, "r") as f:
                 index = json.load(f)
 
-        # preload knowledge folders
-        index = self._preload_knowledge_folders(log_item, kn_dirs, index)
+        # scan knowledge folders off the event loop, unchanged files are only stat-ed
+        index = await asyncio.to_thread(
+            self._preload_knowledge_folders, log_item, kn_dirs, index
+        )
 
-        for file in index:
-            if index[file]["state"] in ["changed", "removed"] and index[file].get(
-                "ids", []
-            ):  # for knowledge files that have been changed or removed and have IDs
-                await self.delete_documents_by_ids(
-                    index[file]["ids"]
-                )  # remove original version
-            if index[file]["state"] == "changed":
-                index[file]["ids"] = await self.insert_documents(
-                    index[file]["documents"]
-                )  # insert new version
+        # remove original versions of knowledge files that have been changed or removed
+        old_ids = [
+            id
+            for data in index.values()
+            if data["state"] in ["changed", "removed"]
+            for id in data.get("ids", [])
+        ]
+        if old_ids:
+            await self.delete_documents_by_ids(old_ids)
+
+        # insert new versions in batches while the next files are being parsed
+        batch: list[tuple[knowledge_import.KnowledgeImport, list[Document]]] = []
+
+        async def insert_batch():
+            docs = [doc for _, file_docs in batch for doc in file_docs]
+            ids = await self.insert_documents(docs, persist=False)
+            for file_data, file_docs in batch:
+                file_data["ids"], ids = ids[: len(file_docs)], ids[len(file_docs) :]
+            batch.clear()
+
+        async def on_documents(file_data, documents):
+            batch.append((file_data, documents))
+            if sum(len(file_docs) for _, file_docs in batch) >= KNOWLEDGE_BATCH_SIZE:
+                await insert_batch()
+
+        await knowledge_import.load_documents(log_item, index, on_documents)
+        if batch:
+            await insert_batch()
+        if old_ids or any(data["state"] == "changed" for data in index.values()):
+            self._save_db()  # persist
 
         # remove index where state="removed"
         index = {k: v for k, v in index.items() if v["state"] != "removed"}
@@ -325,13 +352,51 @@ class Memory:
     ):
         comparator = Memory._get_comparator(filter) if filter else None
 
-        return await self.db.asearch(
-            query,
-            search_type="similarity_score_threshold",
-            k=limit,
-            score_threshold=threshold,
-            filter=comparator,
+        with tracing.span("search_similarity", "memory", memory=self.memory_subdir, limit=limit):
+            return await self.db.asearch(
+                query,
+                search_type="similarity_score_threshold",
+                k=limit,
+                score_threshold=threshold,
+                filter=comparator,
+            )
+
+    async def search_lexical(self, query: str, limit: int, filter: str = ""):
+        accept = self._get_id_comparator(filter) if filter else None
+        with tracing.span("search_lexical", "memory", memory=self.memory_subdir, limit=limit):
+            found = self.db.lexical.search(query, limit, accept)
+        return self.db.get_by_ids([id for id, _score in found])
+
+    async def search_hybrid(
+        self, query: str, limit: int, threshold: float, filter: str = ""
+    ):
+        # vector hits over the threshold and keyword hits fused by rank
+        vector_docs = await self.search_similarity_threshold(
+            query, limit=limit, threshold=threshold, filter=filter
+        )
+        lexical_docs = await self.search_lexical(query, limit=limit, filter=filter)
+        ids = fuse_rankings(
+            [doc.metadata["id"] for doc in vector_docs],
+            [doc.metadata["id"] for doc in lexical_docs],
         )
+        return self.db.get_by_ids(ids[:limit])
+
+    async def search(
+        self, query: str, limit: int, threshold: float, filter: str = "", mode: str = "vector"
+    ):
+        if mode == "hybrid":
+            return await self.search_hybrid(query, limit, threshold, filter)
+        if mode == "lexical":
+            return await self.search_lexical(query, limit, filter)
+        return await self.search_similarity_threshold(query, limit, threshold, filter)
+
+    def list_documents(
+        self, limit: int, cursor: str = "", filter: str = ""
+    ) -> tuple[list[Document], str]:
+        """Newest documents first, returns the page and the cursor of the next page."""
+        accept = self._get_id_comparator(filter) if filter else None
+        ids, next_cursor = self.db.lexical.list(limit, cursor, accept)
+        return self.db.get_by_ids(ids), next_cursor
 
     async def delete_documents_by_query(
         self, query: str, threshold: float, filter: str = ""
@@ -357,6 +422,7 @@ class Memory:
                 # if fnd["ids"]: self.db.delete(ids=fnd["ids"])
                 # tot += len(fnd["ids"])
                 await self.db.adelete(ids=document_ids)
+                self.db.lexical.remove(document_ids)
                 tot += len(document_ids)
 
             # If fewer than K document IDs, break the loop
@@ -375,6 +441,7 @@ class Memory:
         if rem_docs:
             rem_ids = [doc.metadata["id"] for doc in rem_docs]  # ids to remove
             await self.db.adelete(ids=rem_ids)
+            self.db.lexical.remove(rem_ids)
 
         if rem_docs:
             self._save_db()  # persist
@@ -385,7 +452,7 @@ class Memory:
         ids = await self.insert_documents([doc])
         return ids[0]
 
-    async def insert_documents(self, docs: list[Document]):
+    async def insert_documents(self, docs: list[Document], persist: bool = True):
         ids = [self._generate_doc_id() for _ in range(len(docs))]
         timestamp = self.get_timestamp()
 
@@ -397,13 +464,16 @@ class Memory:
                     doc.metadata["area"] = Memory.Area.MAIN.value
 
             await self.db.aadd_documents(documents=docs, ids=ids)
-            self._save_db()  # persist
+            self.db.lexical.add(docs)
+            if persist:
+                self._save_db()  # persist
         return ids
 
     async def update_documents(self, docs: list[Document]):
         ids = [doc.metadata["id"] for doc in docs]
         await self.db.adelete(ids=ids)  # delete originals
         ins = await self.db.aadd_documents(documents=docs, ids=ids)  # add updated
+        self.db.lexical.add(docs)
         self._save_db()  # persist
         return ins
 
@@ -420,6 +490,8 @@ class Memory:
     def _save_db_file(db: MyFaiss, memory_subdir: str):
         abs_dir = Memory._abs_db_dir(memory_subdir)
         db.save_local(folder_path=abs_dir)
+        if getattr(db, "lexical", None):
+            db.lexical.save(abs_dir)
 
     @staticmethod
     def _get_comparator(condition: str):
@@ -433,6 +505,16 @@ class Memory:
 
         return comparator
 
+    def _get_id_comparator(self, condition: str):
+        comparator = Memory._get_comparator(condition)
+        docs = self.db.get_all_docs()
+
+        def accept(id: str):
+            doc = docs.get(id)
+            return bool(doc and comparator(doc.metadata))
+
+        return accept
+
     @staticmethod
     def _score_normalizer(val: float) -> float:
         res = 1 - 1 / (1 + np.exp(val))
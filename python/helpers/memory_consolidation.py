@@ -10,6 +10,7 @@ from langchain_core.documents import Document
 from python.helpers.memory import Memory
 from python.helpers.dirty_json import DirtyJson
 from python.helpers.log import LogItem
+from python.helpers.utility_scheduler import UtilityPriority
 from python.helpers.print_style import PrintStyle
 from python.tools.memory_load import DEFAULT_THRESHOLD as DEFAULT_MEMORY_THRESHOLD
 from agent import Agent
@@ -433,7 +434,8 @@ class MemoryConsolidator:
             keywords_response = await self.agent.call_utility_model(
                 system=system_prompt,
                 message=message_prompt,
-                background=True
+                background=True,
+                priority=UtilityPriority.MEMORIZE,
             )
 
             # Parse the response - expect JSON array of strings
@@ -491,7 +493,8 @@ class MemoryConsolidator:
                 system=system_prompt,
                 message=message_prompt,
                 callback=None,
-                background=True
+                background=True,
+                priority=UtilityPriority.MEMORIZE,
             )
 
             # Parse LLM response
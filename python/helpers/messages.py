@@ -1,6 +1,15 @@
 # from . import files
 
 import json
+import re
+
+# stands in for the removed length while the placeholder template is cached
+_LENGTH_MARK = "\x00length\x00"
+# characters json escapes, all of them take two characters except other control characters with six
+_JSON_ESCAPED = re.compile(r'[\x00-\x1f"\\]')
+_JSON_SHORT_ESCAPES = '"\\\n\r\t\b\f'
+
+_placeholder_templates: dict[str, str] = {}
 
 
 def truncate_text(agent, output, threshold=1000):
@@ -8,11 +17,7 @@ def truncate_text(agent, output, threshold=1000):
     if not threshold or len(output) <= threshold:
         return output
 
-    # Adjust the file path as needed
-    placeholder = agent.read_prompt(
-        "fw.msg_truncated.md", length=(len(output) - threshold)
-    )
-    # placeholder = files.read_file("./prompts/default/fw.msg_truncated.md", length=(len(output) - threshold))
+    placeholder = _get_placeholder(agent, len(output) - threshold)
 
     start_len = (threshold - len(placeholder)) // 2
     end_len = threshold - len(placeholder) - start_len
@@ -24,52 +29,82 @@ def truncate_text(agent, output, threshold=1000):
 def truncate_dict_by_ratio(agent, data: dict|list|str, threshold_chars: int, truncate_to: int):
     threshold_chars = int(threshold_chars)
     truncate_to = int(truncate_to)
-    
-    def process_item(item):
+
+    # items are processed bottom-up and return their serialized size along with the result,
+    # only items being truncated are serialized, and only once as their result is a string
+    def process_item(item) -> tuple[object, int]:
         if isinstance(item, dict):
             truncated_dict = {}
             cumulative_size = 0
+            total_size = 2 + max(len(item) - 1, 0) * 2  # braces and separators
 
             for key, value in item.items():
-                processed_value = process_item(value)
-                serialized_value = json.dumps(processed_value, ensure_ascii=False)
-                size = len(serialized_value)
+                processed_value, size = process_item(value)
 
                 if cumulative_size + size > threshold_chars:
-                    truncated_dict[key] = truncate_text(
-                        agent, serialized_value, truncate_to
+                    processed_value = truncate_text(
+                        agent, json.dumps(processed_value, ensure_ascii=False), truncate_to
                     )
+                    size = json_size(processed_value)
                 else:
                     cumulative_size += size
-                    truncated_dict[key] = processed_value
+                truncated_dict[key] = processed_value
+                total_size += _json_key_size(key) + 2 + size
 
-            return truncated_dict
+            return truncated_dict, total_size
 
         elif isinstance(item, list):
             truncated_list = []
             cumulative_size = 0
+            total_size = 2 + max(len(item) - 1, 0) * 2  # brackets and separators
 
             for value in item:
-                processed_value = process_item(value)
-                serialized_value = json.dumps(processed_value, ensure_ascii=False)
-                size = len(serialized_value)
+                processed_value, size = process_item(value)
 
                 if cumulative_size + size > threshold_chars:
-                    truncated_list.append(
-                        truncate_text(agent, serialized_value, truncate_to)
+                    processed_value = truncate_text(
+                        agent, json.dumps(processed_value, ensure_ascii=False), truncate_to
                     )
+                    size = json_size(processed_value)
                 else:
                     cumulative_size += size
-                    truncated_list.append(processed_value)
+                truncated_list.append(processed_value)
+                total_size += size
 
-            return truncated_list
+            return truncated_list, total_size
 
         elif isinstance(item, str):
             if len(item) > threshold_chars:
-                return truncate_text(agent, item, truncate_to)
-            return item
+                item = truncate_text(agent, item, truncate_to)
+            return item, json_size(item)
 
         else:
-            return item
+            return item, len(json.dumps(item, ensure_ascii=False))
+
+    return process_item(data)[0]
+
+
+def json_size(text: str) -> int:
+    """Length of the string serialized by json.dumps with ensure_ascii=False, without serializing it"""
+    size = len(text) + 2
+    if _JSON_ESCAPED.search(text):
+        size += sum(1 if c in _JSON_SHORT_ESCAPES else 5 for c in _JSON_ESCAPED.findall(text))
+    return size
+
+
+def _json_key_size(key) -> int:
+    if isinstance(key, str):
+        return json_size(key)
+    # json converts numbers, booleans and null keys to strings
+    return len(json.dumps(key)) + 2
+
 
-    return process_item(data)
+def _get_placeholder(agent, length: int) -> str:
+    # the template is read and parsed once per prompt profile, only the length changes
+    profile = getattr(getattr(agent, "config", None), "profile", "") or ""
+    template = _placeholder_templates.get(profile)
+    if template is None:
+        template = _placeholder_templates[profile] = agent.read_prompt(
+            "fw.msg_truncated.md", length=_LENGTH_MARK
+        )
+    return template.replace(_LENGTH_MARK, str(length))
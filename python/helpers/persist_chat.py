@@ -1,17 +1,26 @@
 from collections import OrderedDict
 from datetime import datetime
 from typing import Any
+import os
+import time
 import uuid
-from agent import Agent, AgentConfig, AgentContext, AgentContextType
-from python.helpers import files, history
+from agent import Agent, AgentConfig, AgentContext, AgentContextType, UnloadedContext
+from python.helpers import api_attachments, files, history
 import json
 from initialize import initialize_agent
 
 from python.helpers.log import Log, LogItem
+from python.helpers.print_style import PrintStyle
 
 CHATS_FOLDER = "tmp/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
+# names, dates and sizes of saved chats, chats are listed from it without reading them
+CHAT_INDEX_FILE = "tmp/chat_index.json"
+CHAT_IDLE_UNLOAD = 30 * 60  # seconds without access after which a saved chat is unloaded from memory
+
+# chat files that failed to load, by (size, mtime_ns), never saved over while unchanged
+_failed_loads: dict[str, tuple[int, int]] = {}
 
 
 def get_chat_folder_path(ctxid: str):
@@ -36,6 +45,10 @@ def save_tmp_chat(context: AgentContext):
         return
 
     path = _get_chat_file_path(context.id)
+    failed = _failed_loads.get(context.id)
+    if failed and failed == _get_file_stamp(path):
+        PrintStyle.warning(f"Not saving chat {context.id}, its file failed to load and is kept unchanged")
+        return
     files.make_dirs(path)
     data = _serialize_context(context)
     js = _safe_json_serialize(data, ensure_ascii=False)
@@ -52,29 +65,143 @@ def save_tmp_chats():
 
 
 def load_tmp_chats():
-    """Load all contexts from the chats folder"""
+    """
+    List saved chats from the chat index, they are loaded when first accessed.
+
+    Index entries are checked against the size and modification time of the chat files,
+    only chats that are new or changed since the index was written are read.
+    """
     _convert_v080_chats()
-    folders = files.list_files(CHATS_FOLDER, "*")
-    json_files = []
-    for folder_name in folders:
-        json_files.append(_get_chat_file_path(folder_name))
+    AgentContext._loader = _load_chat
 
-    ctxids = []
-    for file in json_files:
+    index = _read_index()
+    entries: dict[str, dict[str, Any]] = {}
+    for ctxid in files.list_files(CHATS_FOLDER, "*"):
+        path = _get_chat_file_path(ctxid)
         try:
-            js = files.read_file(file)
-            data = json.loads(js)
-            ctx = _deserialize_context(data)
-            ctxids.append(ctx.id)
+            stat = os.stat(path)
+            entry = index.get(ctxid)
+            if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+                entry = _read_index_entry(ctxid, path, stat)
+            entries[ctxid] = entry
         except Exception as e:
-            print(f"Error loading chat {file}: {e}")
-    return ctxids
+            print(f"Error loading chat {path}: {e}")
+    if entries != index:
+        _write_index(entries)
+
+    for ctxid, entry in entries.items():
+        # chats restored from a backup replace loaded ones
+        AgentContext.remove(ctxid)
+        AgentContext._counter += 1
+        AgentContext.add_unloaded(_entry_to_unloaded(entry, AgentContext._counter))
+    return list(entries)
+
+
+def unload_idle_chats(idle_seconds: float = CHAT_IDLE_UNLOAD) -> int:
+    """Save and unload chats not accessed for a while, returns the number unloaded"""
+    now = time.monotonic()
+    unloaded = 0
+    for context in AgentContext.all():
+        if context.type == AgentContextType.BACKGROUND or now - context.last_access < idle_seconds:
+            continue
+        if context.task and context.task.is_alive():
+            continue
+        save_tmp_chat(context)
+        stat = os.stat(_get_chat_file_path(context.id))
+        entry = UnloadedContext(
+            id=context.id,
+            name=context.name,
+            created_at=context.created_at or datetime.fromtimestamp(0),
+            last_message=context.last_message or datetime.fromtimestamp(0),
+            type=context.type,
+            no=context.no,
+            log_guid=context.log.guid,
+            log_length=len(context.log.logs[-LOG_SIZE:]),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+        if AgentContext.unload(context, entry, idle_seconds):
+            unloaded += 1
+    return unloaded
+
+
+def _load_chat(entry: UnloadedContext) -> AgentContext | None:
+    path = _get_chat_file_path(entry.id)
+    try:
+        data = json.loads(files.read_file(path))
+        data["id"] = entry.id
+        context = _deserialize_context(data)
+    except Exception as e:
+        print(f"Error loading chat {path}: {e}")
+        stamp = _get_file_stamp(path)
+        if stamp:
+            _failed_loads[entry.id] = stamp
+        return None
+    context.no = entry.no
+    return context
+
+
+def _read_index() -> dict[str, dict[str, Any]]:
+    try:
+        return json.loads(files.read_file(CHAT_INDEX_FILE))
+    except Exception:
+        return {}  # missing or unreadable, rebuilt from the chat files
+
+
+def _write_index(entries: dict[str, dict[str, Any]]):
+    path = files.get_abs_path(CHAT_INDEX_FILE)
+    files.make_dirs(path)
+    # written aside and moved in place, a crash never leaves a partial index
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(entries, file)
+    os.replace(temp_path, path)
+
+
+def _read_index_entry(ctxid: str, path: str, stat: os.stat_result) -> dict[str, Any]:
+    data = json.loads(files.read_file(path))
+    log = data.get("log", None) or {}
+    epoch = datetime.fromtimestamp(0).isoformat()
+    return {
+        "id": ctxid,
+        "name": data.get("name", None),
+        "created_at": data.get("created_at", epoch),
+        "last_message": data.get("last_message", epoch),
+        "type": data.get("type", AgentContextType.USER.value),
+        "log_guid": log.get("guid", ""),
+        "log_length": len(log.get("logs", [])),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def _entry_to_unloaded(entry: dict[str, Any], no: int) -> UnloadedContext:
+    return UnloadedContext(
+        id=entry["id"],
+        name=entry["name"],
+        created_at=datetime.fromisoformat(entry["created_at"]),
+        last_message=datetime.fromisoformat(entry["last_message"]),
+        type=AgentContextType(entry["type"]),
+        no=no,
+        log_guid=entry["log_guid"],
+        log_length=entry["log_length"],
+        size=entry["size"],
+        mtime_ns=entry["mtime_ns"],
+    )
 
 
 def _get_chat_file_path(ctxid: str):
     return files.get_abs_path(CHATS_FOLDER, ctxid, CHAT_FILE_NAME)
 
 
+def _get_file_stamp(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
 def _convert_v080_chats():
     json_files = files.list_files(CHATS_FOLDER, "*.json")
     for file in json_files:
@@ -107,6 +234,8 @@ def remove_chat(ctxid):
     """Remove a chat or task context"""
     path = get_chat_folder_path(ctxid)
     files.delete_dir(path)
+    _failed_loads.pop(ctxid, None)
+    api_attachments.remove_attachments(ctxid)
 
 
 def remove_msg_files(ctxid):
@@ -148,6 +277,11 @@ def _serialize_context(context: AgentContext):
 def _serialize_agent(agent: Agent):
     data = {k: v for k, v in agent.data.items() if not k.startswith("_")}
 
+    # the context window object holds the whole prompt, only its text and tokens are saved
+    window = agent.get_data(Agent.DATA_NAME_CTX_WINDOW_LAZY)
+    if window:
+        data[Agent.DATA_NAME_CTX_WINDOW] = {"text": window.get_text(), "tokens": window.get_tokens()}
+
     history = agent.history.serialize()
 
     return {
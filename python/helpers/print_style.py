@@ -1,11 +1,142 @@
 import os, webcolors, html
 import sys
+import queue
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
 from . import files
 
+LOG_HTML_HEADER = "<html><body style='background-color:black;font-family: Arial, Helvetica, sans-serif;'><pre>\n"
+LOG_HTML_FOOTER = "</pre></body></html>"
+LOG_QUEUE_SIZE = 10000  # max pending writes, further writes are dropped instead of blocking
+LOG_BATCH_SIZE = 1000  # max writes joined into one file write
+LOG_FLUSH_INTERVAL = 0.5  # seconds between file flushes
+
+
+class _LogWriter:
+    """Background writer for the HTML log.
+
+    Callers only enqueue text, a single thread keeps the file open, writes in batches
+    and rotates the file when it grows over the size limit.
+    """
+
+    def __init__(self, logs_dir: str):
+        self.logs_dir = logs_dir
+        self.max_size = 0  # bytes, 0 = unlimited
+        self.dropped = 0
+        self.path = ""
+        self._file = None
+        self._queue: queue.Queue[str | None] = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="PrintStyleLog", daemon=True)
+        self._thread.start()
+
+    def write(self, text: str):
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        try:
+            self._queue.put(None, timeout=5)
+        except queue.Full:
+            return
+        self._thread.join(timeout=5)
+
+    def _open(self):
+        os.makedirs(self.logs_dir, exist_ok=True)
+        log_filename = datetime.now().strftime("log_%Y%m%d_%H%M%S_%f.html")
+        self.path = os.path.join(self.logs_dir, log_filename)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(LOG_HTML_HEADER)
+
+    def _rotate(self):
+        if self._file:
+            self._file.write(LOG_HTML_FOOTER)
+            self._file.close()
+        self._open()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            # collect everything written during the flush interval into one write
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while len(batch) < LOG_BATCH_SIZE and batch[-1] is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if None in batch:
+                stop = True
+                batch = batch[: batch.index(None)]
+            try:
+                if self.dropped:
+                    batch.append(f"<br>[{self.dropped} log entries dropped]<br>\n")
+                    self.dropped = 0
+                self._file.write("".join(batch))  # type: ignore
+                self._file.flush()  # type: ignore
+                if self.max_size and self._file.tell() > self.max_size:  # type: ignore
+                    self._rotate()
+            except Exception:
+                pass  # logging must never break the application
+        if self._file:
+            self._file.write(LOG_HTML_FOOTER)
+            self._file.close()
+            self._file = None
+
+
+@lru_cache(maxsize=256)
+def _get_style_codes(bold: bool, italic: bool, underline: bool, font_color: str, background_color: str) -> tuple[str, str]:
+    """Build ANSI prefix and HTML style attribute once per style combination."""
+    ansi = ""
+    styles = []
+    if bold:
+        ansi += "\033[1m"
+        styles.append("font-weight: bold;")
+    if italic:
+        ansi += "\033[3m"
+        styles.append("font-style: italic;")
+    if underline:
+        ansi += "\033[4m"
+        styles.append("text-decoration: underline;")
+    font_ansi, font_html = _get_rgb_color_code(font_color)
+    background_ansi, background_html = _get_rgb_color_code(background_color, True)
+    ansi += font_ansi + background_ansi
+    styles.append(font_html)
+    styles.append(background_html)
+    return ansi, " ".join(styles)
+
+
+def _get_rgb_color_code(color, is_background=False):
+    try:
+        if color.startswith("#") and len(color) == 7:
+            r = int(color[1:3], 16)
+            g = int(color[3:5], 16)
+            b = int(color[5:7], 16)
+        else:
+            rgb_color = webcolors.name_to_rgb(color)
+            r, g, b = rgb_color.red, rgb_color.green, rgb_color.blue
+
+        if is_background:
+            return f"\033[48;2;{r};{g};{b}m", f"background-color: rgb({r}, {g}, {b});"
+        else:
+            return f"\033[38;2;{r};{g};{b}m", f"color: rgb({r}, {g}, {b});"
+    except ValueError:
+        return "", ""
+
+
 class PrintStyle:
     last_endline = True
     log_file_path = None
+    log_stream_html = True  # log streamed chunks (tokens) to the HTML log
+    _writer: _LogWriter | None = None
+    _writer_lock = threading.Lock()
 
     def __init__(self, bold=False, italic=False, underline=False, font_color="default", background_color="default", padding=False, log_only=False):
         self.bold = bold
@@ -17,61 +148,35 @@ class PrintStyle:
         self.padding_added = False  # Flag to track if padding was added
         self.log_only = log_only
 
-        if PrintStyle.log_file_path is None:
-            logs_dir = files.get_abs_path("logs")
-            os.makedirs(logs_dir, exist_ok=True)
-            log_filename = datetime.now().strftime("log_%Y%m%d_%H%M%S.html")
-            PrintStyle.log_file_path = os.path.join(logs_dir, log_filename)
-            with open(PrintStyle.log_file_path, "w") as f:
-                f.write("<html><body style='background-color:black;font-family: Arial, Helvetica, sans-serif;'><pre>\n")
+        self._ansi_start, self._html_style = _get_style_codes(
+            bold, italic, underline, font_color, background_color
+        )
+        PrintStyle._get_writer()
+
+    @staticmethod
+    def _get_writer() -> _LogWriter:
+        if PrintStyle._writer is None:
+            with PrintStyle._writer_lock:
+                if PrintStyle._writer is None:
+                    PrintStyle._writer = _LogWriter(files.get_abs_path("logs"))
+                    PrintStyle.log_file_path = PrintStyle._writer.path
+        return PrintStyle._writer
+
+    @staticmethod
+    def configure_log(stream_html: bool, max_size_mb: float):
+        """Apply HTML log options, called when settings change."""
+        PrintStyle.log_stream_html = stream_html
+        PrintStyle._get_writer().max_size = int(max(0, max_size_mb) * 1024 * 1024)
 
     def _get_rgb_color_code(self, color, is_background=False):
-        try:
-            if color.startswith("#") and len(color) == 7:
-                r = int(color[1:3], 16)
-                g = int(color[3:5], 16)
-                b = int(color[5:7], 16)
-            else:
-                rgb_color = webcolors.name_to_rgb(color)
-                r, g, b = rgb_color.red, rgb_color.green, rgb_color.blue
-
-            if is_background:
-                return f"\033[48;2;{r};{g};{b}m", f"background-color: rgb({r}, {g}, {b});"
-            else:
-                return f"\033[38;2;{r};{g};{b}m", f"color: rgb({r}, {g}, {b});"
-        except ValueError:
-            return "", ""
+        return _get_rgb_color_code(color, is_background)
 
     def _get_styled_text(self, text):
-        start = ""
-        end = "\033[0m"  # Reset ANSI code
-        if self.bold:
-            start += "\033[1m"
-        if self.italic:
-            start += "\033[3m"
-        if self.underline:
-            start += "\033[4m"
-        font_color_code, _ = self._get_rgb_color_code(self.font_color)
-        background_color_code, _ = self._get_rgb_color_code(self.background_color, True)
-        start += font_color_code
-        start += background_color_code
-        return start + text + end
+        return self._ansi_start + text + "\033[0m"  # Reset ANSI code
 
     def _get_html_styled_text(self, text):
-        styles = []
-        if self.bold:
-            styles.append("font-weight: bold;")
-        if self.italic:
-            styles.append("font-style: italic;")
-        if self.underline:
-            styles.append("text-decoration: underline;")
-        _, font_color_code = self._get_rgb_color_code(self.font_color)
-        _, background_color_code = self._get_rgb_color_code(self.background_color, True)
-        styles.append(font_color_code)
-        styles.append(background_color_code)
-        style_attr = " ".join(styles)
         escaped_text = html.escape(text).replace("\n", "<br>")  # Escape HTML special characters
-        return f'<span style="{style_attr}">{escaped_text}</span>'
+        return f'<span style="{self._html_style}">{escaped_text}</span>'
 
     def _add_padding_if_needed(self):
         if self.padding and not self.padding_added:
@@ -81,28 +186,26 @@ class PrintStyle:
             self.padding_added = True
 
     def _log_html(self, html):
-        with open(PrintStyle.log_file_path, "a", encoding='utf-8') as f: # type: ignore # add encoding='utf-8'
-            f.write(html)
+        PrintStyle._get_writer().write(html)
 
     @staticmethod
     def _close_html_log():
-        if PrintStyle.log_file_path:
-            with open(PrintStyle.log_file_path, "a") as f:
-                f.write("</pre></body></html>")
+        if PrintStyle._writer:
+            PrintStyle._writer.close()
 
     def get(self, *args, sep=' ', **kwargs):
-        text = sep.join(map(str, args))
-        
+        text = self._mask(sep.join(map(str, args)))
+        return text, self._get_styled_text(text), self._get_html_styled_text(text)
+
+    def _mask(self, text: str) -> str:
         # Automatically mask secrets in all print output
         try:
             from python.helpers.secrets import SecretsManager
             secrets_mgr = SecretsManager.get_instance()
-            text = secrets_mgr.mask_values(text)
+            return secrets_mgr.mask_values(text)
         except Exception:
             # If masking fails, proceed without masking to avoid breaking functionality
-            pass
-        
-        return text, self._get_styled_text(text), self._get_html_styled_text(text)
+            return text
 
     def print(self, *args, sep=' ', **kwargs):
         self._add_padding_if_needed()
@@ -117,6 +220,13 @@ class PrintStyle:
 
     def stream(self, *args, sep=' ', **kwargs):
         self._add_padding_if_needed()
+        if not PrintStyle.log_stream_html:
+            # skip HTML escaping and logging of each streamed chunk
+            if not self.log_only:
+                plain_text = self._mask(sep.join(map(str, args)))
+                print(self._get_styled_text(plain_text), end='', flush=True)
+            PrintStyle.last_endline = False
+            return
         plain_text, styled_text, html_text = self.get(*args, sep=sep, **kwargs)
         if not self.log_only:
             print(styled_text, end='', flush=True)
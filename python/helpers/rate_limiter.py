@@ -1,57 +1,177 @@
 import asyncio
+import json
+import os
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
 from typing import Callable, Awaitable
 
+try:
+    import fcntl
+except ImportError:  # windows, limits stay per process
+    fcntl = None
+
+CALLBACK_INTERVAL = 1.0  # seconds between progress callbacks while waiting
+
+
+class _Window:
+    """Sliding window of (time, value) entries with a running total."""
+
+    def __init__(self):
+        self.entries: deque[tuple[float, int]] = deque()
+        self.total = 0
+
+    def add(self, t: float, value: int):
+        self.entries.append((t, value))
+        self.total += value
+
+    def prune(self, cutoff: float) -> bool:
+        pruned = False
+        while self.entries and self.entries[0][0] <= cutoff:
+            self.total -= self.entries.popleft()[1]
+            pruned = True
+        return pruned
+
+    def free_at(self, needed: int, limit: int, timeframe: float) -> float:
+        # time when enough of the oldest entries expire to fit the needed amount
+        excess = self.total + needed - limit
+        for t, value in self.entries:
+            excess -= value
+            if excess <= 0:
+                return t + timeframe
+        # more than the whole limit is needed, wait for an empty window
+        return self.entries[-1][0] + timeframe if self.entries else 0
+
 
 class RateLimiter:
-    def __init__(self, seconds: int = 60, **limits: int):
+    """Sliding window limiter for requests and tokens.
+
+    Accounting is O(1), expired entries are dropped from the front of each window and
+    waits sleep until the moment enough capacity frees up. When shared_file is set, the
+    windows are kept in that file under an exclusive lock so all processes using it
+    share the limits.
+    """
+
+    def __init__(self, seconds: int = 60, shared_file: str = "", **limits: int):
         self.timeframe = seconds
         self.limits = {key: value if isinstance(value, (int, float)) else 0 for key, value in (limits or {}).items()}
-        self.values = {key: [] for key in self.limits.keys()}
-        self._lock = asyncio.Lock()
+        self.windows: dict[str, _Window] = {}
+        self.shared_file = shared_file if fcntl else ""
+        self._lock = threading.Lock()
 
     def add(self, **kwargs: int):
-        now = time.time()
-        for key, value in kwargs.items():
-            if not key in self.values:
-                self.values[key] = []
-            self.values[key].append((now, value))
-
-    async def cleanup(self):
-        async with self._lock:
-            now = time.time()
-            cutoff = now - self.timeframe
-            for key in self.values:
-                self.values[key] = [(t, v) for t, v in self.values[key] if t > cutoff]
+        """Record usage that happened already, like output tokens."""
+        with self._state() as now:
+            for key, value in kwargs.items():
+                self._window(key).add(now, value)
 
     async def get_total(self, key: str) -> int:
-        async with self._lock:
-            if not key in self.values:
-                return 0
-            return sum(value for _, value in self.values[key])
+        with self._state():
+            window = self.windows.get(key)
+            return window.total if window else 0
 
     async def wait(
         self,
         callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
+        **kwargs: int,
+    ):
+        """Wait until the amounts in kwargs fit all limits, then record them."""
+        while True:
+            delay, key, total, limit = self._acquire(kwargs)
+            if not delay:
+                break
+            if callback:
+                msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
+                if await callback(msg, key, total, limit):
+                    self.add(**kwargs)
+                    break
+                delay = min(delay, CALLBACK_INTERVAL)
+            await asyncio.sleep(delay)
+
+    def wait_sync(
+        self,
+        callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
+        **kwargs: int,
     ):
+        """Wait for synchronous callers, sleeps on worker threads only."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            # called from a task on the event loop, sleeping here would stop every other task,
+            # the wait runs nested so the loop keeps going
+            import nest_asyncio
+
+            nest_asyncio.apply(loop)
+            return loop.run_until_complete(self.wait(callback, **kwargs))
+        if callback:
+            # no loop on this thread, the async callback gets one for the wait
+            return asyncio.run(self.wait(callback, **kwargs))
         while True:
-            await self.cleanup()
-            should_wait = False
+            delay = self._acquire(kwargs)[0]
+            if not delay:
+                break
+            time.sleep(delay)
 
+    def _acquire(self, needed: dict[str, int]) -> tuple[float, str, int, int]:
+        # records the amounts when they fit, otherwise returns the delay and the blocking limit
+        with self._state() as now:
             for key, limit in self.limits.items():
                 if limit <= 0:  # Skip if no limit set
                     continue
+                window = self.windows.get(key)
+                if not window or not window.total:
+                    continue
+                value = needed.get(key, 0)
+                if window.total + value > limit:
+                    delay = max(window.free_at(value, limit, self.timeframe) - now, 0.01)
+                    return delay, key, window.total + value, limit
+            for key, value in needed.items():
+                self._window(key).add(now, value)
+        return 0, "", 0, 0
 
-                total = await self.get_total(key)
-                if total > limit:
-                    if callback:
-                        msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
-                        should_wait = not await callback(msg, key, total, limit)
-                    else:
-                        should_wait = True
-                    break
+    def _window(self, key: str) -> _Window:
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = _Window()
+        return window
 
-            if not should_wait:
-                break
+    @contextmanager
+    def _state(self):
+        # current time with pruned windows, loaded from and saved to the shared file if set
+        with self._lock:
+            now = time.time()
+            cutoff = now - self.timeframe
+            if not self.shared_file:
+                for window in self.windows.values():
+                    window.prune(cutoff)
+                yield now
+                return
 
-            await asyncio.sleep(1)
+            os.makedirs(os.path.dirname(self.shared_file) or ".", exist_ok=True)
+            with open(self.shared_file, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)  # type: ignore
+                try:
+                    f.seek(0)
+                    content = f.read()
+                    try:
+                        data: dict[str, list] = json.loads(content) if content else {}
+                    except ValueError:
+                        data = {}
+                    self.windows = {}
+                    for key, entries in data.items():
+                        window = self._window(key)
+                        for t, value in entries:
+                            window.add(t, value)
+                    pruned = any([window.prune(cutoff) for window in self.windows.values()])
+                    before = sum(len(window.entries) for window in self.windows.values())
+                    yield now
+                    after = sum(len(window.entries) for window in self.windows.values())
+                    if pruned or after != before:
+                        f.seek(0)
+                        f.truncate()
+                        f.write(json.dumps({key: list(w.entries) for key, w in self.windows.items()}))
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)  # type: ignore
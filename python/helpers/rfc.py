@@ -1,9 +1,16 @@
+import asyncio
+import hashlib
+import hmac
 import importlib
 import inspect
 import json
-from typing import Any, TypedDict
+import secrets
+import struct
+import threading
+import time
+from typing import Any, AsyncIterator, Iterable, Iterator, TypedDict
 import aiohttp
-from python.helpers import crypto
+from python.helpers import crypto, defer
 
 from python.helpers import dotenv
 
@@ -12,6 +19,25 @@ from python.helpers import dotenv
 # Call function via http request
 # Secured by pre-shared key
 
+# all RFC traffic runs on one background loop so the HTTP connections can be kept alive
+LOOP_THREAD_NAME = "RFC"
+CONNECTION_LIMIT = 16
+KEEPALIVE_TIMEOUT = 60
+BATCH_MAX = 32
+
+# binary stream framing: type (1B) + payload length (4B) + payload + chained HMAC (32B)
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_SEED = b"a0-rfc-stream"
+FRAME_HEADER = struct.Struct(">BI")
+FRAME_MAC_SIZE = 32
+FRAME_INPUT = 0
+FRAME_DATA = 1
+FRAME_RESULT = 2
+FRAME_ERROR = 3
+FRAME_END = 4
+# stream requests older than this are refused, their nonces are remembered as long
+STREAM_MAX_AGE = 300
+
 
 class RFCInput(TypedDict):
     module: str
@@ -25,6 +51,19 @@ class RFCCall(TypedDict):
     hash: str
 
 
+class RFCStreamInput(RFCInput):
+    nonce: str
+    timestamp: float
+    body: bool
+
+
+_session: aiohttp.ClientSession | None = None
+_pending: list[tuple[str, str, RFCInput, asyncio.Future]] = []
+_flush_scheduled = False
+_stream_nonces: dict[str, float] = {}  # nonce -> time it was received
+_stream_nonces_lock = threading.Lock()
+
+
 async def call_rfc(
     url: str, password: str, module: str, function_name: str, args: list, kwargs: dict
 ):
@@ -34,23 +73,168 @@ async def call_rfc(
         args=args,
         kwargs=kwargs,
     )
-    call = RFCCall(
-        rfc_input=json.dumps(input), hash=crypto.hash_data(json.dumps(input), password)
-    )
-    result = await _send_json_data(url, call)
-    return result
+    return await _run_on_rfc_loop(_enqueue_call(url, password, input))
 
 
 async def handle_rfc(rfc_call: RFCCall, password: str):
     if not crypto.verify_data(rfc_call["rfc_input"], rfc_call["hash"], password):
         raise Exception("Invalid RFC hash")
 
-    input: RFCInput = json.loads(rfc_call["rfc_input"])
+    input: RFCInput | list[RFCInput] = json.loads(rfc_call["rfc_input"])
+
+    # batch of calls coalesced by the caller, errors are reported per call
+    if isinstance(input, list):
+        results = await asyncio.gather(
+            *[
+                _call_function(i["module"], i["function_name"], *i["args"], **i["kwargs"])
+                for i in input
+            ],
+            return_exceptions=True,
+        )
+        return [
+            {"error": str(r)} if isinstance(r, BaseException) else {"result": r}
+            for r in results
+        ]
+
     return await _call_function(
         input["module"], input["function_name"], *input["args"], **input["kwargs"]
     )
 
 
+async def stream_rfc(
+    url: str,
+    password: str,
+    module: str,
+    function_name: str,
+    args: list,
+    kwargs: dict,
+    body: Iterable[bytes] | None = None,
+) -> AsyncIterator[bytes]:
+    """Call a remote function returning a stream of bytes, optionally sending a stream of bytes as its first argument."""
+    agen = _stream_frames(url, password, module, function_name, args, kwargs, body)
+    try:
+        while True:
+            frame = await _run_on_rfc_loop(_next_frame(agen))
+            if frame is None:
+                return
+            kind, payload = frame
+            if kind == FRAME_DATA:
+                yield payload
+    finally:
+        await _run_on_rfc_loop(agen.aclose())
+
+
+async def upload_rfc(
+    url: str,
+    password: str,
+    module: str,
+    function_name: str,
+    args: list,
+    kwargs: dict,
+    body: Iterable[bytes],
+):
+    """Call a remote function consuming a stream of bytes and return its result."""
+    agen = _stream_frames(url, password, module, function_name, args, kwargs, body)
+    result = None
+    try:
+        while True:
+            frame = await _run_on_rfc_loop(_next_frame(agen))
+            if frame is None:
+                return result
+            kind, payload = frame
+            if kind == FRAME_RESULT:
+                result = json.loads(payload)
+    finally:
+        await _run_on_rfc_loop(agen.aclose())
+
+
+def stream_rfc_sync(
+    url: str,
+    password: str,
+    module: str,
+    function_name: str,
+    args: list,
+    kwargs: dict,
+    body: Iterable[bytes] | None = None,
+) -> Iterator[bytes]:
+    """Synchronous version of stream_rfc for callers outside of an event loop."""
+    agen = _stream_frames(url, password, module, function_name, args, kwargs, body)
+    loop_thread = _get_loop_thread()
+    try:
+        while True:
+            frame = loop_thread.run_coroutine(_next_frame(agen)).result()
+            if frame is None:
+                return
+            kind, payload = frame
+            if kind == FRAME_DATA:
+                yield payload
+    finally:
+        loop_thread.run_coroutine(agen.aclose()).result()
+
+
+def upload_rfc_sync(
+    url: str,
+    password: str,
+    module: str,
+    function_name: str,
+    args: list,
+    kwargs: dict,
+    body: Iterable[bytes],
+):
+    """Synchronous version of upload_rfc for callers outside of an event loop."""
+    return (
+        _get_loop_thread()
+        .run_coroutine(
+            upload_rfc(url, password, module, function_name, args, kwargs, body)
+        )
+        .result()
+    )
+
+
+async def handle_rfc_stream(reader, password: str) -> Iterator[bytes]:
+    """Verify a framed request from reader, call the function and return framed response."""
+    frames = _read_frames(reader, password, STREAM_SEED)
+    kind, payload, input_mac = next(frames)
+    if kind != FRAME_INPUT:
+        raise Exception("Invalid RFC stream")
+    input: RFCStreamInput = json.loads(payload)
+    _check_stream_nonce(input)
+
+    def body():
+        for kind, payload, _ in frames:
+            if kind == FRAME_DATA:
+                yield payload
+            elif kind == FRAME_END:
+                return
+
+    func = _get_function(input["module"], input["function_name"])
+    if input.get("body"):
+        result = func(body(), *input["args"], **input["kwargs"])
+    else:
+        for _ in body():
+            pass  # requests without body only carry the end frame
+        result = func(*input["args"], **input["kwargs"])
+    if inspect.isawaitable(result):
+        result = await result
+
+    return _write_frames(result, password, input_mac)
+
+
+def _check_stream_nonce(input: RFCStreamInput):
+    # the input frame is signed, a captured request can only be sent again as a whole
+    now = time.time()
+    timestamp = input.get("timestamp")
+    if not isinstance(timestamp, (int, float)) or abs(now - timestamp) > STREAM_MAX_AGE:
+        raise Exception("Expired RFC stream request")
+    with _stream_nonces_lock:
+        for nonce, received in list(_stream_nonces.items()):
+            if now - received > STREAM_MAX_AGE * 2:
+                del _stream_nonces[nonce]
+        if input["nonce"] in _stream_nonces:
+            raise Exception("Reused RFC stream nonce")
+        _stream_nonces[input["nonce"]] = now
+
+
 async def _call_function(module: str, function_name: str, *args, **kwargs):
     func = _get_function(module, function_name)
     if inspect.iscoroutinefunction(func):
@@ -67,15 +251,238 @@ def _get_function(module: str, function_name: str):
     return func
 
 
-async def _send_json_data(url: str, data):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            url,
-            json=data,
-        ) as response:
-            if response.status == 200:
-                result = await response.json()
-                return result
+def _get_loop_thread():
+    return defer.EventLoopThread(LOOP_THREAD_NAME)
+
+
+async def _run_on_rfc_loop(coro):
+    loop_thread = _get_loop_thread()
+    try:
+        current = asyncio.get_running_loop()
+    except RuntimeError:
+        current = None
+    if current is not None and current is loop_thread.loop:
+        return await coro
+    return await asyncio.wrap_future(loop_thread.run_coroutine(coro))
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT, keepalive_timeout=KEEPALIVE_TIMEOUT
+            )
+        )
+    return _session
+
+
+async def _enqueue_call(url: str, password: str, input: RFCInput):
+    # calls issued in the same loop iteration are coalesced into one request
+    global _flush_scheduled
+    future = asyncio.get_running_loop().create_future()
+    _pending.append((url, password, input, future))
+    if not _flush_scheduled:
+        _flush_scheduled = True
+        asyncio.get_running_loop().call_soon(_flush_pending)
+    return await future
+
+
+def _flush_pending():
+    global _pending, _flush_scheduled
+    pending, _pending, _flush_scheduled = _pending, [], False
+
+    groups: dict[tuple[str, str], list[tuple[RFCInput, asyncio.Future]]] = {}
+    for url, password, input, future in pending:
+        groups.setdefault((url, password), []).append((input, future))
+
+    for (url, password), calls in groups.items():
+        for i in range(0, len(calls), BATCH_MAX):
+            asyncio.ensure_future(_send_calls(url, password, calls[i : i + BATCH_MAX]))
+
+
+async def _send_calls(
+    url: str, password: str, calls: list[tuple[RFCInput, asyncio.Future]]
+):
+    try:
+        if len(calls) == 1:
+            input, future = calls[0]
+            result = await _send_json_data(url, _make_call(input, password))
+            if not future.done():
+                future.set_result(result)
+            return
+
+        results = await _send_json_data(
+            url, _make_call([input for input, _ in calls], password)
+        )
+        for (_, future), res in zip(calls, results):
+            if future.done():
+                continue
+            if "error" in res:
+                future.set_exception(Exception(res["error"]))
             else:
-                error = await response.text()
-                raise Exception(error)
+                future.set_result(res["result"])
+    except Exception as e:
+        for _, future in calls:
+            if not future.done():
+                future.set_exception(e)
+
+
+def _make_call(input: RFCInput | list[RFCInput], password: str) -> RFCCall:
+    data = json.dumps(input)
+    return RFCCall(rfc_input=data, hash=crypto.hash_data(data, password))
+
+
+async def _send_json_data(url: str, data):
+    session = _get_session()
+    async with session.post(
+        url,
+        json=data,
+    ) as response:
+        if response.status == 200:
+            result = await response.json()
+            return result
+        else:
+            error = await response.text()
+            raise Exception(error)
+
+
+async def _next_frame(agen):
+    try:
+        return await agen.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _stream_frames(
+    url: str,
+    password: str,
+    module: str,
+    function_name: str,
+    args: list,
+    kwargs: dict,
+    body: Iterable[bytes] | None = None,
+):
+    input = RFCStreamInput(
+        module=module,
+        function_name=function_name,
+        args=args,
+        kwargs=kwargs,
+        nonce=secrets.token_hex(16),
+        timestamp=time.time(),
+        body=body is not None,
+    )
+    signer = _FrameSigner(password, STREAM_SEED)
+    header = signer.frame(FRAME_INPUT, json.dumps(input).encode())
+    response_seed = signer.prev
+
+    async def request_body():
+        yield header
+        if body is not None:
+            for chunk in body:
+                for i in range(0, len(chunk), STREAM_CHUNK_SIZE):
+                    yield signer.frame(FRAME_DATA, chunk[i : i + STREAM_CHUNK_SIZE])
+        yield signer.frame(FRAME_END, b"")
+
+    session = _get_session()
+    async with session.post(
+        url,
+        data=request_body(),
+        headers={"Content-Type": "application/octet-stream"},
+    ) as response:
+        if response.status != 200:
+            raise Exception(await response.text())
+
+        verifier = _FrameSigner(password, response_seed)
+        while True:
+            head = await response.content.readexactly(FRAME_HEADER.size)
+            kind, length = FRAME_HEADER.unpack(head)
+            payload = await response.content.readexactly(length)
+            mac = await response.content.readexactly(FRAME_MAC_SIZE)
+            verifier.verify(kind, payload, mac)
+            if kind == FRAME_END:
+                return
+            if kind == FRAME_ERROR:
+                raise Exception(payload.decode("utf-8", errors="replace"))
+            yield kind, payload
+
+
+def _read_frames(reader, password: str, seed: bytes):
+    verifier = _FrameSigner(password, seed)
+    while True:
+        head = _read_exactly(reader, FRAME_HEADER.size)
+        kind, length = FRAME_HEADER.unpack(head)
+        payload = _read_exactly(reader, length)
+        mac = _read_exactly(reader, FRAME_MAC_SIZE)
+        verifier.verify(kind, payload, mac)
+        yield kind, payload, mac
+        if kind == FRAME_END:
+            return
+
+
+def _read_exactly(reader, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        part = reader.read(size - len(data))
+        if not part:
+            raise Exception("Unexpected end of RFC stream")
+        data += part
+    return bytes(data)
+
+
+def _write_frames(result, password: str, seed: bytes) -> Iterator[bytes]:
+    signer = _FrameSigner(password, seed)
+    try:
+        if isinstance(result, (bytes, bytearray)):
+            result = iter([bytes(result)])
+        if hasattr(result, "__aiter__"):
+            result = _iterate_async(result)
+        if isinstance(result, Iterator):
+            for chunk in result:
+                for i in range(0, len(chunk), STREAM_CHUNK_SIZE):
+                    yield signer.frame(FRAME_DATA, chunk[i : i + STREAM_CHUNK_SIZE])
+        else:
+            yield signer.frame(FRAME_RESULT, json.dumps(result).encode())
+    except Exception as e:
+        yield signer.frame(FRAME_ERROR, str(e).encode())
+        return
+    yield signer.frame(FRAME_END, b"")
+
+
+def _iterate_async(agen) -> Iterator[bytes]:
+    # response generators are consumed synchronously by the WSGI server
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
+class _FrameSigner:
+    """Chained HMAC over frames, each MAC covers the previous one so frames can not be reordered or dropped."""
+
+    def __init__(self, password: str, seed: bytes):
+        self.key = password.encode()
+        self.prev = seed
+
+    def _mac(self, kind: int, payload: bytes) -> bytes:
+        mac = hmac.new(self.key, self.prev, hashlib.sha256)
+        mac.update(FRAME_HEADER.pack(kind, len(payload)))
+        mac.update(payload)
+        return mac.digest()
+
+    def frame(self, kind: int, payload: bytes) -> bytes:
+        mac = self._mac(kind, payload)
+        self.prev = mac
+        return FRAME_HEADER.pack(kind, len(payload)) + payload + mac
+
+    def verify(self, kind: int, payload: bytes, mac: bytes):
+        expected = self._mac(kind, payload)
+        if not hmac.compare_digest(expected, mac):
+            raise Exception("Invalid RFC stream hash")
+        self.prev = mac
@@ -2,9 +2,18 @@ import os
 import shutil
 import fnmatch
 import base64
+import hashlib
 import tempfile
 import zipfile
-from python.helpers import runtime
+from typing import BinaryIO, Iterable, Iterator
+from python.helpers import runtime, zip_stream
+from python.helpers.print_style import PrintStyle
+
+# chunk size for binary streamed transfers
+CHUNK_SIZE = 1024 * 1024
+# reconnect attempts of resumable transfers after the stream breaks
+TRANSFER_RETRIES = 3
+PART_SUFFIX = ".part"
 
 
 def get_abs_path(*relative_paths):
@@ -37,11 +46,150 @@ def read_file_bin(relative_path: str, backup_dirs=None) -> bytes:
     # Find the file in directories
     absolute_path = find_file_in_dirs(relative_path, backup_dirs)
 
+    # Use binary RFC stream for development mode
+    return b"".join(
+        runtime.stream_development_function_sync(_read_file_chunks_impl, absolute_path)
+    )
+
+
+def read_file_chunks(relative_path: str, backup_dirs=None, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read file content as a stream of binary chunks with bounded memory.
+
+    Args:
+        relative_path: Path to the file relative to base directory
+        backup_dirs: List of backup directories to search in
+        chunk_size: Maximum size of a single chunk
+
+    Returns:
+        Iterator of file content chunks
+    """
+    if backup_dirs is None:
+        backup_dirs = []
+
+    # Find the file in directories
+    absolute_path = find_file_in_dirs(relative_path, backup_dirs)
+
+    # Use binary RFC stream for development mode
+    return runtime.stream_development_function_sync(
+        _read_file_chunks_impl, absolute_path, chunk_size
+    )
+
+
+def get_file_stat(relative_path: str) -> dict:
+    """
+    Get size and modification time of a file.
+
+    Args:
+        relative_path: Path to the file relative to base directory
+
+    Returns:
+        Dictionary with size, mtime and etag of the file
+    """
+    abs_path = get_abs_path(relative_path)
+
     # Use RFC routing for development mode
-    b64_content = runtime.call_development_function_sync(
-        _read_file_binary_impl, absolute_path
+    return runtime.call_development_function_sync(_get_file_stat_impl, abs_path)
+
+
+def read_file_range(
+    relative_path: str,
+    offset: int = 0,
+    length: int = -1,
+    stat: dict | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Read a byte range of a file as a stream of binary chunks, resuming after a broken stream.
+
+    Args:
+        relative_path: Path to the file relative to base directory
+        offset: Position of the first byte to read
+        length: Number of bytes to read, -1 to read until the end of the file
+        stat: Result of get_file_stat, the transfer fails if the file changes
+        chunk_size: Maximum size of a single chunk
+
+    Returns:
+        Iterator of file content chunks
+    """
+    abs_path = get_abs_path(relative_path)
+    if stat is None:
+        stat = get_file_stat(relative_path)
+    end = stat["size"] if length < 0 else min(stat["size"], offset + length)
+
+    position = offset
+    attempt = 0
+    while position < end:
+        try:
+            # the stream continues from the last received byte, frames are verified by the RFC layer
+            for chunk in runtime.stream_development_function_sync(
+                _read_file_range_impl, abs_path, position, end - position, stat["etag"], chunk_size
+            ):
+                position += len(chunk)
+                yield chunk
+            if position < end:
+                raise Exception(f"File {abs_path} ended before the expected size")
+        except FileChangedError:
+            raise
+        except Exception as e:
+            # a changed file can not be resumed, retrying would fail the same way
+            if str(e).startswith(FILE_CHANGED_MESSAGE):
+                raise FileChangedError(str(e)) from e
+            attempt += 1
+            if attempt > TRANSFER_RETRIES:
+                raise
+            PrintStyle.warning(f"Resuming transfer of {abs_path} at {position} bytes: {e}")
+
+
+def write_file_resumable(relative_path: str, stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> bool:
+    """
+    Write a seekable binary stream to a file, resuming after a broken stream.
+
+    Data is written to a part file at increasing offsets and moved in place
+    after its size and SHA-256 hash match the source.
+
+    Args:
+        relative_path: Path to the file relative to base directory
+        stream: Seekable binary stream with the content, read from the start
+        chunk_size: Maximum size of a single chunk
+
+    Returns:
+        True if successful
+    """
+    abs_path = get_abs_path(relative_path)
+    hasher = hashlib.sha256()
+    hashed = 0  # bytes of the source already hashed
+
+    def chunks(offset: int):
+        nonlocal hashed
+        stream.seek(offset)
+        position = offset
+        while chunk := stream.read(chunk_size):
+            # resent ranges are hashed only once
+            if position + len(chunk) > hashed:
+                hasher.update(chunk[hashed - position :])
+                hashed = position + len(chunk)
+            position += len(chunk)
+            yield chunk
+
+    offset = 0
+    attempt = 0
+    while True:
+        try:
+            runtime.upload_development_function_sync(
+                _write_file_range_impl, chunks(offset), abs_path, offset
+            )
+            break
+        except Exception as e:
+            attempt += 1
+            if attempt > TRANSFER_RETRIES:
+                raise
+            offset = runtime.call_development_function_sync(_get_part_size_impl, abs_path)
+            PrintStyle.warning(f"Resuming transfer of {abs_path} at {offset} bytes: {e}")
+
+    return runtime.call_development_function_sync(
+        _finish_part_file_impl, abs_path, hashed, hasher.hexdigest()
     )
-    return base64.b64decode(b64_content)
 
 
 def read_file_base64(relative_path: str, backup_dirs=None) -> str:
@@ -75,15 +223,28 @@ def write_file_binary(relative_path: str, content: bytes) -> bool:
         relative_path: Path to the file relative to base directory
         content: Binary content to write
 
+    Returns:
+        True if successful
+    """
+    return write_file_chunks(relative_path, [content])
+
+
+def write_file_chunks(relative_path: str, chunks: Iterable[bytes]) -> bool:
+    """
+    Write a stream of binary chunks to a file with bounded memory.
+
+    Args:
+        relative_path: Path to the file relative to base directory
+        chunks: Iterable of binary chunks to write
+
     Returns:
         True if successful
     """
     abs_path = get_abs_path(relative_path)
 
-    # Use RFC routing for development mode
-    b64_content = base64.b64encode(content).decode('utf-8')
-    return runtime.call_development_function_sync(
-        _write_file_binary_impl, abs_path, b64_content
+    # Use binary RFC stream for development mode
+    return runtime.upload_development_function_sync(
+        _write_file_chunks_impl, chunks, abs_path
     )
 
 
@@ -303,11 +464,10 @@ def read_directory_as_zip(relative_path: str) -> bytes:
     """
     abs_path = get_abs_path(relative_path)
 
-    # Use RFC routing for development mode
-    b64_zip = runtime.call_development_function_sync(
-        _read_directory_impl, abs_path
+    # Use binary RFC stream for development mode
+    return b"".join(
+        runtime.stream_development_function_sync(_read_directory_chunks_impl, abs_path)
     )
-    return base64.b64decode(b64_zip)
 
 
 def find_file_in_dirs(file_path: str, backup_dirs: list[str]) -> str:
@@ -343,10 +503,10 @@ def find_file_in_dirs(file_path: str, backup_dirs: list[str]) -> str:
 # IMPLEMENTATION FUNCTIONS (Container Operations)
 # =====================================================
 
-def _read_file_binary_impl(file_path: str) -> str:
+def _read_file_chunks_impl(file_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
     """
-    Implementation function to read a file in binary mode.
-    Returns base64 encoded content for RFC transport.
+    Implementation function to read a file as binary chunks.
+    Chunks are sent as binary RFC stream frames, no base64 involved.
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
@@ -354,12 +514,117 @@ def _read_file_binary_impl(file_path: str) -> str:
     if not os.path.isfile(file_path):
         raise Exception(f"Path is not a file: {file_path}")
 
-    try:
+    def generate():
         with open(file_path, 'rb') as file:
-            content = file.read()
-            return base64.b64encode(content).decode('utf-8')
+            while chunk := file.read(chunk_size):
+                yield chunk
+
+    return generate()
+
+
+def _write_file_chunks_impl(chunks: Iterable[bytes], file_path: str) -> bool:
+    """
+    Implementation function to write binary chunks to a file.
+    Data is written to a temporary file first and moved in place when complete.
+    """
+    temp_path = file_path + ".part"
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(temp_path, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        os.replace(temp_path, file_path)
+        return True
     except Exception as e:
-        raise Exception(f"Failed to read file {file_path}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise Exception(f"Failed to write file {file_path}: {str(e)}")
+
+
+# start of the FileChangedError message, remote errors only carry the message
+FILE_CHANGED_MESSAGE = "File changed during transfer"
+
+
+class FileChangedError(Exception):
+    pass
+
+
+def _get_file_stat_impl(file_path: str) -> dict:
+    """
+    Implementation function to get size and modification time of a file.
+    """
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    stat_info = os.stat(file_path)
+    return {
+        "size": stat_info.st_size,
+        "mtime": stat_info.st_mtime,
+        "etag": f"{stat_info.st_size:x}-{stat_info.st_mtime_ns:x}",
+    }
+
+
+def _read_file_range_impl(file_path: str, offset: int, length: int, etag: str = "", chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Implementation function to read a byte range of a file as binary chunks.
+    Fails when the file does not match the etag the transfer started with.
+    """
+    if etag and _get_file_stat_impl(file_path)["etag"] != etag:
+        raise FileChangedError(f"{FILE_CHANGED_MESSAGE}: {file_path}")
+
+    def generate():
+        remaining = length
+        with open(file_path, 'rb') as file:
+            file.seek(offset)
+            while remaining > 0:
+                chunk = file.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    return generate()
+
+
+def _get_part_size_impl(file_path: str) -> int:
+    """Implementation function to get the size of a partially written file."""
+    part_path = file_path + PART_SUFFIX
+    return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+
+def _write_file_range_impl(chunks: Iterable[bytes], file_path: str, offset: int) -> int:
+    """
+    Implementation function to write binary chunks to a part file at an offset.
+    Returns the size of the part file.
+    """
+    part_path = file_path + PART_SUFFIX
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    if offset and offset > _get_part_size_impl(file_path):
+        raise Exception(f"Cannot resume {file_path} at {offset}, part file is shorter")
+
+    with open(part_path, 'r+b' if offset else 'wb') as file:
+        file.truncate(offset)
+        file.seek(offset)
+        for chunk in chunks:
+            file.write(chunk)
+        return file.tell()
+
+
+def _finish_part_file_impl(file_path: str, size: int, sha256: str) -> bool:
+    """
+    Implementation function to verify a part file and move it in place.
+    """
+    part_path = file_path + PART_SUFFIX
+    hasher = hashlib.sha256()
+    with open(part_path, 'rb') as file:
+        while chunk := file.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    actual_size = os.path.getsize(part_path)
+    if actual_size != size or hasher.hexdigest() != sha256:
+        os.unlink(part_path)
+        raise Exception(f"Integrity check of {file_path} failed, {actual_size} of {size} bytes received")
+    os.replace(part_path, file_path)
+    return True
 
 
 def _write_file_binary_impl(file_path: str, b64_content: str) -> bool:
@@ -578,6 +843,21 @@ def _read_directory_impl(dir_path: str) -> str:
         raise Exception(f"Failed to zip directory {dir_path}: {str(e)}")
 
 
+def _read_directory_chunks_impl(dir_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Implementation function to zip a directory and return the zip as binary chunks.
+    The archive is produced while it is read, without a temporary file.
+    """
+    if not os.path.exists(dir_path):
+        raise FileNotFoundError(f"Directory not found: {dir_path}")
+
+    if not os.path.isdir(dir_path):
+        raise Exception(f"Path is not a directory: {dir_path}")
+
+    # zipped while streamed, entries are relative to the directory
+    return zip_stream.stream_zip(dir_path, "", chunk_size)
+
+
 def _read_file_as_base64_impl(file_path: str) -> str:
     """
     Implementation function to read a file and return its content as base64.
@@ -1,8 +1,8 @@
 import argparse
 import inspect
 import secrets
-from typing import TypeVar, Callable, Awaitable, Union, overload, cast
-from python.helpers import dotenv, rfc, settings, files
+from typing import TypeVar, Callable, Awaitable, Union, overload, cast, AsyncIterator, Iterable, Iterator
+from python.helpers import dotenv, rfc, settings, files, defer
 import asyncio
 import threading
 import queue
@@ -82,7 +82,7 @@ async def call_development_function(func: Union[Callable[..., T], Callable[...,
     if is_development():
         url = _get_rfc_url()
         password = _get_rfc_password()
-        module = files.deabsolute_path(func.__code__.co_filename).replace("/", ".").removesuffix(".py") # __module__ is not reliable
+        module = _get_func_module(func)
         result = await rfc.call_rfc(
             url=url,
             password=password,
@@ -99,10 +99,90 @@ async def call_development_function(func: Union[Callable[..., T], Callable[...,
             return func(*args, **kwargs) # type: ignore
 
 
+async def stream_development_function(func: Callable[..., Iterator[bytes]], *args, **kwargs) -> AsyncIterator[bytes]:
+    """Call a function returning chunks of bytes, streamed over binary RFC in development."""
+    if is_development():
+        async for chunk in rfc.stream_rfc(
+            url=_get_rfc_stream_url(),
+            password=_get_rfc_password(),
+            module=_get_func_module(func),
+            function_name=func.__name__,
+            args=list(args),
+            kwargs=kwargs,
+        ):
+            yield chunk
+    else:
+        result = func(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        if hasattr(result, "__aiter__"):
+            async for chunk in result:  # type: ignore
+                yield chunk
+        else:
+            for chunk in result:
+                yield chunk
+
+
+async def upload_development_function(func: Callable[..., T], body: Iterable[bytes], *args, **kwargs) -> T:
+    """Call a function consuming chunks of bytes as its first argument, streamed over binary RFC in development."""
+    if is_development():
+        result = await rfc.upload_rfc(
+            url=_get_rfc_stream_url(),
+            password=_get_rfc_password(),
+            module=_get_func_module(func),
+            function_name=func.__name__,
+            args=list(args),
+            kwargs=kwargs,
+            body=body,
+        )
+        return cast(T, result)
+    else:
+        result = func(body, *args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return cast(T, result)
+
+
+def stream_development_function_sync(func: Callable[..., Iterator[bytes]], *args, **kwargs) -> Iterator[bytes]:
+    if is_development():
+        return rfc.stream_rfc_sync(
+            url=_get_rfc_stream_url(),
+            password=_get_rfc_password(),
+            module=_get_func_module(func),
+            function_name=func.__name__,
+            args=list(args),
+            kwargs=kwargs,
+        )
+    return func(*args, **kwargs)
+
+
+def upload_development_function_sync(func: Callable[..., T], body: Iterable[bytes], *args, **kwargs) -> T:
+    if is_development():
+        result = rfc.upload_rfc_sync(
+            url=_get_rfc_stream_url(),
+            password=_get_rfc_password(),
+            module=_get_func_module(func),
+            function_name=func.__name__,
+            args=list(args),
+            kwargs=kwargs,
+            body=body,
+        )
+        return cast(T, result)
+    return func(body, *args, **kwargs)
+
+
 async def handle_rfc(rfc_call: rfc.RFCCall):
     return await rfc.handle_rfc(rfc_call=rfc_call, password=_get_rfc_password())
 
 
+async def handle_rfc_stream(reader) -> Iterator[bytes]:
+    return await rfc.handle_rfc_stream(reader=reader, password=_get_rfc_password())
+
+
+def _get_func_module(func: Callable) -> str:
+    return files.deabsolute_path(func.__code__.co_filename).replace("/", ".").removesuffix(".py") # __module__ is not reliable
+
+
 def _get_rfc_password() -> str:
     password = dotenv.get_dotenv_value(dotenv.KEY_RFC_PASSWORD)
     if not password:
@@ -122,7 +202,18 @@ def _get_rfc_url() -> str:
     return url
 
 
+def _get_rfc_stream_url() -> str:
+    return _get_rfc_url() + "_stream"
+
+
 def call_development_function_sync(func: Union[Callable[..., T], Callable[..., Awaitable[T]]], *args, **kwargs) -> T:
+    if is_development():
+        # RFC calls run on the shared RFC loop with pooled connections
+        future = defer.EventLoopThread(rfc.LOOP_THREAD_NAME).run_coroutine(
+            call_development_function(func, *args, **kwargs)
+        )
+        return cast(T, future.result(timeout=30))
+
     # run async function in sync manner
     result_queue = queue.Queue()
     
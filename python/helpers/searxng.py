@@ -1,12 +1,198 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
 import aiohttp
-from python.helpers import runtime
+from python.helpers import runtime, settings, files, defer
+from python.helpers.print_style import PrintStyle
 
 URL = "http://localhost:55510/search"
 
-async def search(query:str):
-    return await runtime.call_development_function(_search, query=query)
+LOOP_THREAD_NAME = "SearXNG"
+CACHE_SIZE = 512
+CACHE_FILE = "tmp/searxng_cache.json"
+SAVE_DELAY = 5.0  # seconds, cache changes in this time are saved together
+CONNECTION_LIMIT = 8
+TIMEOUT = 30
+
+_session: aiohttp.ClientSession | None = None
+
+
+class _FetchCancelled(Exception):
+    """The caller making a shared request was cancelled, waiters make their own."""
+
+
+async def search(query: str):
+    return await SearchCache.get_instance().get(
+        query, lambda: runtime.call_development_function(_search, query=query)
+    )
+
+
+def get_stats() -> dict:
+    return SearchCache.get_instance().stats()
+
+
+async def _search(query: str):
+    # requests run on a dedicated loop so the session and its connections can be reused
+    loop_thread = defer.EventLoopThread(LOOP_THREAD_NAME)
+    if asyncio.get_running_loop() is loop_thread.loop:
+        return await _post(query)
+    return await asyncio.wrap_future(loop_thread.run_coroutine(_post(query)))
+
+
+async def _post(query: str):
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=CONNECTION_LIMIT),
+            timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+        )
+    async with _session.post(URL, data={"q": query, "format": "json"}) as response:
+        response.raise_for_status()
+        return await response.json()
+
+
+class SearchCache:
+    """TTL and size bounded cache of search results keyed by normalized query.
+
+    Concurrent searches for the same query share one request. Futures are thread-safe
+    so callers on different event loops can wait for the same request.
+    """
+
+    _instance: "SearchCache | None" = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()  # key -> (expires, result)
+        self._pending: dict[str, Future] = {}
+        self._loaded = False
+        self._save_timer: threading.Timer | None = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @staticmethod
+    def get_instance() -> "SearchCache":
+        with SearchCache._instance_lock:
+            if SearchCache._instance is None:
+                SearchCache._instance = SearchCache()
+            return SearchCache._instance
+
+    async def get(self, query: str, fetch):
+        ttl, persist = _get_config()
+        if ttl <= 0:
+            return await fetch()
+
+        key = normalize_query(query)
+        owner = False
+        with self._lock:
+            if persist and not self._loaded:
+                self._load()
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            pending = self._pending.get(key)
+            if pending:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+                owner = True
+        if not owner:
+            try:
+                # shielded, a cancelled waiter must not cancel the shared request
+                return await asyncio.shield(asyncio.wrap_future(pending))
+            except _FetchCancelled:
+                return await self.get(query, fetch)
+
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            # only the owner was cancelled, the others retry instead of being cancelled with it
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set_exception(_FetchCancelled())
+            pending.exception()
+            raise
+        except BaseException as e:
+            with self._lock:
+                self.errors += 1
+                self._pending.pop(key, None)
+            pending.set_exception(e)
+            pending.exception()  # mark as retrieved when nobody else waits
+            raise
+
+        with self._lock:
+            self._pending.pop(key, None)
+            self._entries[key] = (time.time() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > CACHE_SIZE:
+                self._entries.popitem(last=False)
+            if persist:
+                self._schedule_save()
+        pending.set_result(result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if _get_config()[1]:
+                self._schedule_save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_size": CACHE_SIZE,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "hit_rate": round((self.hits + self.coalesced) / total, 3) if total else 0,
+            }
+
+    def _load(self):
+        self._loaded = True
+        try:
+            if not files.exists(CACHE_FILE):
+                return
+            now = time.time()
+            data = json.loads(files.read_file(CACHE_FILE))
+            for key, (expires, result) in data.items():
+                if expires > now:
+                    self._entries[key] = (expires, result)
+        except Exception as e:
+            PrintStyle.error(f"Failed to load search cache: {e}")
+
+    def _schedule_save(self):
+        # called with the lock held, the file is written by a timer thread off the event loop
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(SAVE_DELAY, self._save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self):
+        with self._lock:
+            self._save_timer = None
+            entries = dict(self._entries)
+        try:
+            files.write_file(CACHE_FILE, json.dumps(entries))
+        except Exception as e:
+            PrintStyle.error(f"Failed to save search cache: {e}")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
 
-async def _search(query:str):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(URL, data={"q": query, "format": "json"}) as response:
-            return await response.json()
+def _get_config() -> tuple[int, bool]:
+    set = settings.get_settings()
+    return int(set["search_cache_ttl"]), bool(set["search_cache_persist"])
@@ -7,7 +7,7 @@ import subprocess
 from typing import Any, Literal, TypedDict, cast
 
 import models
-from python.helpers import runtime, whisper, defer, git
+from python.helpers import runtime, defer, git, tracing
 from . import files, dotenv
 from python.helpers.print_style import PrintStyle
 from python.helpers.providers import get_providers
@@ -38,6 +38,8 @@ class Settings(TypedDict):
     util_model_rl_requests: int
     util_model_rl_input: int
     util_model_rl_output: int
+    util_model_concurrency: int
+    util_model_context_concurrency: int
 
     embed_model_provider: str
     embed_model_name: str
@@ -59,6 +61,10 @@ class Settings(TypedDict):
     agent_profile: str
     agent_memory_subdir: str
     agent_knowledge_subdir: str
+    agent_subordinate_concurrency: int
+
+    search_cache_ttl: int
+    search_cache_persist: bool
 
     memory_recall_enabled: bool
     memory_recall_delayed: bool
@@ -89,6 +95,12 @@ class Settings(TypedDict):
 
     shell_interface: Literal['local','ssh']
 
+    log_html_stream: bool
+    log_html_max_size: int
+
+    tracing_enabled: bool
+    tracing_max_size: int
+
     stt_model_size: str
     stt_language: str
     stt_silence_threshold: float
@@ -105,6 +117,9 @@ class Settings(TypedDict):
 
     a2a_server_enabled: bool
 
+    context_pool_min: int
+    context_pool_max: int
+
     variables: str
     secrets: str
 
@@ -341,6 +356,36 @@ def convert_out(settings: Settings) -> SettingsOutput:
         }
     )
 
+    util_model_fields.append(
+        {
+            "id": "util_model_concurrency",
+            "title": "Utility model concurrent calls",
+            "description": "Maximum number of utility model calls running at the same time across all chats. Waiting calls are served by priority: prompt preparation, memory recall, history compression, memorization, chat renaming. Set to 0 for no limit.",
+            "type": "number",
+            "value": settings["util_model_concurrency"],
+        }
+    )
+
+    util_model_fields.append(
+        {
+            "id": "util_model_context_concurrency",
+            "title": "Utility model concurrent calls per chat",
+            "description": "Maximum number of background utility model calls running at the same time for a single chat, calls the agent waits on for its next prompt are not limited by it. Set to 0 for no limit.",
+            "type": "number",
+            "value": settings["util_model_context_concurrency"],
+        }
+    )
+
+    util_model_fields.append(
+        {
+            "id": "util_model_queue",
+            "title": "Utility call queue",
+            "description": "Queued and running utility model calls by priority with their wait times.",
+            "value": "<x-component path='/settings/utility/queue-stats.html' />",
+            "type": "html",
+        }
+    )
+
     util_model_fields.append(
         {
             "id": "util_model_kwargs",
@@ -651,6 +696,15 @@ def convert_out(settings: Settings) -> SettingsOutput:
             ],
         }
     )
+    agent_fields.append(
+        {
+            "id": "agent_subordinate_concurrency",
+            "title": "Parallel subordinates",
+            "description": "Maximum number of subordinate agents running at the same time when an agent delegates multiple subtasks in one call_subordinate call.",
+            "type": "number",
+            "value": settings["agent_subordinate_concurrency"],
+        }
+    )
 
     agent_section: SettingsSection = {
         "id": "agent",
@@ -843,6 +897,36 @@ def convert_out(settings: Settings) -> SettingsOutput:
         "tab": "agent",
     }
 
+    search_fields: list[SettingsField] = []
+
+    search_fields.append(
+        {
+            "id": "search_cache_ttl",
+            "title": "Search cache lifetime (seconds)",
+            "description": "How long results of the search engine tool are reused for the same query. Identical queries running at the same time always share one request. Set to 0 to disable caching.",
+            "type": "number",
+            "value": settings["search_cache_ttl"],
+        }
+    )
+
+    search_fields.append(
+        {
+            "id": "search_cache_persist",
+            "title": "Keep search cache after restart",
+            "description": "Store cached search results in the tmp folder so they survive a restart of A0.",
+            "type": "switch",
+            "value": settings["search_cache_persist"],
+        }
+    )
+
+    search_section: SettingsSection = {
+        "id": "search",
+        "title": "Web Search",
+        "description": "Caching of search engine results.",
+        "fields": search_fields,
+        "tab": "agent",
+    }
+
     dev_fields: list[SettingsField] = []
 
     dev_fields.append(
@@ -912,6 +996,46 @@ def convert_out(settings: Settings) -> SettingsOutput:
             }
         )
 
+    dev_fields.append(
+        {
+            "id": "log_html_stream",
+            "title": "Log streamed output to HTML log",
+            "description": "Write every streamed chunk of agent responses to the HTML log in the logs folder. Disable to reduce log volume and overhead with many concurrent chats, regular messages are logged either way.",
+            "type": "switch",
+            "value": settings["log_html_stream"],
+        }
+    )
+
+    dev_fields.append(
+        {
+            "id": "log_html_max_size",
+            "title": "HTML log max size (MB)",
+            "description": "When the HTML log file grows over this size, a new log file is started. Set to 0 for no limit.",
+            "type": "number",
+            "value": settings["log_html_max_size"],
+        }
+    )
+
+    dev_fields.append(
+        {
+            "id": "tracing_enabled",
+            "title": "Trace agent loop timing",
+            "description": "Record timing spans of extensions, prompts, model calls, tools, MCP calls and memory searches to JSONL trace files in logs/traces. A per-iteration summary is available from the trace_summary API. Adds a small overhead, keep disabled when not profiling.",
+            "type": "switch",
+            "value": settings["tracing_enabled"],
+        }
+    )
+
+    dev_fields.append(
+        {
+            "id": "tracing_max_size",
+            "title": "Trace file max size (MB)",
+            "description": "When a trace file grows over this size, a new file is started. The newest files are kept. Set to 0 for no limit.",
+            "type": "number",
+            "value": settings["tracing_max_size"],
+        }
+    )
+
     dev_section: SettingsSection = {
         "id": "dev",
         "title": "Development",
@@ -1194,6 +1318,37 @@ def convert_out(settings: Settings) -> SettingsOutput:
         "tab": "mcp",
     }
 
+    # -------- Context Pool Section --------
+    context_pool_fields: list[SettingsField] = []
+
+    context_pool_fields.append(
+        {
+            "id": "context_pool_min",
+            "title": "Minimum warm contexts",
+            "description": "Number of pre-initialized contexts kept ready for incoming MCP, A2A and external API requests. Set to 0 to only reuse contexts returned by finished requests.",
+            "type": "number",
+            "value": settings["context_pool_min"],
+        }
+    )
+
+    context_pool_fields.append(
+        {
+            "id": "context_pool_max",
+            "title": "Maximum idle contexts",
+            "description": "Maximum number of idle contexts kept in the pool. Requests over this limit still get a new context, it is just not kept afterwards.",
+            "type": "number",
+            "value": settings["context_pool_max"],
+        }
+    )
+
+    context_pool_section: SettingsSection = {
+        "id": "context_pool",
+        "title": "Context Pool",
+        "description": "Contexts for remote requests are taken from a pool of pre-initialized agents and reset after use instead of being built from scratch for each request.",
+        "fields": context_pool_fields,
+        "tab": "mcp",
+    }
+
 
     # External API section
     external_api_fields: list[SettingsField] = []
@@ -1260,6 +1415,7 @@ def convert_out(settings: Settings) -> SettingsOutput:
             browser_model_section,
             embed_model_section,
             memory_section,
+            search_section,
             speech_section,
             api_keys_section,
             litellm_section,
@@ -1268,6 +1424,7 @@ def convert_out(settings: Settings) -> SettingsOutput:
             mcp_client_section,
             mcp_server_section,
             a2a_section,
+            context_pool_section,
             external_api_section,
             backup_section,
             dev_section,
@@ -1446,6 +1603,8 @@ def get_default_settings() -> Settings:
         util_model_rl_requests=0,
         util_model_rl_input=0,
         util_model_rl_output=0,
+        util_model_concurrency=4,
+        util_model_context_concurrency=2,
         embed_model_provider="huggingface",
         embed_model_name="sentence-transformers/all-MiniLM-L6-v2",
         embed_model_api_base="",
@@ -1482,12 +1641,19 @@ def get_default_settings() -> Settings:
         agent_profile="agent0",
         agent_memory_subdir="default",
         agent_knowledge_subdir="custom",
+        agent_subordinate_concurrency=4,
+        search_cache_ttl=600,
+        search_cache_persist=False,
         rfc_auto_docker=True,
         rfc_url="localhost",
         rfc_password="",
         rfc_port_http=55080,
         rfc_port_ssh=55022,
         shell_interface="local" if runtime.is_dockerized() else "ssh",
+        log_html_stream=True,
+        log_html_max_size=50,
+        tracing_enabled=False,
+        tracing_max_size=50,
         stt_model_size="base",
         stt_language="en",
         stt_silence_threshold=0.3,
@@ -1500,6 +1666,8 @@ def get_default_settings() -> Settings:
         mcp_server_enabled=False,
         mcp_server_token=create_auth_token(),
         a2a_server_enabled=False,
+        context_pool_min=1,
+        context_pool_max=4,
         variables="",
         secrets="",
         litellm_global_kwargs={},
@@ -1511,8 +1679,19 @@ def _apply_settings(previous: Settings | None):
     if _settings:
         from agent import AgentContext
         from initialize import initialize_agent
+        from python.helpers.context_pool import ContextPool
+
+        PrintStyle.configure_log(
+            stream_html=_settings["log_html_stream"],
+            max_size_mb=_settings["log_html_max_size"],
+        )
+        tracing.configure(
+            enabled=_settings["tracing_enabled"],
+            max_size_mb=_settings["tracing_max_size"],
+        )
 
         config = initialize_agent()
+        ContextPool.invalidate()  # idle pooled contexts were built with previous config
         for ctx in AgentContext._contexts.values():
             ctx.config = config  # reinitialize context config with new settings
             # apply config to agents
@@ -1524,7 +1703,7 @@ def _apply_settings(previous: Settings | None):
         # reload whisper model if necessary
         if not previous or _settings["stt_model_size"] != previous["stt_model_size"]:
             task = defer.DeferredTask().start_task(
-                whisper.preload, _settings["stt_model_size"]
+                _preload_whisper, _settings["stt_model_size"]
             )  # TODO overkill, replace with background task
 
         # force memory reload on embedding model change
@@ -1613,6 +1792,12 @@ def _apply_settings(previous: Settings | None):
             )  # TODO overkill, replace with background task
 
 
+async def _preload_whisper(model_size: str):
+    # whisper imports torch, it is loaded in the background task and not with the settings
+    from python.helpers import whisper
+    return await whisper.preload(model_size)
+
+
 def _env_to_dict(data: str):
     result = {}
     for line in data.splitlines():
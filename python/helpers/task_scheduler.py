@@ -1,8 +1,10 @@
 import asyncio
 from datetime import datetime, timezone, timedelta
+import heapq
 import os
 import random
 import threading
+import time
 from urllib.parse import urlparse
 import uuid
 from enum import Enum
@@ -13,7 +15,7 @@ import nest_asyncio
 nest_asyncio.apply()
 
 from crontab import CronTab
-from pydantic import BaseModel, Field, PrivateAttr
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter
 
 from agent import Agent, AgentContext, UserMessage
 from initialize import initialize_agent
@@ -26,6 +28,8 @@ import pytz
 from typing import Annotated
 
 SCHEDULER_FOLDER = "tmp/scheduler"
+TASKS_FOLDER = SCHEDULER_FOLDER + "/tasks"
+MISSED_RUN_GRACE = 60  # seconds, scheduled runs overdue by more are skipped
 
 # ----------------------
 # Task Models
@@ -201,7 +205,6 @@ class BaseTask(BaseModel):
     async def on_error(self, error: str):
         # Update task state to ERROR and set last result
         scheduler = TaskScheduler.get()
-        await scheduler.reload()  # Ensure we have the latest state
         updated_task = await scheduler.update_task(
             self.uuid,
             state=TaskState.ERROR,
@@ -212,12 +215,10 @@ class BaseTask(BaseModel):
             PrintStyle(italic=True, font_color="red", padding=False).print(
                 f"Failed to update task {self.uuid} state to ERROR after error: {error}"
             )
-        await scheduler.save()  # Force save after update
 
     async def on_success(self, result: str):
         # Update task state to IDLE and set last result
         scheduler = TaskScheduler.get()
-        await scheduler.reload()  # Ensure we have the latest state
         updated_task = await scheduler.update_task(
             self.uuid,
             state=TaskState.IDLE,
@@ -228,7 +229,6 @@ class BaseTask(BaseModel):
             PrintStyle(italic=True, font_color="red", padding=False).print(
                 f"Failed to update task {self.uuid} state to IDLE after success"
             )
-        await scheduler.save()  # Force save after update
 
 
 class AdHocTask(BaseTask):
@@ -425,9 +425,7 @@ class PlannedTask(BaseTask):
         # If we updated the plan, make sure to persist it
         if plan_updated:
             scheduler = TaskScheduler.get()
-            await scheduler.reload()
             await scheduler.update_task(self.uuid, plan=self.plan)
-            await scheduler.save()  # Force save
 
         # Call the parent implementation for any additional cleanup
         await super().on_finish()
@@ -441,7 +439,21 @@ class PlannedTask(BaseTask):
         await super().on_error(error)
 
 
+_task_adapter: TypeAdapter[Union[ScheduledTask, AdHocTask, PlannedTask]] = TypeAdapter(
+    Annotated[Union[ScheduledTask, AdHocTask, PlannedTask], Field(discriminator="type")]
+)
+
+
 class SchedulerTaskList(BaseModel):
+    """
+    Task store with one JSON record per task in SCHEDULER_FOLDER/tasks.
+
+    Tasks are indexed by UUID and context ID, single task updates only rewrite the
+    record of that task (atomically, via temp file and rename). Changes made by other
+    processes are picked up by comparing the folder and record modification stamps,
+    so only changed records are parsed again. A priority queue of next run times
+    tells the job loop when the earliest task is due.
+    """
     tasks: list[Annotated[Union[ScheduledTask, AdHocTask, PlannedTask], Field(discriminator="type")]] = Field(default_factory=list)
     # Singleton instance
     __instance: ClassVar[Optional["SchedulerTaskList"]] = PrivateAttr(default=None)
@@ -450,76 +462,87 @@ class SchedulerTaskList(BaseModel):
 
     @classmethod
     def get(cls) -> "SchedulerTaskList":
-        path = get_abs_path(SCHEDULER_FOLDER, "tasks.json")
         if cls.__instance is None:
-            if not exists(path):
-                make_dirs(path)
-                cls.__instance = asyncio.run(cls(tasks=[]).save())
-            else:
-                cls.__instance = cls.model_validate_json(read_file(path))
+            instance = cls(tasks=[])
+            instance.refresh()
+            cls.__instance = instance
         else:
-            asyncio.run(cls.__instance.reload())
+            cls.__instance.refresh()
         return cls.__instance
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._lock = threading.RLock()
+        self._by_uuid: dict[str, Union[ScheduledTask, AdHocTask, PlannedTask]] = {}
+        self._by_context: dict[str, set[str]] = {}
+        self._context_of: dict[str, str] = {}  # uuid -> indexed context id
+        self._written: dict[str, int] = {}  # uuid -> hash of last written or read record
+        self._stamps: dict[str, tuple[int, int]] = {}  # uuid -> (mtime_ns, size) of record
+        self._folder_stamp: int | None = None
+        self._queue: list[tuple[float, str]] = []  # heap of (next run timestamp, uuid)
+        self._next_runs: dict[str, float] = {}  # uuid -> queued next run, older heap entries are stale
+        self._on_schedule_change: Callable[[], None] | None = None
+        self._legacy_failed: tuple[int, int] | None = None  # (mtime_ns, size) of tasks.json that failed to import
 
     async def reload(self) -> "SchedulerTaskList":
-        path = get_abs_path(SCHEDULER_FOLDER, "tasks.json")
-        if exists(path):
-            with self._lock:
-                data = self.__class__.model_validate_json(read_file(path))
-                self.tasks.clear()
-                self.tasks.extend(data.tasks)
+        self.refresh()
         return self
 
+    def refresh(self):
+        """Pick up records changed by other processes, only a folder stat when nothing changed."""
+        folder = get_abs_path(TASKS_FOLDER)
+        with self._lock:
+            self._migrate_legacy_file()
+            stamp = _stat_mtime(folder)
+            if stamp is not None and stamp == self._folder_stamp:
+                return
+            self._folder_stamp = stamp
+            found: set[str] = set()
+            if stamp is not None:
+                for entry in os.scandir(folder):
+                    if not entry.name.endswith(".json"):
+                        continue
+                    task_uuid = entry.name[: -len(".json")]
+                    found.add(task_uuid)
+                    st = entry.stat()
+                    if self._stamps.get(task_uuid) == (st.st_mtime_ns, st.st_size):
+                        continue
+                    try:
+                        data = read_file(os.path.join(folder, entry.name))
+                        task = _task_adapter.validate_json(data)
+                    except Exception as e:
+                        PrintStyle(italic=True, font_color="red", padding=False).print(
+                            f"Failed to load scheduler task {task_uuid}: {e}"
+                        )
+                        continue
+                    self._stamps[task_uuid] = (st.st_mtime_ns, st.st_size)
+                    self._written[task_uuid] = hash(data)
+                    self._index(task)
+            for task_uuid in list(self._by_uuid.keys() - found):
+                self._unindex(task_uuid)
+
     async def add_task(self, task: Union[ScheduledTask, AdHocTask, PlannedTask]) -> "SchedulerTaskList":
         with self._lock:
-            self.tasks.append(task)
-            await self.save()
+            self._index(task)
+            self._write_task(task)
         return self
 
     async def save(self) -> "SchedulerTaskList":
+        # write only records that changed since they were last written
         with self._lock:
-            # Debug: check for AdHocTasks with null tokens before saving
             for task in self.tasks:
-                if isinstance(task, AdHocTask):
-                    if task.token is None or task.token == "":
-                        PrintStyle(italic=True, font_color="red", padding=False).print(
-                            f"WARNING: AdHocTask {task.name} ({task.uuid}) has a null or empty token before saving: '{task.token}'"
-                        )
-                        # Generate a new token to prevent errors
-                        task.token = str(random.randint(1000000000000000000, 9999999999999999999))
-                        PrintStyle(italic=True, font_color="red", padding=False).print(
-                            f"Fixed: Generated new token '{task.token}' for task {task.name}"
-                        )
-
-            path = get_abs_path(SCHEDULER_FOLDER, "tasks.json")
-            if not exists(path):
-                make_dirs(path)
-
-            # Get the JSON string before writing
-            json_data = self.model_dump_json()
-
-            # Debug: check if 'null' appears as token value in JSON
-            if '"type": "adhoc"' in json_data and '"token": null' in json_data:
-                PrintStyle(italic=True, font_color="red", padding=False).print(
-                    "ERROR: Found null token in JSON output for an adhoc task"
-                )
-
-            write_file(path, json_data)
-
-            # Debug: Verify after saving
-            if exists(path):
-                loaded_json = read_file(path)
-                if '"type": "adhoc"' in loaded_json and '"token": null' in loaded_json:
-                    PrintStyle(italic=True, font_color="red", padding=False).print(
-                        "ERROR: Null token persisted in JSON file for an adhoc task"
-                    )
-
+                self._write_task(task)
+                self._schedule(task)
         return self
 
+    async def save_task(self, task_uuid: str) -> Union[ScheduledTask, AdHocTask, PlannedTask] | None:
+        with self._lock:
+            task = self._by_uuid.get(task_uuid)
+            if task:
+                self._write_task(task)
+                self._schedule(task)
+            return task
+
     async def update_task_by_uuid(
         self,
         task_uuid: str,
@@ -530,24 +553,25 @@ class SchedulerTaskList(BaseModel):
         Atomically update a task by UUID using the provided updater function.
 
         The updater_func should take the task as an argument and perform any necessary updates.
-        This method ensures that the task is updated and saved atomically, preventing race conditions.
+        Only the record of this task is rewritten, other tasks are not touched.
 
         Returns the updated task or None if not found.
         """
         with self._lock:
-            # Reload to ensure we have the latest state
-            await self.reload()
+            # Pick up changes from other processes
+            self.refresh()
 
             # Find the task
-            task = next((task for task in self.tasks if task.uuid == task_uuid and verify_func(task)), None)
-            if task is None:
+            task = self._by_uuid.get(task_uuid)
+            if task is None or not verify_func(task):
                 return None
 
             # Apply the updates via the provided function
             updater_func(task)
 
-            # Save the changes
-            await self.save()
+            # Save the changes and requeue with the new next run
+            self._index(task)
+            self._write_task(task)
 
             return task
 
@@ -558,22 +582,43 @@ class SchedulerTaskList(BaseModel):
     def get_tasks_by_context_id(self, context_id: str, only_running: bool = False) -> list[Union[ScheduledTask, AdHocTask, PlannedTask]]:
         with self._lock:
             return [
-                task for task in self.tasks
-                if task.context_id == context_id
-                and (not only_running or task.state == TaskState.RUNNING)
+                self._by_uuid[task_uuid] for task_uuid in self._by_context.get(context_id, ())
+                if not only_running or self._by_uuid[task_uuid].state == TaskState.RUNNING
             ]
 
     async def get_due_tasks(self) -> list[Union[ScheduledTask, AdHocTask, PlannedTask]]:
         with self._lock:
-            await self.reload()
-            return [
-                task for task in self.tasks
-                if task.check_schedule() and task.state == TaskState.IDLE
-            ]
+            self.refresh()
+            now = time.time()
+            due = []
+            while self._queue and self._queue[0][0] <= now:
+                run_at, task_uuid = heapq.heappop(self._queue)
+                if self._next_runs.get(task_uuid) != run_at:
+                    continue  # stale entry, task was rescheduled or removed
+                del self._next_runs[task_uuid]
+                task = self._by_uuid[task_uuid]
+                if isinstance(task, ScheduledTask):
+                    # queue the following run now, the current one is started or skipped
+                    self._schedule(task, after=run_at)
+                    if now - run_at > MISSED_RUN_GRACE:
+                        continue  # missed while the loop was paused or busy
+                if task.state == TaskState.IDLE:
+                    due.append(task)
+            return due
+
+    def get_next_run_timestamp(self) -> float | None:
+        """Timestamp of the earliest queued run, None if nothing is queued."""
+        with self._lock:
+            while self._queue and self._next_runs.get(self._queue[0][1]) != self._queue[0][0]:
+                heapq.heappop(self._queue)
+            return self._queue[0][0] if self._queue else None
+
+    def set_schedule_change_callback(self, callback: Callable[[], None] | None):
+        self._on_schedule_change = callback
 
     def get_task_by_uuid(self, task_uuid: str) -> Union[ScheduledTask, AdHocTask, PlannedTask] | None:
         with self._lock:
-            return next((task for task in self.tasks if task.uuid == task_uuid), None)
+            return self._by_uuid.get(task_uuid)
 
     def get_task_by_name(self, name: str) -> Union[ScheduledTask, AdHocTask, PlannedTask] | None:
         with self._lock:
@@ -585,16 +630,148 @@ class SchedulerTaskList(BaseModel):
 
     async def remove_task_by_uuid(self, task_uuid: str) -> "SchedulerTaskList":
         with self._lock:
-            self.tasks = [task for task in self.tasks if task.uuid != task_uuid]
-            await self.save()
+            self._unindex(task_uuid)
+            self._delete_record(task_uuid)
         return self
 
     async def remove_task_by_name(self, name: str) -> "SchedulerTaskList":
         with self._lock:
-            self.tasks = [task for task in self.tasks if task.name != name]
-            await self.save()
+            for task in [task for task in self.tasks if task.name == name]:
+                self._unindex(task.uuid)
+                self._delete_record(task.uuid)
         return self
 
+    def _index(self, task: Union[ScheduledTask, AdHocTask, PlannedTask]):
+        previous = self._by_uuid.get(task.uuid)
+        if previous is not task:
+            if previous is not None:
+                self.tasks[self.tasks.index(previous)] = task
+            else:
+                self.tasks.append(task)
+            self._by_uuid[task.uuid] = task
+        previous_context = self._context_of.get(task.uuid)
+        if previous_context != task.context_id:
+            self._unindex_context(task.uuid, previous_context)
+            if task.context_id:
+                self._by_context.setdefault(task.context_id, set()).add(task.uuid)
+                self._context_of[task.uuid] = task.context_id
+        self._schedule(task)
+
+    def _unindex(self, task_uuid: str):
+        task = self._by_uuid.pop(task_uuid, None)
+        if task is None:
+            return
+        self.tasks.remove(task)
+        self._unindex_context(task_uuid, self._context_of.get(task_uuid))
+        self._next_runs.pop(task_uuid, None)
+        self._written.pop(task_uuid, None)
+        self._stamps.pop(task_uuid, None)
+
+    def _unindex_context(self, task_uuid: str, context_id: str | None):
+        self._context_of.pop(task_uuid, None)
+        uuids = self._by_context.get(context_id) if context_id else None
+        if uuids is not None:
+            uuids.discard(task_uuid)
+            if not uuids:
+                del self._by_context[context_id]  # type: ignore
+
+    def _schedule(self, task: Union[ScheduledTask, AdHocTask, PlannedTask], after: float | None = None):
+        run_at = _get_next_run_timestamp(task, after)
+        if self._next_runs.get(task.uuid) == run_at:
+            return
+        if run_at is None:
+            self._next_runs.pop(task.uuid, None)
+            return
+        earliest = self._queue[0][0] if self._queue else None
+        self._next_runs[task.uuid] = run_at
+        heapq.heappush(self._queue, (run_at, task.uuid))
+        if (earliest is None or run_at < earliest) and self._on_schedule_change:
+            self._on_schedule_change()
+
+    def _write_task(self, task: Union[ScheduledTask, AdHocTask, PlannedTask]):
+        if isinstance(task, AdHocTask) and not task.token:
+            PrintStyle(italic=True, font_color="red", padding=False).print(
+                f"WARNING: AdHocTask {task.name} ({task.uuid}) has a null or empty token before saving: '{task.token}'"
+            )
+            # Generate a new token to prevent errors
+            task.token = str(random.randint(1000000000000000000, 9999999999999999999))
+            PrintStyle(italic=True, font_color="red", padding=False).print(
+                f"Fixed: Generated new token '{task.token}' for task {task.name}"
+            )
+
+        json_data = task.model_dump_json()
+        if self._written.get(task.uuid) == hash(json_data):
+            return
+
+        folder = get_abs_path(TASKS_FOLDER)
+        path = os.path.join(folder, f"{task.uuid}.json")
+        stamp_before = _stat_mtime(folder)
+        os.makedirs(folder, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(json_data)
+        os.replace(path + ".tmp", path)
+
+        st = os.stat(path)
+        self._stamps[task.uuid] = (st.st_mtime_ns, st.st_size)
+        self._written[task.uuid] = hash(json_data)
+        # own write, no need to rescan unless there were other changes already
+        if stamp_before == self._folder_stamp:
+            self._folder_stamp = _stat_mtime(folder)
+
+    def _delete_record(self, task_uuid: str):
+        folder = get_abs_path(TASKS_FOLDER)
+        path = os.path.join(folder, f"{task_uuid}.json")
+        stamp_before = _stat_mtime(folder)
+        if exists(path):
+            os.remove(path)
+        if stamp_before == self._folder_stamp:
+            self._folder_stamp = _stat_mtime(folder)
+
+    def _migrate_legacy_file(self):
+        # previous versions stored all tasks in a single tasks.json, it also comes back with older backups
+        path = get_abs_path(SCHEDULER_FOLDER, "tasks.json")
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        if self._legacy_failed == (st.st_mtime_ns, st.st_size):
+            return
+        try:
+            data = self.__class__.model_validate_json(read_file(path))
+        except Exception as e:
+            self._legacy_failed = (st.st_mtime_ns, st.st_size)
+            PrintStyle(italic=True, font_color="red", padding=False).print(
+                f"Failed to import scheduler tasks from {path}: {e}"
+            )
+            return
+        with self._lock:
+            for task in data.tasks:
+                self._index(task)
+                self._write_task(task)
+        os.replace(path, path + ".bak")
+
+
+def _stat_mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _get_next_run_timestamp(task: Union[ScheduledTask, AdHocTask, PlannedTask], after: float | None = None) -> float | None:
+    if isinstance(task, ScheduledTask):
+        # first cron slot strictly after the reference time, in the task timezone
+        reference = max(time.time(), after + 1 if after is not None else 0)
+        task_timezone = pytz.timezone(task.schedule.timezone or Localization.get().get_timezone())
+        reference_time = datetime.fromtimestamp(reference, task_timezone)
+        crontab = CronTab(crontab=task.schedule.to_crontab())  # type: ignore
+        seconds: Optional[float] = crontab.next(now=reference_time, return_datetime=False)  # type: ignore
+        return reference + seconds if seconds is not None else None
+    if isinstance(task, PlannedTask):
+        next_launch_time = task.plan.get_next_launch_time()
+        return next_launch_time.timestamp() if next_launch_time else None
+    return None
+
 
 class TaskScheduler:
 
@@ -650,6 +827,23 @@ class TaskScheduler:
         for task in await self._tasks.get_due_tasks():
             await self._run_task(task)
 
+    def get_next_run_timestamp(self) -> float | None:
+        return self._tasks.get_next_run_timestamp()
+
+    async def wait_for_next(self, max_wait: float):
+        """Sleep until the earliest task is due, a task gets scheduled earlier, or max_wait passes."""
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        self._tasks.set_schedule_change_callback(lambda: loop.call_soon_threadsafe(changed.set))
+        try:
+            next_run = self._tasks.get_next_run_timestamp()
+            delay = max_wait if next_run is None else min(max_wait, max(0.0, next_run - time.time()))
+            await asyncio.wait_for(changed.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._tasks.set_schedule_change_callback(None)
+
     async def run_task_by_uuid(self, task_uuid: str, task_context: str | None = None):
         # First reload tasks to ensure we have the latest state
         await self._tasks.reload()
@@ -839,7 +1033,6 @@ class TaskScheduler:
                 await current_task.on_success(result)
 
                 # Explicitly verify task was updated in storage after success
-                await self._tasks.reload()
                 updated_task = self.get_task_by_uuid(task_uuid)
                 if updated_task and updated_task.state != TaskState.IDLE:
                     self._printer.print(f"Fixing task state consistency: '{current_task.name}' state is not IDLE after success")
@@ -851,7 +1044,6 @@ class TaskScheduler:
                 await current_task.on_error(str(e))
 
                 # Explicitly verify task was updated in storage after error
-                await self._tasks.reload()
                 updated_task = self.get_task_by_uuid(task_uuid)
                 if updated_task and updated_task.state != TaskState.ERROR:
                     self._printer.print(f"Fixing task state consistency: '{current_task.name}' state is not ERROR after failure")
@@ -863,8 +1055,8 @@ class TaskScheduler:
                 # Call on_finish for task-specific cleanup
                 await current_task.on_finish()
 
-                # Make one final save to ensure all states are persisted
-                await self._tasks.save()
+                # Make one final save to ensure the task state is persisted
+                await self._tasks.save_task(task_uuid)
 
         deferred_task = DeferredTask(thread_name=self.__class__.__name__)
         deferred_task.start_task(_run_task_wrapper, task.uuid, task_context)
@@ -0,0 +1,155 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from python.helpers import files
+from python.helpers.print_style import PrintStyle
+
+# generated thumbnails, named by the content hash of the image and the size
+THUMBNAIL_FOLDER = "tmp/thumbnails"
+# requested sizes are rounded up to one of these, so an image has a few cached variants at most
+THUMBNAIL_SIZES = (128, 256, 512, 1024)
+DEFAULT_THUMBNAIL_SIZE = 256
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_CACHE_SIZE = 200 * 1024 * 1024  # oldest thumbnails are removed over this size
+# formats Pillow reads, vector and other images are served as they are
+THUMBNAIL_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
+HASHES_CACHED = 10000
+
+_hashes: "OrderedDict[tuple[str, int, int], str]" = OrderedDict()
+_hashes_lock = threading.Lock()
+_cache_size = -1  # bytes in the thumbnail folder, counted on first write
+_cache_lock = threading.Lock()
+
+
+def get_image_info(file_path: str) -> dict:
+    """
+    Stat of an image with the hash of its content.
+
+    The hash is computed once per file version (path, size and modification time).
+    The result can be passed as stat to rfc_files.read_file_range.
+    """
+    file_path = files.get_abs_path(file_path)
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_size, stat.st_mtime_ns)
+    with _hashes_lock:
+        digest = _hashes.get(key)
+        if digest:
+            _hashes.move_to_end(key)
+    if not digest:
+        with open(file_path, "rb") as file:
+            digest = hashlib.file_digest(file, "sha256").hexdigest()[:32]
+        with _hashes_lock:
+            _hashes[key] = digest
+            while len(_hashes) > HASHES_CACHED:
+                _hashes.popitem(last=False)
+    return {
+        "path": file_path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "etag": f"{stat.st_size:x}-{stat.st_mtime_ns:x}",
+        "hash": digest,
+    }
+
+
+def get_thumbnail_size(size: int) -> int:
+    """Smallest thumbnail size at least as large as the requested one"""
+    for thumbnail_size in THUMBNAIL_SIZES:
+        if size <= thumbnail_size:
+            return thumbnail_size
+    return THUMBNAIL_SIZES[-1]
+
+
+def get_thumbnail(file_path: str, size: int = DEFAULT_THUMBNAIL_SIZE) -> dict:
+    """
+    Thumbnail of an image fitting into size x size pixels, from the disk cache or created now.
+
+    Returns the same fields as get_image_info with the thumbnail path and mime type. Images that
+    cannot be resized or are already small are returned as they are.
+    """
+    info = get_image_info(file_path)
+    if os.path.splitext(file_path)[1].lower() not in THUMBNAIL_EXTENSIONS:
+        return info
+
+    size = get_thumbnail_size(size)
+    for ext, mime in (("webp", "image/webp"), ("jpg", "image/jpeg")):
+        thumb_path = files.get_abs_path(THUMBNAIL_FOLDER, f"{info['hash']}_{size}.{ext}")
+        if os.path.exists(thumb_path):
+            break
+    else:
+        try:
+            thumb_path, mime = _create_thumbnail(file_path, info["hash"], size)
+        except Exception as e:
+            PrintStyle.warning(f"Could not create thumbnail of {file_path}: {e}")
+            return info
+        if not thumb_path:
+            return info
+
+    thumb = get_image_info(thumb_path)
+    # the thumbnail follows the original, its hash is derived from it
+    thumb["hash"] = f"{info['hash']}-{size}"
+    thumb["mime"] = mime
+    return thumb
+
+
+def _create_thumbnail(file_path: str, digest: str, size: int) -> tuple[str, str]:
+    from PIL import Image, features
+
+    with Image.open(file_path) as img:
+        if img.width <= size and img.height <= size:
+            return "", ""  # already small, the original is served
+        img.draft("RGB", (size, size))  # jpeg decoders scale down while reading
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        if features.check("webp"):
+            ext, mime = "webp", "image/webp"
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+            img.save(output, format="WEBP", quality=THUMBNAIL_QUALITY, method=4)
+        else:
+            ext, mime = "jpg", "image/jpeg"
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(output, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+
+    thumb_path = files.get_abs_path(THUMBNAIL_FOLDER, f"{digest}_{size}.{ext}")
+    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+    # written aside and moved in place, concurrent requests never read a partial file
+    temp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(output.getvalue())
+    os.replace(temp_path, thumb_path)
+    _add_to_cache(output.tell(), thumb_path)
+    return thumb_path, mime
+
+
+def _add_to_cache(size: int, new_path: str):
+    global _cache_size
+    folder = files.get_abs_path(THUMBNAIL_FOLDER)
+    with _cache_lock:
+        if _cache_size < 0:
+            _cache_size = sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+        else:
+            _cache_size += size
+        if _cache_size <= THUMBNAIL_CACHE_SIZE:
+            return
+
+        # remove the oldest thumbnails down to 80 % of the limit
+        entries = sorted(
+            (
+                entry for entry in os.scandir(folder)
+                if entry.is_file() and not entry.name.endswith(".tmp") and entry.path != new_path
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if _cache_size <= THUMBNAIL_CACHE_SIZE * 0.8:
+                break
+            try:
+                _cache_size -= entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                pass
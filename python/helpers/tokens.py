@@ -1,28 +1,72 @@
-from typing import Literal
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Literal, Sequence
 import tiktoken
 
+if TYPE_CHECKING:
+    from models import ModelConfig
+
 APPROX_BUFFER = 1.1
 TRIM_BUFFER = 0.8
+DEFAULT_ENCODING = "cl100k_base"
+CACHE_SIZE = 8192  # memoized token counts
+HASH_MIN_CHARS = 256  # longer texts are keyed by content hash instead of the text itself
+OFFLOAD_CHARS = 100_000  # count_tokens_async encodes longer texts in a worker thread
+CHARS_PER_TOKEN = 4  # fast estimate for streamed deltas
+
+_cache: OrderedDict[tuple[str, str | bytes], int] = OrderedDict()
+_cache_lock = threading.Lock()
 
 
-def count_tokens(text: str, encoding_name="cl100k_base") -> int:
+def count_tokens(text: str, encoding_name=DEFAULT_ENCODING) -> int:
     if not text:
         return 0
 
-    # Get the encoding
-    encoding = tiktoken.get_encoding(encoding_name)
+    key = _cache_key(text, encoding_name)
+    count = _cache_get(key)
+    if count is None:
+        count = len(_get_encoding(encoding_name).encode(text, disallowed_special=()))
+        _cache_put(key, count)
+    return count
+
 
-    # Encode the text and count the tokens
-    tokens = encoding.encode(text)
-    token_count = len(tokens)
+def count_tokens_batch(
+    texts: Sequence[str], encoding_name=DEFAULT_ENCODING
+) -> list[int]:
+    """Count tokens of many texts, only texts missing from the cache are encoded, in one batch."""
+    keys = [_cache_key(text, encoding_name) if text else None for text in texts]
+    counts: list[int | None] = [_cache_get(key) if key else 0 for key in keys]
+    missing = [i for i, count in enumerate(counts) if count is None]
+    if missing:
+        encoded = _get_encoding(encoding_name).encode_batch(
+            [texts[i] for i in missing], disallowed_special=()
+        )
+        for i, tokens in zip(missing, encoded):
+            counts[i] = len(tokens)
+            _cache_put(keys[i], len(tokens))  # type: ignore
+    return counts  # type: ignore
 
-    return token_count
+
+async def count_tokens_async(text: str, encoding_name=DEFAULT_ENCODING) -> int:
+    # very large uncached texts are encoded off the event loop
+    if len(text) < OFFLOAD_CHARS or _cache_get(_cache_key(text, encoding_name)) is not None:
+        return count_tokens(text, encoding_name)
+    return await asyncio.to_thread(count_tokens, text, encoding_name)
 
 
 def approximate_tokens(
     text: str,
+    encoding_name=DEFAULT_ENCODING,
 ) -> int:
-    return int(count_tokens(text) * APPROX_BUFFER)
+    return int(count_tokens(text, encoding_name) * APPROX_BUFFER)
+
+
+def fast_tokens(text: str) -> int:
+    """Rough character based estimate without encoding, for streamed deltas and hot paths."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
 
 
 def trim_to_tokens(
@@ -30,9 +74,10 @@ def trim_to_tokens(
     max_tokens: int,
     direction: Literal["start", "end"],
     ellipsis: str = "...",
+    encoding_name=DEFAULT_ENCODING,
 ) -> str:
     chars = len(text)
-    tokens = count_tokens(text)
+    tokens = count_tokens(text, encoding_name)
 
     if tokens <= max_tokens:
         return text
@@ -42,3 +87,48 @@ def trim_to_tokens(
     if direction == "start":
         return text[:approx_chars] + ellipsis
     return ellipsis + text[chars - approx_chars : chars]
+
+
+def get_encoding_name(model_config: "ModelConfig | None") -> str:
+    """Encoding matching the configured model, models unknown to tiktoken use the default."""
+    if not model_config:
+        return DEFAULT_ENCODING
+    return _get_encoding_name_for_model(model_config.name)
+
+
+@lru_cache(maxsize=256)
+def _get_encoding_name_for_model(model_name: str) -> str:
+    # provider prefixes like "openai/gpt-4o" are not known to tiktoken
+    for name in (model_name, model_name.rsplit("/", 1)[-1]):
+        try:
+            return tiktoken.encoding_for_model(name).name
+        except KeyError:
+            continue
+    return DEFAULT_ENCODING
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str):
+    return tiktoken.get_encoding(encoding_name)
+
+
+def _cache_key(text: str, encoding_name: str) -> tuple[str, str | bytes]:
+    if len(text) < HASH_MIN_CHARS:
+        return encoding_name, text
+    return encoding_name, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def _cache_get(key: tuple[str, str | bytes]) -> int | None:
+    with _cache_lock:
+        count = _cache.get(key)
+        if count is not None:
+            _cache.move_to_end(key)
+        return count
+
+
+def _cache_put(key: tuple[str, str | bytes], count: int):
+    with _cache_lock:
+        _cache[key] = count
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
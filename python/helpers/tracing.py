@@ -0,0 +1,329 @@
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, TYPE_CHECKING
+
+from python.helpers import files
+
+if TYPE_CHECKING:
+    from agent import Agent
+
+TRACE_QUEUE_SIZE = 10000  # max pending events, further events are dropped instead of blocking
+TRACE_FLUSH_INTERVAL = 1.0  # seconds between file flushes
+TRACE_FILES_KEPT = 5  # rotated trace files kept in the traces folder
+SPANS_KEPT = 20000  # finished spans kept in memory per context for summaries
+CONTEXTS_KEPT = 50  # contexts with spans in memory
+SLOWEST_CATEGORIES = ("extension", "tool", "mcp", "llm", "memory")
+
+# attributes a span takes over from its parent when not given
+INHERITED_ATTRS = ("context", "agent", "iteration")
+
+_enabled = False
+_max_size = 50 * 1024 * 1024
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("trace_span", default=None)
+# perf counter to wall clock, trace timestamps are comparable across restarts
+_epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+
+class _TraceWriter:
+    """Background writer of trace events, one Chrome trace event per JSONL line.
+
+    Callers only enqueue events, a single thread serializes and writes them in batches
+    and starts a new file when it grows over the size limit.
+    """
+
+    def __init__(self, traces_dir: str):
+        self.traces_dir = traces_dir
+        self.dropped = 0
+        self._file = None
+        self._queue: queue.Queue[dict | None] = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="TraceWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, event: dict):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self):
+        os.makedirs(self.traces_dir, exist_ok=True)
+        trace_filename = datetime.now().strftime("trace_%Y%m%d_%H%M%S_%f.jsonl")
+        self._file = open(os.path.join(self.traces_dir, trace_filename), "w", encoding="utf-8")
+        # remove the oldest files over the limit
+        traces = sorted(name for name in os.listdir(self.traces_dir) if name.endswith(".jsonl"))
+        for name in traces[: max(len(traces) - TRACE_FILES_KEPT, 0)]:
+            os.remove(os.path.join(self.traces_dir, name))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # collect everything recorded during the flush interval into one write
+            deadline = time.monotonic() + TRACE_FLUSH_INTERVAL
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                if self._file is None or (_max_size and self._file.tell() > _max_size):
+                    if self._file:
+                        self._file.close()
+                    self._open()
+                lines = [json.dumps(event, default=str) for event in batch if event]
+                if self.dropped:
+                    lines.append(json.dumps({"name": "dropped", "ph": "i", "s": "g", "ts": _now_us(), "args": {"count": self.dropped}}))
+                    self.dropped = 0
+                self._file.write("\n".join(lines) + "\n")  # type: ignore
+                self._file.flush()  # type: ignore
+            except Exception:
+                pass  # tracing must never break the application
+
+
+class Span:
+    """Timed section of work, nested under the span active in the current task."""
+
+    __slots__ = (
+        "name", "category", "attrs", "parent", "path",
+        "start_ns", "end_ns", "child_ns", "first_token_ns", "tokens", "_token",
+    )
+    recording = True
+
+    def __init__(self, name: str, category: str, attrs: dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.parent = _current.get()
+        if self.parent is not None:
+            for key in INHERITED_ATTRS:
+                if key not in attrs and key in self.parent.attrs:
+                    attrs[key] = self.parent.attrs[key]
+            self.path = f"{self.parent.path};{name}"
+        else:
+            self.path = name
+        self.start_ns = self.end_ns = self.child_ns = self.first_token_ns = self.tokens = 0
+        self._token = None
+
+    def set(self, **attrs) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    async def on_tokens(self, chunk: str, tokens: int):
+        """Tokens callback of model calls, records time to first token and throughput"""
+        if not self.first_token_ns:
+            self.first_token_ns = time.perf_counter_ns()
+        self.tokens += tokens
+
+    def start(self) -> "Span":
+        self.start_ns = time.perf_counter_ns()
+        self._token = _current.set(self)
+        return self
+
+    def end(self):
+        self.end_ns = time.perf_counter_ns()
+        try:
+            _current.reset(self._token)  # type: ignore
+        except ValueError:
+            pass  # ended in another context than started, nothing to restore there
+        duration = self.end_ns - self.start_ns
+        if self.parent is not None:
+            self.parent.child_ns += duration
+        if self.tokens:
+            self.attrs["output_tokens"] = self.tokens
+            self.attrs["ttft_ms"] = round((self.first_token_ns - self.start_ns) / 1e6, 2)
+            streaming_ns = self.end_ns - self.first_token_ns
+            if streaming_ns > 0:
+                self.attrs["tokens_per_s"] = round(self.tokens / (streaming_ns / 1e9), 1)
+        _record(self, duration)
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.end()
+
+
+class _NoopSpan:
+    """Shared span returned while tracing is disabled."""
+
+    recording = False
+
+    def set(self, **attrs) -> "_NoopSpan":
+        return self
+
+    async def on_tokens(self, chunk: str, tokens: int):
+        pass
+
+    def start(self) -> "_NoopSpan":
+        return self
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NOOP = _NoopSpan()
+_writer: _TraceWriter | None = None
+_writer_lock = threading.Lock()
+_spans: "OrderedDict[str, deque[dict]]" = OrderedDict()
+_spans_lock = threading.Lock()
+_pids: dict[str, int] = {}
+
+
+def configure(enabled: bool, max_size_mb: float):
+    """Apply tracing options, called when settings change."""
+    global _enabled, _max_size
+    _enabled = enabled
+    _max_size = int(max(0, max_size_mb) * 1024 * 1024)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, category: str = "", agent: "Agent | None" = None, **attrs) -> Span | _NoopSpan:
+    """
+    Span to use as a context manager, or with start() and end() around code that cannot be indented.
+
+    With an agent, the context id, agent number and loop iteration are added to the attributes,
+    nested spans inherit them. While tracing is disabled a shared no-op span is returned.
+    """
+    if not _enabled:
+        return _NOOP
+    if agent is not None:
+        attrs["context"] = agent.context.id
+        attrs["agent"] = agent.number
+        loop_data = getattr(agent, "loop_data", None)
+        if loop_data is not None:
+            attrs["iteration"] = loop_data.iteration
+    return Span(name, category, attrs)
+
+
+def get_summary(context_id: str, iterations: int = 5) -> list[dict[str, Any]]:
+    """
+    Flame summary of the last iterations of a context, newest first.
+
+    Each iteration lists its spans aggregated by stack path with total and self time, and the
+    slowest extensions, tools, model calls and searches by self time.
+    """
+    with _spans_lock:
+        events = list(_spans.get(context_id, ()))
+
+    groups: dict[tuple[int, int], dict[str, Any]] = {}
+    for event in events:
+        args = event["args"]
+        key = (args.get("agent", 0), args.get("iteration", 0))
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"agent": key[0], "iteration": key[1], "start": event["ts"], "end": 0, "paths": {}, "roots_us": 0, "iteration_us": 0}
+        group["start"] = min(group["start"], event["ts"])
+        group["end"] = max(group["end"], event["ts"] + event["dur"])
+        if ";" not in args["path"]:
+            group["roots_us"] += event["dur"]
+        if event["name"] == "iteration" and event["cat"] == "agent":
+            group["iteration_us"] += event["dur"]
+
+        item = group["paths"].get(args["path"])
+        if item is None:
+            item = group["paths"][args["path"]] = {"path": args["path"], "name": event["name"], "category": event["cat"], "count": 0, "total_us": 0, "self_us": 0}
+        item["count"] += 1
+        item["total_us"] += event["dur"]
+        item["self_us"] += args["self_us"]
+
+    result = []
+    for group in sorted(groups.values(), key=lambda g: g["start"], reverse=True)[:iterations]:
+        flame = [_to_ms(item) for item in sorted(group["paths"].values(), key=lambda i: i["path"])]
+        slowest = sorted(
+            (item for item in flame if item["category"] in SLOWEST_CATEGORIES),
+            key=lambda i: i["self_ms"],
+            reverse=True,
+        )[:10]
+        result.append({
+            "agent": group["agent"],
+            "iteration": group["iteration"],
+            "started": datetime.fromtimestamp(group["start"] / 1e6).isoformat(),
+            "duration_ms": round((group["iteration_us"] or group["roots_us"]) / 1000, 2),
+            "wall_ms": round((group["end"] - group["start"]) / 1000, 2),
+            "flame": flame,
+            "slowest": slowest,
+        })
+    return result
+
+
+def get_chrome_trace(context_id: str) -> dict[str, Any]:
+    """Spans of a context in memory as a Chrome trace, loadable in Perfetto or chrome://tracing"""
+    with _spans_lock:
+        events = list(_spans.get(context_id, ()))
+    metadata = [{"name": "process_name", "ph": "M", "pid": _get_pid(context_id), "args": {"name": f"context {context_id}"}}]
+    return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+
+def _record(span: Span, duration_ns: int):
+    context_id = span.attrs.get("context", "")
+    event = {
+        "name": span.name,
+        "cat": span.category,
+        "ph": "X",
+        "ts": (span.start_ns + _epoch_offset_ns) // 1000,
+        "dur": duration_ns // 1000,
+        "pid": _get_pid(context_id),
+        "tid": span.attrs.get("agent", 0),
+        "args": {**span.attrs, "path": span.path, "self_us": max(duration_ns - span.child_ns, 0) // 1000},
+    }
+    with _spans_lock:
+        context_spans = _spans.get(context_id)
+        if context_spans is None:
+            context_spans = _spans[context_id] = deque(maxlen=SPANS_KEPT)
+            while len(_spans) > CONTEXTS_KEPT:
+                _spans.popitem(last=False)
+        else:
+            _spans.move_to_end(context_id)
+        context_spans.append(event)
+    _get_writer().write(event)
+
+
+def _get_writer() -> _TraceWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = _TraceWriter(files.get_abs_path("logs", "traces"))
+    return _writer
+
+
+def _get_pid(context_id: str) -> int:
+    # chrome traces group events by numeric process ids, one per context
+    pid = _pids.get(context_id)
+    if pid is None:
+        pid = _pids.setdefault(context_id, len(_pids) + 1)
+    return pid
+
+
+def _to_ms(item: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "path": item["path"],
+        "name": item["name"],
+        "category": item["category"],
+        "count": item["count"],
+        "total_ms": round(item["total_us"] / 1000, 2),
+        "self_ms": round(item["self_us"] / 1000, 2),
+    }
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
@@ -0,0 +1,226 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable
+
+from python.helpers import settings
+
+
+class UtilityPriority(IntEnum):
+    PROMPT = 0  # the agent waits for the result to build its prompt
+    RECALL = 1
+    COMPRESSION = 2
+    MEMORIZE = 3
+    RENAME = 4
+
+
+class _OwnerCancelled(Exception):
+    """The caller running a coalesced call was cancelled, the others run it themselves."""
+
+
+@dataclass
+class _Request:
+    priority: UtilityPriority
+    seq: int
+    context_id: str
+    key: str
+    grant: Future = field(default_factory=Future)  # resolved when a slot is free
+    result: Future = field(default_factory=Future)  # shared with coalesced callers
+    enqueued_at: float = field(default_factory=time.time)
+    task: asyncio.Task | None = None
+    loop: asyncio.AbstractEventLoop | None = None
+
+
+@dataclass
+class _PriorityStats:
+    granted: int = 0
+    completed: int = 0
+    failed: int = 0
+    coalesced: int = 0
+    cancelled: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+
+class UtilityScheduler:
+    """Orders utility model calls from all contexts by priority.
+
+    Calls wait for a slot under a global and a per-context concurrency limit, the most
+    important waiting call gets the next free slot. Calls the agent waits on to build its
+    prompt only count against the global limit. Calls with the same key in the same
+    context are coalesced while one is queued or running, they run the call again if its
+    owner is cancelled. Slots are granted through thread-safe futures so contexts on
+    different event loops share the limits.
+    """
+
+    _instance: "UtilityScheduler | None" = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: list[_Request] = []
+        self._running: list[_Request] = []
+        self._by_key: dict[tuple[str, str], _Request] = {}
+        self._seq = 0
+        self._stats = {priority: _PriorityStats() for priority in UtilityPriority}
+
+    @staticmethod
+    def get_instance() -> "UtilityScheduler":
+        with UtilityScheduler._instance_lock:
+            if UtilityScheduler._instance is None:
+                UtilityScheduler._instance = UtilityScheduler()
+            return UtilityScheduler._instance
+
+    async def run(
+        self,
+        context_id: str,
+        priority: UtilityPriority,
+        func: Callable[[], Awaitable[Any]],
+        key: str = "",
+    ) -> Any:
+        with self._lock:
+            existing = self._by_key.get((context_id, key)) if key else None
+            if existing:
+                self._stats[priority].coalesced += 1
+            else:
+                self._seq += 1
+                request = _Request(
+                    priority=priority,
+                    seq=self._seq,
+                    context_id=context_id,
+                    key=key,
+                    task=asyncio.current_task(),
+                    loop=asyncio.get_running_loop(),
+                )
+                self._queue.append(request)
+                if key:
+                    self._by_key[(context_id, key)] = request
+                self._dispatch()
+        if existing:
+            try:
+                # shielded, a cancelled waiter must not cancel the shared result
+                return await asyncio.shield(asyncio.wrap_future(existing.result))
+            except _OwnerCancelled:
+                return await self.run(context_id, priority, func, key)
+
+        try:
+            await asyncio.wrap_future(request.grant)
+        except BaseException as e:
+            with self._lock:
+                if request in self._queue:
+                    self._queue.remove(request)
+                    self._stats[priority].cancelled += 1
+            self._finish(request, error=e)
+            raise
+
+        try:
+            result = await func()
+        except BaseException as e:
+            self._finish(request, error=e)
+            raise
+        self._finish(request, result=result)
+        return result
+
+    def cancel_context(self, context_id: str):
+        """Drop queued calls of a context and cancel its running ones, used on chat reset."""
+        with self._lock:
+            queued = [r for r in self._queue if r.context_id == context_id]
+            running = [r for r in self._running if r.context_id == context_id]
+            for request in queued:
+                self._queue.remove(request)
+                self._stats[request.priority].cancelled += 1
+        for request in queued:
+            request.grant.cancel()
+        for request in running:
+            if request.task and request.loop and not request.loop.is_closed():
+                request.loop.call_soon_threadsafe(request.task.cancel)
+
+    def stats(self) -> dict:
+        global_limit, context_limit = _get_limits()
+        now = time.time()
+        with self._lock:
+            priorities = {}
+            for priority, stats in self._stats.items():
+                queued = [r for r in self._queue if r.priority == priority]
+                priorities[priority.name.lower()] = {
+                    "queued": len(queued),
+                    "running": sum(1 for r in self._running if r.priority == priority),
+                    "completed": stats.completed,
+                    "failed": stats.failed,
+                    "coalesced": stats.coalesced,
+                    "cancelled": stats.cancelled,
+                    "avg_wait_ms": round(stats.wait_total / stats.granted * 1000) if stats.granted else 0,
+                    "max_wait_ms": round(stats.wait_max * 1000),
+                    "oldest_wait_ms": (
+                        round((now - min(r.enqueued_at for r in queued)) * 1000)
+                        if queued
+                        else 0
+                    ),
+                }
+            return {
+                "queued": len(self._queue),
+                "running": len(self._running),
+                "limit": global_limit,
+                "context_limit": context_limit,
+                "priorities": priorities,
+            }
+
+    def _dispatch(self):
+        # called with lock held, grants free slots to the most important eligible requests
+        global_limit, context_limit = _get_limits()
+        while self._queue and (not global_limit or len(self._running) < global_limit):
+            per_context: dict[str, int] = {}
+            for r in self._running:
+                per_context[r.context_id] = per_context.get(r.context_id, 0) + 1
+            # prompt calls are not held back by background work of their own context
+            eligible = [
+                r
+                for r in self._queue
+                if not context_limit
+                or r.priority == UtilityPriority.PROMPT
+                or per_context.get(r.context_id, 0) < context_limit
+            ]
+            if not eligible:
+                return
+            request = min(eligible, key=lambda r: (r.priority, r.seq))
+            self._queue.remove(request)
+            if request.grant.cancelled():
+                continue
+            self._running.append(request)
+            wait = time.time() - request.enqueued_at
+            stats = self._stats[request.priority]
+            stats.granted += 1
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            request.grant.set_result(True)
+
+    def _finish(self, request: _Request, result: Any = None, error: BaseException | None = None):
+        with self._lock:
+            if request.key and self._by_key.get((request.context_id, request.key)) is request:
+                del self._by_key[(request.context_id, request.key)]
+            if request in self._running:
+                self._running.remove(request)
+                stats = self._stats[request.priority]
+                if error is None:
+                    stats.completed += 1
+                elif isinstance(error, asyncio.CancelledError):
+                    stats.cancelled += 1
+                else:
+                    stats.failed += 1
+            self._dispatch()
+        if error is None:
+            request.result.set_result(result)
+        else:
+            # only the owner was cancelled, coalesced callers retry instead of being cancelled with it
+            if isinstance(error, asyncio.CancelledError):
+                error = _OwnerCancelled()
+            request.result.set_exception(error)
+            request.result.exception()  # mark as retrieved when nobody else waits
+
+
+def _get_limits() -> tuple[int, int]:
+    set = settings.get_settings()
+    return int(set["util_model_concurrency"]), int(set["util_model_context_concurrency"])
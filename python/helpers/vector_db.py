@@ -1,5 +1,6 @@
 from typing import Any, List, Sequence
 import uuid
+import numpy as np
 from langchain_community.vectorstores import FAISS
 
 # faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
@@ -97,14 +98,65 @@ class VectorDB:
                     break
         return result
 
-    async def insert_documents(self, docs: list[Document]):
+    async def search_by_vectors(
+        self,
+        vectors: Sequence[Sequence[float]],
+        limit: int,
+        threshold: float,
+        filter: str = "",
+    ) -> list[list[tuple[Document, float]]]:
+        """Search several query vectors in one index call, results per query ordered by score."""
+        total = self.index.ntotal
+        if not vectors or not total:
+            return [[] for _ in vectors]
+        comparator = get_comparator(filter) if filter else None
+        # filtered searches need all candidates, flat index scores them all anyway
+        k = total if comparator else min(limit, total)
+        scores, indices = self.index.search(np.asarray(vectors, dtype=np.float32), k)
+
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            found = []
+            for score, i in zip(row_scores, row_indices):
+                if i < 0:
+                    continue
+                relevance = cosine_normalizer(float(score))
+                if relevance < threshold:
+                    break  # ordered by score, rest is lower
+                doc = self.db.docstore.search(self.db.index_to_docstore_id[int(i)])
+                if not isinstance(doc, Document):
+                    continue
+                if comparator and not comparator(doc.metadata):
+                    continue
+                found.append((doc, relevance))
+                if len(found) >= limit:
+                    break
+            results.append(found)
+        return results
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def insert_documents(self, docs: list[Document], embeddings: Sequence[Sequence[float]] | None = None):
         ids = [str(uuid.uuid4()) for _ in range(len(docs))]
 
         if ids:
             for doc, id in zip(docs, ids):
                 doc.metadata["id"] = id  # add ids to documents metadata
 
-            self.db.add_documents(documents=docs, ids=ids)
+            if embeddings is None:
+                # embedded in a worker thread, rate limit waits do not stop the event loop
+                await self.db.aadd_documents(documents=docs, ids=ids)
+            else:
+                # precomputed embeddings, skip the embedding model
+                self.db.add_embeddings(
+                    text_embeddings=[
+                        (doc.page_content, list(vector))
+                        for doc, vector in zip(docs, embeddings)
+                    ],
+                    metadatas=[doc.metadata for doc in docs],
+                    ids=ids,
+                )
         return ids
 
     async def delete_documents_by_ids(self, ids: list[str]):
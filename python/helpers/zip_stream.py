@@ -0,0 +1,156 @@
+import os
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Iterator
+
+from python.helpers.print_style import PrintStyle
+
+# size of file reads and of the yielded archive chunks
+CHUNK_SIZE = 1024 * 1024
+# compressed output is collected until this size before it is yielded
+FLUSH_SIZE = 64 * 1024
+# threads reading files ahead of the compression
+READ_WORKERS = 2
+
+# compressing these again only costs time, they are stored as they are
+STORED_EXTENSIONS = {
+    # archives
+    "zip", "gz", "tgz", "bz2", "xz", "7z", "rar", "zst", "lz4", "br", "jar", "whl", "apk",
+    # images
+    "jpg", "jpeg", "png", "gif", "webp", "avif", "heic", "heif",
+    # audio and video
+    "mp3", "m4a", "aac", "ogg", "opus", "flac", "mp4", "m4v", "mkv", "mov", "avi", "webm",
+    # zipped documents and fonts
+    "docx", "xlsx", "pptx", "odt", "ods", "odp", "epub", "woff", "woff2",
+}
+
+# text compresses well, it gets the default level, other binaries the fastest one
+TEXT_EXTENSIONS = {
+    "txt", "md", "csv", "tsv", "json", "jsonl", "xml", "yaml", "yml", "toml", "ini", "log",
+    "html", "htm", "css", "js", "ts", "py", "sh", "c", "h", "cpp", "java", "go", "rs", "sql", "svg",
+}
+TEXT_LEVEL = 6
+BINARY_LEVEL = 1
+
+
+class _Buffer:
+    """Write-only sink for ZipFile, the written data is taken out after each write."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def get_compression(file_name: str) -> tuple[int, int | None]:
+    """Compression method and level of an archive entry, chosen by the file extension."""
+    ext = file_name.rsplit(".", 1)[-1].lower() if "." in file_name else ""
+    if ext in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED, None
+    if ext in TEXT_EXTENSIONS:
+        return zipfile.ZIP_DEFLATED, TEXT_LEVEL
+    return zipfile.ZIP_DEFLATED, BINARY_LEVEL
+
+
+def stream_zip(
+    dir_path: str,
+    base_name: str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    cancel: threading.Event | None = None,
+) -> Iterator[bytes]:
+    """
+    Zip a directory as a stream of chunks, the first chunk is ready after the first file is read.
+
+    Entries are written with data descriptors, so the archive needs no seeking and no temporary
+    file. Files are read by a thread pool ahead of the compression. Closing the generator, which
+    the web server does when the client disconnects, or setting cancel stops the work.
+
+    Args:
+        dir_path: Absolute path of the directory
+        base_name: Top folder of the entries in the archive, the directory name by default, "" for none
+        chunk_size: Size of file reads
+        cancel: Optional event to stop the archive early
+
+    Returns:
+        Iterator of zip archive bytes
+    """
+    if not os.path.isdir(dir_path):
+        raise FileNotFoundError(f"Directory not found: {dir_path}")
+    if base_name is None:
+        base_name = os.path.basename(os.path.normpath(dir_path))
+
+    def generate():
+        buffer = _Buffer()
+        executor = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="zip_stream")
+        try:
+            with zipfile.ZipFile(buffer, "w") as archive:
+                for root, _, names in os.walk(dir_path):
+                    for name in sorted(names):
+                        if cancel is not None and cancel.is_set():
+                            return
+                        file_path = os.path.join(root, name)
+                        arcname = os.path.join(base_name, os.path.relpath(file_path, dir_path))
+                        try:
+                            file = open(file_path, "rb")
+                            info = zipfile.ZipInfo.from_file(file_path, arcname, strict_timestamps=False)
+                        except OSError as e:
+                            # headers are already sent, a broken archive is worse than a missing file
+                            PrintStyle.warning(f"Skipping {file_path} in zip: {e}")
+                            continue
+
+                        with file:
+                            info.compress_type, level = get_compression(name)
+                            _set_compress_level(info, level)
+                            # sizes are not known ahead in a stream, large files need zip64 headers
+                            force_zip64 = info.file_size * 1.05 > zipfile.ZIP64_LIMIT
+                            with archive.open(info, "w", force_zip64=force_zip64) as entry:
+                                for data in _read_ahead(executor, file, chunk_size):
+                                    entry.write(data)
+                                    if buffer.size >= FLUSH_SIZE:
+                                        yield buffer.take()
+                                    if cancel is not None and cancel.is_set():
+                                        return
+                        if buffer.size:
+                            yield buffer.take()
+            # central directory
+            if buffer.size:
+                yield buffer.take()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return generate()
+
+
+def _read_ahead(executor: ThreadPoolExecutor, file: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    # the next chunk is read while the current one is compressed, both release the GIL
+    future: Future[bytes] = executor.submit(file.read, chunk_size)
+    try:
+        while data := future.result():
+            future = executor.submit(file.read, chunk_size)
+            yield data
+    finally:
+        # the file is closed by the caller, the pending read must finish first
+        if not future.cancel():
+            future.exception()
+
+
+def _set_compress_level(info: zipfile.ZipInfo, level: int | None):
+    # per entry levels are not public before Python 3.13
+    if hasattr(info, "compress_level"):
+        setattr(info, "compress_level", level)
+    else:
+        setattr(info, "_compresslevel", level)
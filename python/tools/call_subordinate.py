@@ -1,4 +1,8 @@
+import asyncio
+import json
 from agent import Agent, UserMessage
+from python.helpers import settings
+from python.helpers.defer import DeferredTask
 from python.helpers.tool import Tool, Response
 from initialize import initialize_agent
 from python.extensions.hist_add_tool_result import _90_save_tool_call_file as save_tool_call_file
@@ -7,23 +11,18 @@ from python.extensions.hist_add_tool_result import _90_save_tool_call_file as sa
 class Delegation(Tool):
 
     async def execute(self, message="", reset="", **kwargs):
+        # multiple subtasks in one call are delegated to parallel subordinates
+        tasks = kwargs.get("tasks")
+        if tasks:
+            return await self.execute_parallel(tasks)
+
         # create subordinate agent using the data object on this agent and set superior agent to his data object
         if (
             self.agent.get_data(Agent.DATA_NAME_SUBORDINATE) is None
             or str(reset).lower().strip() == "true"
         ):
-            # initialize default config
-            config = initialize_agent()
-
-            # set subordinate prompt profile if provided, if not, keep original
-            agent_profile = kwargs.get("profile")
-            if agent_profile:
-                config.profile = agent_profile
-
-            # crate agent
-            sub = Agent(self.agent.number + 1, config, self.agent.context)
-            # register superior/subordinate
-            sub.set_data(Agent.DATA_NAME_SUPERIOR, self.agent)
+            # crate agent, set subordinate prompt profile if provided, if not, keep original
+            sub = self.create_subordinate(kwargs.get("profile"))
             self.agent.set_data(Agent.DATA_NAME_SUBORDINATE, sub)
 
         # add user message to subordinate agent
@@ -43,6 +42,75 @@ class Delegation(Tool):
         # result
         return Response(message=result, break_loop=False, additional=additional)
 
+    async def execute_parallel(self, tasks):
+        if isinstance(tasks, str):
+            tasks = json.loads(tasks)
+        tasks = [
+            task if isinstance(task, dict) else {"message": str(task)}
+            for task in tasks
+        ]
+        limit = max(1, int(settings.get_settings()["agent_subordinate_concurrency"]))
+
+        # each subordinate monologue runs as a child task of the context task, killing the chat kills them too
+        parent = self.agent.context.task
+        thread_name = parent.event_loop_thread.thread_name if parent else "Background"
+        results: list[dict] = [{} for _ in tasks]
+        running: dict[asyncio.Future, tuple[int, DeferredTask]] = {}
+        queued = list(enumerate(tasks))
+
+        def start_next():
+            index, task = queued.pop(0)
+            sub = self.create_subordinate(task.get("profile"))
+            sub.set_data(Agent.DATA_NAME_PARALLEL, True)
+            sub.hist_add_user_message(
+                UserMessage(message=str(task.get("message", "")), attachments=[])
+            )
+            child = DeferredTask(thread_name=thread_name).start_task(sub.monologue)
+            if parent:
+                parent.add_child_task(child)
+            running[asyncio.ensure_future(child.result())] = (index, child)
+            results[index] = {"task": index + 1, "profile": task.get("profile") or ""}
+
+        try:
+            while queued or running:
+                while queued and len(running) < limit:
+                    start_next()
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    index, child = running.pop(future)
+                    self._remove_child(parent, child)
+                    try:
+                        results[index]["result"] = future.result()
+                    except Exception as e:
+                        results[index]["error"] = str(e) or type(e).__name__
+        except asyncio.CancelledError:
+            for future, (_, child) in running.items():
+                child.kill()
+                future.cancel()
+            raise
+
+        return Response(
+            message=json.dumps(results, indent=2, ensure_ascii=False),
+            break_loop=False,
+        )
+
+    def create_subordinate(self, profile: str | None = None) -> Agent:
+        # initialize default config
+        config = initialize_agent()
+
+        # set subordinate prompt profile if provided, if not, keep original
+        if profile:
+            config.profile = profile
+
+        # crate agent and register superior
+        sub = Agent(self.agent.number + 1, config, self.agent.context)
+        sub.set_data(Agent.DATA_NAME_SUPERIOR, self.agent)
+        return sub
+
+    def _remove_child(self, parent: DeferredTask | None, child: DeferredTask):
+        if parent:
+            parent.children = [c for c in parent.children if c.task is not child]
+
     def get_log_object(self):
         return self.agent.context.log.log(
             type="tool",
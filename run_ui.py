@@ -90,8 +90,9 @@ def requires_api_key(f):
         if api_key := request.headers.get("X-API-KEY"):
             if api_key != valid_api_key:
                 return Response("Invalid API key", 401)
-        elif request.json and request.json.get("api_key"):
-            api_key = request.json.get("api_key")
+        elif (json_body := request.get_json(silent=True)) and json_body.get("api_key"):
+            # multipart requests pass the key in the header, their body is left to the handler
+            api_key = json_body.get("api_key")
             if api_key != valid_api_key:
                 return Response("Invalid API key", 401)
         else:
@@ -194,6 +195,7 @@ async def serve_index():
     return index
 
 def run():
+    initialize.initialize_logging()
     PrintStyle().print("Initializing framework...")
 
     # Suppress only request logs but keep the startup messages
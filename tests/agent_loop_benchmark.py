@@ -0,0 +1,405 @@
+import sys, os, time, json, math, shutil, asyncio, hashlib, argparse, threading, tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import models
+from agent import Agent, AgentConfig, AgentContext, UserMessage
+from python.helpers import persist_chat, settings
+from python.helpers.defer import DeferredTask
+from python.helpers.files import get_abs_path
+from python.helpers.memory import Memory
+from python.helpers.tool import Tool, Response
+from langchain_core.documents import Document
+from langchain.embeddings.base import Embeddings
+
+# Runs Agent.monologue end to end against a scripted local model, nothing leaves the machine.
+# Chat and utility calls go through LiteLLMChatWrapper.unified_call with litellm's acompletion
+# replaced by a fake stream, embeddings come from a hashing stub.
+
+RESULTS_FOLDER = "tmp/benchmarks"
+MEMORY_PREFIX = "benchmark_"
+EMBEDDING_DIMS = 256
+CHARS_PER_TOKEN = 4
+PROMPT = "Collect the benchmark data with the benchmark_output tool and summarize it."
+
+
+@dataclass
+class Scenario:
+    name: str
+    tool_calls: int = 4  # iterations with a tool call before the final response
+    tool_output_chars: int = 2_000
+    history_messages: int = 0  # messages in the chat before the prompt
+    history_message_chars: int = 1_500
+    memories: int = 0  # memories in the database before the prompt
+
+
+SCENARIOS = [
+    Scenario("baseline"),
+    Scenario("long_history", history_messages=400),
+    Scenario("big_tool_output", tool_output_chars=200_000),
+    Scenario("large_memory", memories=20_000),
+]
+
+PHASES = ["extensions", "prompt", "llm", "stream", "tools", "persistence"]
+
+# utility prompts recognized by their system message, anything else gets a short summary
+UTILITY_RESPONSES = [
+    ("array of indices of relevant memories", "[0, 1, 2, 3, 4]"),
+    ("provide a search query", "benchmark data summary"),
+    ("worth memorizing", '["The user runs benchmarks of the agent loop."]'),
+    ("succesful technical solutions", "[]"),
+    ("chat naming assistant", "Benchmark"),
+]
+UTILITY_DEFAULT = "Summary of the benchmark conversation."
+
+_turn: ContextVar[tuple[Scenario, int] | None] = ContextVar("benchmark_turn", default=None)
+
+
+class PhaseTimer:
+    """Collects exclusive time per phase, time of nested phases is subtracted from the outer one."""
+
+    current: "PhaseTimer"  # timer of the running measurement, the patches report to it
+
+    def __init__(self):
+        self.phases: dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.iterations: list[float] = []
+        self._stacks: dict[object, list[float]] = {}
+        self._loop_starts: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        key = _task_key()
+        stack = self._stacks.setdefault(key, [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            else:
+                self._stacks.pop(key, None)
+            with self._lock:
+                self.phases[name] += elapsed - nested
+
+    def loop_start(self, agent: Agent):
+        self._loop_starts[id(agent)] = time.perf_counter()
+
+    def loop_end(self, agent: Agent):
+        start = self._loop_starts.pop(id(agent), None)
+        if start is not None:
+            with self._lock:
+                self.iterations.append(time.perf_counter() - start)
+
+
+def _task_key() -> object:
+    try:
+        return asyncio.current_task() or threading.get_ident()
+    except RuntimeError:
+        return threading.get_ident()
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag of words embeddings, similar texts get similar vectors."""
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = [0.0] * EMBEDDING_DIMS
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % EMBEDDING_DIMS] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+class BenchmarkOutputTool(Tool):
+    async def execute(self, **kwargs):
+        size = int(self.args.get("size", 0))
+        line = f"benchmark output line of the iteration {self.loop_data.iteration if self.loop_data else 0}\n"
+        return Response(message=(line * (size // len(line) + 1))[:size], break_loop=False)
+
+
+class FakeLLM:
+    """Stand-in for litellm.acompletion streaming canned responses at a fixed token rate."""
+
+    def __init__(self, chat_tps: float, utility_tps: float, chunk_tokens: int):
+        self.chat_tps = chat_tps
+        self.utility_tps = utility_tps
+        self.chunk_tokens = chunk_tokens
+
+    async def acompletion(self, model: str, messages: list[dict], stream: bool = True, **kwargs):
+        if model.endswith("/chat"):
+            return self._stream(self._chat_response(), self.chat_tps)
+        return self._stream(self._utility_response(messages), self.utility_tps)
+
+    def _chat_response(self) -> str:
+        scenario, iteration = _turn.get() or (SCENARIOS[0], 0)
+        if iteration < scenario.tool_calls:
+            tool_name = "benchmark_output"
+            tool_args = {"size": scenario.tool_output_chars}
+        else:
+            tool_name = "response"
+            tool_args = {"text": "The benchmark data has been collected and summarized. " * 10}
+        return json.dumps(
+            {
+                "thoughts": [f"Iteration {iteration}, continuing with the benchmark task.", "The next step follows the plan."],
+                "headline": f"Benchmark step {iteration}",
+                "tool_name": tool_name,
+                "tool_args": tool_args,
+            },
+            indent=4,
+        )
+
+    def _utility_response(self, messages: list[dict]) -> str:
+        system = str(messages[0].get("content", "")) if messages else ""
+        for marker, response in UTILITY_RESPONSES:
+            if marker in system:
+                return response
+        return UTILITY_DEFAULT
+
+    async def _stream(self, text: str, tps: float):
+        size = self.chunk_tokens * CHARS_PER_TOKEN
+        for i in range(0, len(text), size):
+            with PhaseTimer.current.phase("llm"):
+                await asyncio.sleep(self.chunk_tokens / tps if tps else 0)
+            # time until the consumer asks for the next chunk is spent in the stream callbacks
+            with PhaseTimer.current.phase("stream"):
+                yield {"choices": [{"delta": {"content": text[i : i + size]}}]}
+
+
+def install(llm: FakeLLM):
+    PhaseTimer.current = PhaseTimer()
+    embeddings = HashEmbeddings()
+    models.acompletion = llm.acompletion
+    models.get_embedding_model = lambda *args, **kwargs: embeddings
+
+    def timed(name, func):
+        async def wrapper(*args, **kwargs):
+            with PhaseTimer.current.phase(name):
+                return await func(*args, **kwargs)
+        return wrapper
+
+    call_extensions = Agent.call_extensions
+    async def call_extensions_wrapper(self, extension_point: str, **kwargs):
+        if extension_point == "message_loop_start":
+            PhaseTimer.current.loop_start(self)
+        with PhaseTimer.current.phase("extensions"):
+            result = await call_extensions(self, extension_point, **kwargs)
+        if extension_point == "message_loop_end":
+            PhaseTimer.current.loop_end(self)
+        return result
+    Agent.call_extensions = call_extensions_wrapper
+
+    call_chat_model = Agent.call_chat_model
+    async def call_chat_model_wrapper(self, *args, **kwargs):
+        _turn.set((self.data["benchmark_scenario"], self.loop_data.iteration))
+        return await call_chat_model(self, *args, **kwargs)
+    Agent.call_chat_model = call_chat_model_wrapper
+
+    get_tool = Agent.get_tool
+    def get_tool_wrapper(self, name: str, method, args: dict, message: str, loop_data, **kwargs):
+        if name == "benchmark_output":
+            return BenchmarkOutputTool(agent=self, name=name, method=method, args=args, message=message, loop_data=loop_data, **kwargs)
+        return get_tool(self, name, method, args, message, loop_data, **kwargs)
+    Agent.get_tool = get_tool_wrapper
+
+    Agent.prepare_prompt = timed("prompt", Agent.prepare_prompt)
+    Agent.process_tools = timed("tools", Agent.process_tools)
+
+    save_tmp_chat = persist_chat.save_tmp_chat
+    def save_tmp_chat_wrapper(context):
+        with PhaseTimer.current.phase("persistence"):
+            return save_tmp_chat(context)
+    persist_chat.save_tmp_chat = save_tmp_chat_wrapper
+
+
+def create_config(scenario: Scenario, ctx_length: int) -> AgentConfig:
+    set = settings.get_settings()
+    return AgentConfig(
+        chat_model=models.ModelConfig(type=models.ModelType.CHAT, provider="benchmark", name="chat", ctx_length=ctx_length),
+        utility_model=models.ModelConfig(type=models.ModelType.CHAT, provider="benchmark", name="utility", ctx_length=ctx_length),
+        embeddings_model=models.ModelConfig(type=models.ModelType.EMBEDDING, provider="benchmark", name="hash"),
+        browser_model=models.ModelConfig(type=models.ModelType.CHAT, provider="benchmark", name="browser"),
+        mcp_servers='{"mcpServers": {}}',
+        profile=set["agent_profile"],
+        memory_subdir=MEMORY_PREFIX + scenario.name,
+        knowledge_subdirs=[],
+    )
+
+
+def create_context(scenario: Scenario, ctx_length: int) -> AgentContext:
+    context = AgentContext(config=create_config(scenario, ctx_length))
+    agent = context.agent0
+    agent.data["benchmark_scenario"] = scenario
+    text = "Earlier benchmark conversation message with some details about the task. "
+    text = (text * (scenario.history_message_chars // len(text) + 1))[: scenario.history_message_chars]
+    for i in range(scenario.history_messages):
+        agent.hist_add_message(ai=bool(i % 2), content=f"{i}: {text}")
+    return context
+
+
+async def fill_memory(scenario: Scenario, ctx_length: int):
+    context = create_context(Scenario(scenario.name), ctx_length)
+
+    async def fill():
+        # opens the scenario database with the stub embeddings, filled once for all runs
+        db = await Memory.get(context.agent0)
+        topics = ["python", "docker", "network", "database", "benchmark", "files", "search", "memory"]
+        docs = [
+            Document(
+                page_content=f"Memory {i} about {topics[i % len(topics)]} and {topics[(i * 7) % len(topics)]}, "
+                f"remembered detail number {i} of the benchmark dataset.",
+                metadata={"area": Memory.Area.MAIN.value},
+            )
+            for i in range(scenario.memories)
+        ]
+        if docs:
+            await db.insert_documents(docs)
+
+    try:
+        await DeferredTask(thread_name=AgentContext.__name__).start_task(fill).result()
+    finally:
+        AgentContext.remove(context.id)
+
+
+async def run_contexts(scenario: Scenario, count: int, args) -> dict:
+    timer = PhaseTimer.current = PhaseTimer()
+    contexts = [create_context(scenario, args.ctx_length) for _ in range(count)]
+    try:
+        start = time.perf_counter()
+        tasks = [context.communicate(UserMessage(PROMPT)) for context in contexts]
+        await asyncio.gather(*[task.result() for task in tasks])
+        wall = time.perf_counter() - start
+    finally:
+        for context in contexts:
+            AgentContext.remove(context.id)
+            persist_chat.remove_chat(context.id)
+
+    iterations = sorted(timer.iterations)
+    return {
+        "scenario": scenario.name,
+        "contexts": count,
+        "iterations": len(iterations),
+        "wall_s": round(wall, 3),
+        "throughput_it_s": round(len(iterations) / wall, 2) if wall else 0,
+        "iteration_ms": {
+            "mean": _ms(sum(iterations) / len(iterations)) if iterations else 0,
+            "p50": _ms(_percentile(iterations, 0.5)),
+            "p95": _ms(_percentile(iterations, 0.95)),
+            "max": _ms(iterations[-1]) if iterations else 0,
+        },
+        "phases_ms": {
+            phase: {
+                "total": _ms(total),
+                "per_iteration": _ms(total / len(iterations)) if iterations else 0,
+            }
+            for phase, total in timer.phases.items()
+        },
+    }
+
+
+async def measure_allocations(scenario: Scenario, args) -> dict:
+    # separate run, tracing allocations slows everything down
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await run_contexts(scenario, 1, args)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_mb": round((peak - before) / 2**20, 2), "retained_mb": round((current - before) / 2**20, 2)}
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def print_result(result: dict, baseline: dict | None = None):
+    phases = ", ".join(f"{phase} {data['per_iteration']:.1f}" for phase, data in result["phases_ms"].items())
+    line = (
+        f"{result['scenario']:>16} x{result['contexts']:<3} {result['iterations']:>4} it, "
+        f"{result['iteration_ms']['mean']:>8.1f} ms/it (p95 {result['iteration_ms']['p95']:.1f}), "
+        f"{result['throughput_it_s']:>7.2f} it/s | {phases}"
+    )
+    if "alloc" in result:
+        line += f" | alloc peak {result['alloc']['peak_mb']} MB, retained {result['alloc']['retained_mb']} MB"
+    if baseline:
+        change = (result["iteration_ms"]["mean"] / baseline["iteration_ms"]["mean"] - 1) * 100 if baseline["iteration_ms"]["mean"] else 0
+        line += f" | {change:+.1f}% ms/it vs baseline"
+    print(line)
+
+
+def load_baseline(path: str) -> dict[tuple[str, int], dict]:
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {(r["scenario"], r["contexts"]): r for r in data["results"]}
+
+
+async def main(args):
+    install(FakeLLM(args.chat_tps, args.utility_tps, args.chunk_tokens))
+    baseline = load_baseline(args.compare)
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios]
+
+    results = []
+    try:
+        for scenario in scenarios:
+            await fill_memory(scenario, args.ctx_length)
+            for count in args.contexts:
+                result = await run_contexts(scenario, count, args)
+                if count == 1 and not args.no_alloc:
+                    result["alloc"] = await measure_allocations(scenario, args)
+                results.append(result)
+                print_result(result, baseline.get((scenario.name, count)))
+    finally:
+        for scenario in scenarios:
+            Memory.index.pop(MEMORY_PREFIX + scenario.name, None)
+            shutil.rmtree(get_abs_path("memory", MEMORY_PREFIX + scenario.name), ignore_errors=True)
+        shutil.rmtree(get_abs_path("memory/embeddings/benchmark_hash"), ignore_errors=True)
+
+    output = args.output or os.path.join(
+        RESULTS_FOLDER, datetime.now().strftime("agent_loop_%Y%m%d_%H%M%S.json")
+    )
+    os.makedirs(os.path.dirname(get_abs_path(output)), exist_ok=True)
+    with open(get_abs_path(output), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "created": datetime.now().isoformat(),
+                "settings": vars(args),
+                "scenarios": [asdict(s) for s in scenarios],
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the agent message loop.")
+    parser.add_argument("--scenarios", nargs="*", default=[], help="names of scenarios to run, all by default")
+    parser.add_argument("--contexts", nargs="*", type=int, default=[1, 4, 16], help="numbers of concurrent chats")
+    parser.add_argument("--chat-tps", type=float, default=0, help="chat model tokens per second, 0 for no delay")
+    parser.add_argument("--utility-tps", type=float, default=0, help="utility model tokens per second, 0 for no delay")
+    parser.add_argument("--chunk-tokens", type=int, default=4, help="tokens per streamed chunk")
+    parser.add_argument("--ctx-length", type=int, default=128_000, help="context length of the fake models")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the allocation tracing run")
+    parser.add_argument("--output", default="", help="results file, tmp/benchmarks/agent_loop_<time>.json by default")
+    parser.add_argument("--compare", default="", help="previous results file to compare with")
+    asyncio.run(main(parser.parse_args()))
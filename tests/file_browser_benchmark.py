@@ -0,0 +1,57 @@
+import sys, os, time, shutil, json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers import file_browser
+from python.helpers.file_browser import FileBrowser
+from python.helpers.files import get_abs_path
+
+# directory with many entries, created once and reused by later runs
+FOLDER = "tmp/file_browser_benchmark"
+ENTRIES = 200_000
+RUNS = 20
+
+
+def create_entries(path: str, count: int):
+    marker = os.path.join(path, ".complete")
+    if os.path.exists(marker):
+        return
+    os.makedirs(path, exist_ok=True)
+    for i in range(count):
+        if i % 100 == 0:
+            os.makedirs(os.path.join(path, f"folder_{i:06d}"), exist_ok=True)
+        else:
+            with open(os.path.join(path, f"file_{i:06d}.txt"), "w") as f:
+                f.write("x" * (i % 1000))
+    open(marker, "w").close()
+
+
+def measure(label: str, func, runs: int = RUNS, cold: bool = False):
+    times = []
+    for _ in range(1 if cold else runs):
+        if cold:
+            file_browser._index_cache.clear()
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<34} {min(times):>9.2f} ms  ({len(result['entries'])} entries of {result['total']})")
+    return result
+
+
+if __name__ == "__main__":
+    path = get_abs_path(FOLDER)
+    create_entries(path, ENTRIES)
+    browser = FileBrowser()
+    current = os.path.relpath(path, "/")
+
+    measure("first page, cold", lambda: browser.get_files(current), cold=True)
+    first = measure("first page, cached", lambda: browser.get_files(current))
+    measure(
+        "next page by cursor",
+        lambda: browser.get_files(current, cursor=first["next_cursor"]),
+    )
+    measure("sort by size, cold", lambda: browser.get_files(current, sort="size", direction="desc"), cold=True)
+    measure("sort by size, cached", lambda: browser.get_files(current, sort="size", direction="desc"))
+    measure("filter '1234'", lambda: browser.get_files(current, filter="1234"))
+
+    if "--cleanup" in sys.argv:
+        shutil.rmtree(path, ignore_errors=True)
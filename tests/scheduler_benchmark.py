@@ -0,0 +1,68 @@
+import sys, os, time, shutil, asyncio
+from datetime import datetime, timezone, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers import task_scheduler
+from python.helpers.files import get_abs_path
+from python.helpers.task_scheduler import (
+    SchedulerTaskList, ScheduledTask, PlannedTask, TaskSchedule, TaskPlan, TaskState
+)
+
+# store records in a separate folder so real tasks are not touched
+task_scheduler.TASKS_FOLDER = "tmp/scheduler_benchmark/tasks"
+COUNTS = [100, 1000, 10000]
+TICKS = 1000
+
+
+async def create_tasks(store: SchedulerTaskList, count: int):
+    later = datetime.now(timezone.utc) + timedelta(days=1)
+    for i in range(count):
+        if i % 2:
+            task = ScheduledTask.create(
+                name=f"scheduled {i}", system_prompt="", prompt="benchmark",
+                schedule=TaskSchedule(minute="0", hour="3", day="*", month="*", weekday="*", timezone="UTC"),
+            )
+        else:
+            task = PlannedTask.create(
+                name=f"planned {i}", system_prompt="", prompt="benchmark",
+                plan=TaskPlan.create(todo=[later + timedelta(minutes=i)]),
+            )
+        await store.add_task(task)
+
+
+async def measure(count: int):
+    shutil.rmtree(get_abs_path("tmp/scheduler_benchmark"), ignore_errors=True)
+    store = SchedulerTaskList(tasks=[])
+
+    start = time.perf_counter()
+    await create_tasks(store, count)
+    add_ms = (time.perf_counter() - start) * 1000 / count
+
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        await store.get_due_tasks()
+    tick_us = (time.perf_counter() - start) * 1_000_000 / TICKS
+
+    task = store.tasks[count // 2]
+    start = time.perf_counter()
+    for _ in range(100):
+        await store.update_task_by_uuid(task.uuid, lambda t: t.update(state=TaskState.IDLE, last_result=str(time.time())))
+    update_ms = (time.perf_counter() - start) * 1000 / 100
+
+    # a fresh store has to read every record once
+    start = time.perf_counter()
+    loaded = SchedulerTaskList(tasks=[])
+    loaded.refresh()
+    load_ms = (time.perf_counter() - start) * 1000
+    assert len(loaded.tasks) == count
+
+    print(
+        f"{count:>6} tasks: add {add_ms:.2f} ms/task, tick {tick_us:.1f} us, "
+        f"update {update_ms:.2f} ms, cold load {load_ms:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    for count in COUNTS:
+        asyncio.run(measure(count))
+    shutil.rmtree(get_abs_path("tmp/scheduler_benchmark"), ignore_errors=True)
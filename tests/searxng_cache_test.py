@@ -0,0 +1,69 @@
+import sys, os, time, json, asyncio, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.helpers import searxng
+
+# local stub of SearXNG, answers every query after a fixed delay
+DELAY = 0.2
+requests = 0
+
+
+class StubSearXNG(BaseHTTPRequestHandler):
+    def do_POST(self):
+        global requests
+        requests += 1
+        length = int(self.headers.get("Content-Length", 0))
+        query = self.rfile.read(length).decode()
+        time.sleep(DELAY)
+        body = json.dumps(
+            {"results": [{"title": query, "url": "http://example.com", "content": "stub"}]}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("localhost", 0), StubSearXNG)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+searxng.URL = f"http://localhost:{server.server_address[1]}/search"
+searxng._get_config = lambda: (600, False)  # ttl, persist
+
+
+def search(query: str):
+    # call the stub directly instead of routing over RFC
+    return searxng.SearchCache.get_instance().get(query, lambda: searxng._search(query))
+
+
+async def run():
+    global requests
+
+    # concurrent identical queries share one request
+    start = time.perf_counter()
+    await asyncio.gather(*[search("Agent Zero") for _ in range(20)])
+    print(f"20 concurrent identical queries: {requests} request(s), {time.perf_counter() - start:.3f}s")
+    assert requests == 1
+
+    # repeated and differently formatted queries are served from cache
+    start = time.perf_counter()
+    for _ in range(100):
+        await search("  agent   ZERO ")
+    print(f"100 repeated queries: {requests} request(s), {time.perf_counter() - start:.3f}s")
+    assert requests == 1
+
+    # distinct queries run in parallel over pooled connections
+    requests = 0
+    start = time.perf_counter()
+    await asyncio.gather(*[search(f"query {i}") for i in range(20)])
+    print(f"20 distinct queries: {requests} request(s), {time.perf_counter() - start:.3f}s")
+    assert requests == 20
+
+    print("Stats:", searxng.get_stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,100 @@
+import sys, os, time, json, shutil, subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent import AgentContext
+from initialize import initialize_agent
+from python.helpers import persist_chat
+from python.helpers.files import get_abs_path
+
+# saved chats are written to a separate folder, the real chats folder is not touched
+FOLDER = "tmp/startup_benchmark"
+CHAT_COUNTS = [10, 100, 1000]
+MESSAGES_PER_CHAT = 200
+MESSAGE_CHARS = 2_000
+
+# modules that should only be imported when their feature is used
+HEAVY_MODULES = ["torch", "whisper", "sentence_transformers", "faiss", "browser_use"]
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import initialize
+from python.helpers.api import ApiHandler
+from python.helpers.extract_tools import load_classes_from_folder
+load_classes_from_folder("python/api", "*.py", ApiHandler)
+print(time.perf_counter() - start)
+print(",".join(name for name in {heavy} if name in sys.modules))
+"""
+
+
+def create_chat_data() -> dict:
+    context = AgentContext(config=initialize_agent())
+    for i in range(MESSAGES_PER_CHAT):
+        context.agent0.history.add_message(i % 2 == 1, f"message {i} " + "x" * MESSAGE_CHARS)
+        context.log.log(type="user" if i % 2 == 0 else "response", heading=f"message {i}", content="x" * 200)
+    data = persist_chat._serialize_context(context)
+    AgentContext.remove(context.id)
+    return data
+
+
+def write_chats(data: dict, count: int):
+    shutil.rmtree(get_abs_path(FOLDER), ignore_errors=True)
+    for i in range(count):
+        ctxid = f"bench{i:05d}"
+        path = get_abs_path(persist_chat.CHATS_FOLDER, ctxid, persist_chat.CHAT_FILE_NAME)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({**data, "id": ctxid, "name": f"Chat {i}"}, file)
+
+
+def reset_contexts():
+    for context in AgentContext.all():
+        AgentContext.remove(context.id)
+    AgentContext._unloaded.clear()
+
+
+def measure(label: str, func) -> float:
+    reset_contexts()
+    start = time.perf_counter()
+    func()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {label:<30} {elapsed:>10.1f} ms")
+    return elapsed
+
+
+def load_all_chats():
+    # previous startup, every chat deserialized with agents, histories and logs
+    for ctxid in os.listdir(get_abs_path(persist_chat.CHATS_FOLDER)):
+        with open(get_abs_path(persist_chat.CHATS_FOLDER, ctxid, persist_chat.CHAT_FILE_NAME), encoding="utf-8") as file:
+            persist_chat._deserialize_context(json.load(file))
+
+
+def open_one_chat():
+    persist_chat.load_tmp_chats()
+    start = time.perf_counter()
+    AgentContext.get("bench00000")
+    print(f"  {'first access of one chat':<30} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    persist_chat.CHATS_FOLDER = f"{FOLDER}/chats"
+    persist_chat.CHAT_INDEX_FILE = f"{FOLDER}/chat_index.json"
+
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT.format(heavy=HEAVY_MODULES)],
+        cwd=get_abs_path(""), capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    print(f"imports of initialize and API handlers: {float(output[0]) * 1000:.0f} ms, heavy modules loaded: {output[1] or 'none'}")
+
+    data = create_chat_data()
+    for count in CHAT_COUNTS:
+        write_chats(data, count)
+        print(f"{count} chats")
+        measure("list chats, no index", persist_chat.load_tmp_chats)
+        measure("list chats from index", persist_chat.load_tmp_chats)
+        open_one_chat()
+        measure("load all chats (previous)", load_all_chats)
+
+    reset_contexts()
+    if "--cleanup" in sys.argv:
+        shutil.rmtree(get_abs_path(FOLDER), ignore_errors=True)
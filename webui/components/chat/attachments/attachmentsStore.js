@@ -263,9 +263,10 @@ const model = {
     });
   },
 
-  // Generate server-side API URL for file (for device sync)
-  getServerImgUrl(filename) {
-    return `/image_get?path=/a0/tmp/uploads/${encodeURIComponent(filename)}`;
+  // Generate server-side API URL for file (for device sync), previews use thumbnails
+  getServerImgUrl(filename, thumbnail = false) {
+    const url = `/image_get?path=/a0/tmp/uploads/${encodeURIComponent(filename)}`;
+    return thumbnail ? `${url}&thumb=true` : url;
   },
 
   getServerFileUrl(filename) {
@@ -284,7 +285,7 @@ const model = {
     // If attachment has a name and we're dealing with a server-stored file
     if (typeof attachment === "string") {
       // attachment is just a filename (from loaded chat)
-      return this.getServerImgUrl(attachment);
+      return this.getServerImgUrl(attachment, true);
     } else if (attachment.name && attachment.file) {
       // attachment is an object from current session
       if (attachment.type === "image") {
@@ -348,7 +349,7 @@ const model = {
       const extension = filename.split(".").pop();
       const isImage = this.isImageFile(filename);
       const previewUrl = isImage
-        ? this.getServerImgUrl(filename)
+        ? this.getServerImgUrl(filename, true)
         : this.getFilePreviewUrl(filename);
 
       return {
@@ -370,7 +371,7 @@ const model = {
       const filename = attachment.name;
       const extension = filename.split(".").pop() || "";
       const previewUrl = isImage
-        ? this.getServerImgUrl(attachment.name)
+        ? this.getServerImgUrl(attachment.name, true)
         : this.getFilePreviewUrl(attachment.name);
       return {
         filename: filename,
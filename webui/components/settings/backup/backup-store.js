@@ -119,7 +119,8 @@ const model = {
           exclude_patterns: exclude_patterns,
           backup_config: {
             compression_level: 6,
-            integrity_check: true
+            integrity_check: true,
+            incremental: false
           }
         };
       }
@@ -138,7 +139,8 @@ const model = {
       exclude_patterns: [],
       backup_config: {
         compression_level: 6,
-        integrity_check: true
+        integrity_check: true,
+        incremental: false
       }
     };
   },
@@ -405,7 +407,9 @@ const model = {
           include_patterns: metadata.include_patterns,
           exclude_patterns: metadata.exclude_patterns,
           include_hidden: metadata.include_hidden || false,
-          backup_name: metadata.backup_name
+          backup_name: metadata.backup_name,
+          compression_level: metadata.backup_config?.compression_level ?? 6,
+          incremental: metadata.backup_config?.incremental || false
         })
       });
 
@@ -35,6 +35,7 @@ const memoryDashboardStore = {
     localStorage.getItem("memoryDashboard_threshold") || "0.6"
   ),
   limit: parseInt(localStorage.getItem("memoryDashboard_limit") || "1000"),
+  searchMode: localStorage.getItem("memoryDashboard_searchMode") || "hybrid",
 
   // Stats
   totalCount: 0,
@@ -159,6 +160,7 @@ const memoryDashboardStore = {
       "memoryDashboard_threshold",
       this.threshold.toString()
     );
+    localStorage.setItem("memoryDashboard_searchMode", this.searchMode);
 
     if (!silent) {
       this.loading = true;
@@ -179,6 +181,7 @@ const memoryDashboardStore = {
         search: this.searchQuery,
         limit: this.limit,
         threshold: this.threshold,
+        mode: this.searchMode,
       });
 
       if (response.success) {
@@ -0,0 +1,46 @@
+import { createStore } from "/js/AlpineStore.js";
+import * as API from "/js/api.js";
+
+const REFRESH_INTERVAL = 2000;
+
+const model = {
+  stats: null,
+  error: null,
+  refreshTimer: null,
+
+  init() {},
+
+  async start() {
+    this.stop();
+    await this.refresh();
+    this.refreshTimer = setInterval(() => this.refresh(), REFRESH_INTERVAL);
+  },
+
+  stop() {
+    if (this.refreshTimer) {
+      clearInterval(this.refreshTimer);
+      this.refreshTimer = null;
+    }
+  },
+
+  async refresh() {
+    try {
+      this.stats = await API.callJsonApi("utility_queue_stats", {});
+      this.error = null;
+    } catch (e) {
+      this.error = e.message || "Failed to load utility queue stats";
+    }
+  },
+
+  get rows() {
+    if (!this.stats) return [];
+    return Object.entries(this.stats.priorities).map(([name, row]) => ({
+      name,
+      ...row,
+    }));
+  },
+};
+
+const store = createStore("utilityQueueStats", model);
+
+export { store };
@@ -9,7 +9,11 @@ const fileBrowserModalProxy = {
     parentPath: "",
     sortBy: "name",
     sortDirection: "asc",
+    filter: "",
+    nextCursor: "",
+    total: 0,
   },
+  isLoadingMore: false,
 
   // Initialize navigation history
   history: [],
@@ -36,18 +40,30 @@ const fileBrowserModalProxy = {
     return archiveExts.includes(ext);
   },
 
+  getFilesUrl(path, cursor = "") {
+    // sorting, filtering and paging happen on the server
+    const params = new URLSearchParams({
+      path,
+      sort: this.browser.sortBy,
+      direction: this.browser.sortDirection,
+      filter: this.browser.filter,
+    });
+    if (cursor) params.set("cursor", cursor);
+    return `/get_work_dir_files?${params.toString()}`;
+  },
+
   async fetchFiles(path = "") {
     this.isLoading = true;
     try {
-      const response = await fetchApi(
-        `/get_work_dir_files?path=${encodeURIComponent(path)}`
-      );
+      const response = await fetchApi(this.getFilesUrl(path));
 
       if (response.ok) {
         const data = await response.json();
         this.browser.entries = data.data.entries;
         this.browser.currentPath = data.data.current_path;
         this.browser.parentPath = data.data.parent_path;
+        this.browser.nextCursor = data.data.next_cursor || "";
+        this.browser.total = data.data.total || 0;
       } else {
         console.error("Error fetching files:", await response.text());
         this.browser.entries = [];
@@ -60,11 +76,34 @@ const fileBrowserModalProxy = {
     }
   },
 
+  async loadMore() {
+    if (!this.browser.nextCursor || this.isLoadingMore) return;
+    this.isLoadingMore = true;
+    try {
+      const response = await fetchApi(
+        this.getFilesUrl(this.browser.currentPath, this.browser.nextCursor)
+      );
+      if (response.ok) {
+        const data = await response.json();
+        this.browser.entries = [...this.browser.entries, ...data.data.entries];
+        this.browser.nextCursor = data.data.next_cursor || "";
+        this.browser.total = data.data.total || 0;
+      } else {
+        console.error("Error fetching files:", await response.text());
+      }
+    } catch (error) {
+      window.toastFrontendError("Error fetching files: " + error.message, "File Browser Error");
+    } finally {
+      this.isLoadingMore = false;
+    }
+  },
+
   async navigateToFolder(path) {
     // Push current path to history before navigating
     if (this.browser.currentPath !== path) {
       this.history.push(this.browser.currentPath);
     }
+    this.browser.filter = "";
     await this.fetchFiles(path);
   },
 
@@ -72,32 +111,12 @@ const fileBrowserModalProxy = {
     if (this.browser.parentPath !== "") {
       // Push current path to history before navigating up
       this.history.push(this.browser.currentPath);
+      this.browser.filter = "";
       await this.fetchFiles(this.browser.parentPath);
     }
   },
 
-  sortFiles(entries) {
-    return [...entries].sort((a, b) => {
-      // Folders always come first
-      if (a.is_dir !== b.is_dir) {
-        return a.is_dir ? -1 : 1;
-      }
-
-      const direction = this.browser.sortDirection === "asc" ? 1 : -1;
-      switch (this.browser.sortBy) {
-        case "name":
-          return direction * a.name.localeCompare(b.name);
-        case "size":
-          return direction * (a.size - b.size);
-        case "date":
-          return direction * (new Date(a.modified) - new Date(b.modified));
-        default:
-          return 0;
-      }
-    });
-  },
-
-  toggleSort(column) {
+  async toggleSort(column) {
     if (this.browser.sortBy === column) {
       this.browser.sortDirection =
         this.browser.sortDirection === "asc" ? "desc" : "asc";
@@ -105,6 +124,7 @@ const fileBrowserModalProxy = {
       this.browser.sortBy = column;
       this.browser.sortDirection = "asc";
     }
+    await this.fetchFiles(this.browser.currentPath);
   },
 
   async deleteFile(file) {
@@ -176,6 +196,8 @@ const fileBrowserModalProxy = {
         }));
         this.browser.currentPath = data.data.current_path;
         this.browser.parentPath = data.data.parent_path;
+        this.browser.nextCursor = data.data.next_cursor || "";
+        this.browser.total = data.data.total || 0;
 
         // Show success message
         if (data.failed && data.failed.length > 0) {
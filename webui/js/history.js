@@ -18,7 +18,13 @@ export async function openCtxWindowModal() {
         const win = await window.sendJsonData("/ctx_window_get", { context: getContext() });
         const data = win.content
         const size = win.tokens
-        await showEditorModal(data, "markdown", `Context window ~${size} tokens`, "Data passed to the LLM during last interaction. Contains system message, conversation history and RAG.");
+        const parts = Object.entries(win.breakdown || {})
+            .filter(([key]) => key != "total")
+            .map(([key, tokens]) => `${key} ~${tokens}`)
+            .join(", ");
+        let description = "Data passed to the LLM during last interaction. Contains system message, conversation history and RAG.";
+        if (parts) description += ` Tokens: ${parts}.`;
+        await showEditorModal(data, "markdown", `Context window ~${size} tokens`, description);
     } catch (e) {
         window.toastFrontendError("Error fetching context: " + e.message, "Context Error");
         return
@@ -730,14 +730,14 @@ function drawKvps(container, kvps, latex) {
         if (typeof value === "string" && value.startsWith("img://")) {
           const imgElement = document.createElement("img");
           imgElement.classList.add("kvps-img");
-          imgElement.src = value.replace("img://", "/image_get?path=");
+          imgElement.src = getImageUrl(value, true);
           imgElement.alt = "Image Attachment";
           tdiv.appendChild(imgElement);
 
           // Add click handler and cursor change
           imgElement.style.cursor = "pointer";
           imgElement.addEventListener("click", () => {
-            openImageModal(imgElement.src, 1000);
+            openImageModal(getImageUrl(value), 1000);
           });
         } else {
           const pre = document.createElement("pre");
@@ -845,14 +845,14 @@ function drawKvpsIncremental(container, kvps, latex) {
       if (typeof value === "string" && value.startsWith("img://")) {
         const imgElement = document.createElement("img");
         imgElement.classList.add("kvps-img");
-        imgElement.src = value.replace("img://", "/image_get?path=");
+        imgElement.src = getImageUrl(value, true);
         imgElement.alt = "Image Attachment";
         tdiv.appendChild(imgElement);
 
         // Add click handler and cursor change
         imgElement.style.cursor = "pointer";
         imgElement.addEventListener("click", () => {
-          openImageModal(imgElement.src, 1000);
+          openImageModal(getImageUrl(value), 1000);
         });
       } else {
         const pre = document.createElement("pre");
@@ -923,6 +923,12 @@ function convertImgFilePaths(str) {
   return str.replace(/img:\/\//g, "/image_get?path=");
 }
 
+// chat shows thumbnails, the full image is loaded when opened
+function getImageUrl(value, thumbnail = false) {
+  const url = value.replace("img://", "/image_get?path=");
+  return thumbnail ? `${url}&thumb=true` : url;
+}
+
 export function convertIcons(str) {
   return str.replace(
     /icon:\/\/([a-zA-Z0-9_]+)/g,